@@ -16,4 +16,8 @@ class WocatCMSAuthenticationBackend(ModelBackend):
         if not user_data:
             return None
 
-        return remote_user_client.get_and_update_django_user(**user_data)
+        user = remote_user_client.get_and_update_django_user(**user_data)
+        # The full user info (e.g. usergroups) is not needed for the login,
+        # only refresh the cached info (used by the profile pages).
+        remote_user_client.refresh_user_information_in_background(user.id)
+        return user
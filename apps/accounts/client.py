@@ -1,34 +1,154 @@
 # -*- coding: utf-8 -*-
+import hashlib
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from apps.accounts.models import User
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.views.decorators.debug import sensitive_variables
 
 from apps.qcat.decorators import log_memory_usage
+from apps.qcat.instrumentation import record_cache
 from .conf import settings
 
 logger = logging.getLogger(__name__)
 
 
+EMPTY_SEARCH = {'success': True, 'message': '', 'users': [], 'count': 0}
+
+
 class WocatWebsiteUserClient:
     """
     Client with endpoints of the relaunched wocat website.
+
+    All requests use a session (one per process) which keeps the connections
+    alive. The information of users and the results of user searches are
+    cached, see ``_get_cached``.
     """
+    _session = None
+    _executor = None
+    _pid = None
+
+    @property
+    def session(self) -> requests.Session:
+        self._check_pid()
+        if WocatWebsiteUserClient._session is None:
+            adapter = HTTPAdapter(
+                pool_maxsize=settings.ACCOUNTS_REMOTE_POOL_SIZE,
+                max_retries=Retry(
+                    total=settings.ACCOUNTS_REMOTE_MAX_RETRIES,
+                    backoff_factor=0.2,
+                    status_forcelist=(502, 503, 504)
+                )
+            )
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            WocatWebsiteUserClient._session = session
+        return WocatWebsiteUserClient._session
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        Threads to refresh stale cache entries.
+        """
+        self._check_pid()
+        if WocatWebsiteUserClient._executor is None:
+            WocatWebsiteUserClient._executor = ThreadPoolExecutor(
+                max_workers=2)
+        return WocatWebsiteUserClient._executor
+
+    @staticmethod
+    def _check_pid():
+        # Forked processes must not share the connections or threads.
+        if WocatWebsiteUserClient._pid != os.getpid():
+            WocatWebsiteUserClient._pid = os.getpid()
+            WocatWebsiteUserClient._session = None
+            WocatWebsiteUserClient._executor = None
 
     @log_memory_usage
     def _get(self, url: str) -> requests.Response:
         """
         Simple helper to request api; all requests are GET.
         """
-        return requests.get(**self._get_request_params(url=url))
+        return self.session.get(
+            timeout=settings.ACCOUNTS_REMOTE_TIMEOUT,
+            **self._get_request_params(url=url)
+        )
 
     @log_memory_usage
     @sensitive_variables()
     def _post(self, url: str, **data) -> requests.Response:
         data.update(self._get_request_params(url=url))
-        return requests.post(**data)
+        return self.session.post(
+            timeout=settings.ACCOUNTS_REMOTE_TIMEOUT, **data)
+
+    def _get_cached(self, key: str, fetch, refresh: bool = False):
+        """
+        Return the value of ``fetch`` from the cache.
+
+        - Fresh entries are returned directly.
+        - Stale entries are returned as well, but refreshed in the background.
+        - Empty values (unknown users) are cached for a shorter time.
+        - If the remote system is not available, the cached (stale) value is
+          returned, or None.
+
+        Args:
+            ``key`` (str): The cache key.
+
+            ``fetch`` (callable): Requests the value from the remote system.
+
+            ``refresh`` (bool): Ignore the cached value.
+        """
+        key = self._get_cache_key(key)
+        entry = None if refresh else cache.get(key)
+        record_cache(hit=entry is not None)
+        if entry is None:
+            try:
+                return self._fetch_and_cache(key, fetch)
+            except requests.RequestException as e:
+                logger.warning(f'Remote user system not available: {e}')
+                return None
+
+        if entry['expires'] < time.time():
+            self._refresh_in_background(key, fetch)
+        return entry['value']
+
+    @staticmethod
+    def _get_cache_key(key: str) -> str:
+        return f'{settings.ACCOUNTS_CACHE_KEY_REMOTE}_{key}'
+
+    def _refresh_in_background(self, key: str, fetch):
+        # Only one refresh per entry at a time (across all processes).
+        if cache.add(f'{key}_refresh', True, timeout=60):
+            self.executor.submit(self._refresh, key, fetch)
+
+    @staticmethod
+    def _fetch_and_cache(key: str, fetch):
+        value = fetch()
+        ttl = settings.ACCOUNTS_REMOTE_CACHE_TTL if value else \
+            settings.ACCOUNTS_REMOTE_CACHE_NEGATIVE_TTL
+        cache.set(
+            key, {'value': value, 'expires': time.time() + ttl},
+            timeout=ttl + settings.ACCOUNTS_REMOTE_CACHE_STALE
+        )
+        return value
+
+    def _refresh(self, key: str, fetch):
+        try:
+            self._fetch_and_cache(key, fetch)
+        except requests.RequestException as e:
+            logger.warning(f'Remote user system not available: {e}')
+        finally:
+            cache.delete(f'{key}_refresh')
 
     def _get_request_params(self, url: str) -> dict:
         return {
@@ -61,13 +181,30 @@ class WocatWebsiteUserClient:
         self.update_user(user, user_info)
         return user
 
+    def refresh_user_information_in_background(self, user_id: int):
+        """
+        Update the cached user info without waiting for the remote system.
+        """
+        self._refresh_in_background(
+            self._get_cache_key(f'user_{user_id}'),
+            lambda: self._get_user_information(user_id)
+        )
+
     def search_users(self, name='') -> dict:
         """
         Keep response format as in the previous API from typo3.
         """
+        name_hash = hashlib.sha1(
+            name.strip().lower().encode('utf-8')).hexdigest()
+        search = self._get_cached(
+            f'search_{name_hash}', lambda: self._search_users(name))
+        return search or dict(EMPTY_SEARCH)
+
+    def _search_users(self, name: str) -> Optional[dict]:
         response = self._get(f'users/?name={name}')
-        if not response.ok or not response.json():
-            return {'success': True, 'message': '', 'users': [], 'count': 0}
+        response.raise_for_status()
+        if not response.json():
+            return None
 
         return {
             'success': True,
@@ -84,20 +221,39 @@ class WocatWebsiteUserClient:
     def get_logout_url(self, redirect):
         raise NotImplementedError('Deprecated method')
 
-    def get_user_information(self, user_id: int) -> dict:
+    def get_user_information(self, user_id: int, refresh: bool = False) -> dict:
         """
-        Get user info from remote system as dictionary.
+        Get user info from remote system as dictionary. With ``refresh``, the
+        cached info is not used (but updated).
         """
+        return self._get_cached(
+            f'user_{user_id}', lambda: self._get_user_information(user_id),
+            refresh=refresh
+        )
+
+    def _get_user_information(self, user_id: int) -> Optional[dict]:
         response = self._get(f'users/{user_id}/')
         if response.ok:
             user_info = response.json()
             # backwards compatibility
             user_info['username'] = user_info.get('email')
             return user_info
-        return None
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+
+    @staticmethod
+    def is_user_synced(user: User, user_information: dict) -> bool:
+        """
+        Whether the local user has the same attributes as the remote user.
+        """
+        return (user.email, user.lastname, user.firstname) == (
+            user_information['email'], user_information['last_name'],
+            user_information['first_name'])
 
     def update_user(self, user: User, user_information: dict):
-        if user_information:
+        # Skip the queries of User.update if nothing changed.
+        if user_information and not self.is_user_synced(user, user_information):
             user.update(
                 email=user_information['email'],
                 lastname=user_information['last_name'],
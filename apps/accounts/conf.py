@@ -13,3 +13,18 @@ class AccountConf(AppConf):
 
     # The name of the UNCCD role as provided by the remote system.
     UNCCD_ROLE_NAME = 'UNCCD Focal Point'
+
+    # Requests to the remote system: (connect, read) timeout in seconds,
+    # connections kept per process and retries of failed GET requests.
+    REMOTE_TIMEOUT = (3.05, 10)
+    REMOTE_POOL_SIZE = 10
+    REMOTE_MAX_RETRIES = 2
+
+    # Cache of the user information and user searches of the remote system.
+    # Entries older than REMOTE_CACHE_TTL are still returned for
+    # REMOTE_CACHE_STALE seconds, while they are refreshed in the background.
+    # Unknown users and empty searches are cached for REMOTE_CACHE_NEGATIVE_TTL.
+    CACHE_KEY_REMOTE = 'accounts_remote'
+    REMOTE_CACHE_TTL = 60 * 15
+    REMOTE_CACHE_STALE = 60 * 60 * 24
+    REMOTE_CACHE_NEGATIVE_TTL = 60
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.accounts.client import remote_user_client
+
+
+class Command(BaseCommand):
+    """
+    Fetch the information of the users from the remote system, update the
+    users and the cached information. Run this periodically, so the cache is
+    warm and the users are up to date without requests to the remote system.
+    """
+    help = 'Refresh the information of the users from the remote system.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'user_ids',
+            nargs='*',
+            type=int,
+            help='Only refresh the users with these IDs.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            dest='workers',
+            default=4,
+            help='Number of concurrent requests to the remote system.'
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('id')
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+
+        updated = missing = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            # The database is only accessed in this thread.
+            users = list(users)
+            user_infos = executor.map(
+                lambda user: remote_user_client.get_user_information(
+                    user.id, refresh=True),
+                users
+            )
+            for user, user_info in zip(users, user_infos):
+                if user_info:
+                    remote_user_client.update_user(user, user_info)
+                    updated += 1
+                else:
+                    missing += 1
+
+        self.stdout.write(
+            f'Updated {updated} users, {missing} users not found (or the '
+            f'remote system was not available).')
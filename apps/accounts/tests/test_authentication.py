@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 from apps.accounts.client import WocatWebsiteUserClient
 from django.contrib.auth import get_user_model
 
@@ -63,3 +65,13 @@ class WOCATCMSAuthenticateTest(TestCase):
         self.assertEqual(user.email, user_info['email'])
         self.assertEqual(user.firstname, user_info['first_name'])
         self.assertEqual(user.lastname, user_info['last_name'])
+
+    @patch('apps.accounts.models.User.update')
+    def test_unchanged_user_is_not_updated(self, mock_update):
+        user_info = get_mock_user_information_values_cms()
+        User.objects.create(
+            id=user_info['pk'], email=user_info['email'],
+            firstname=user_info['first_name'], lastname=user_info['last_name'])
+
+        self.remote_user_client.get_and_update_django_user(**user_info)
+        mock_update.assert_not_called()
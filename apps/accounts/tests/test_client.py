@@ -1,5 +1,9 @@
+import time
 from unittest.mock import patch, MagicMock, PropertyMock
 
+import requests
+from django.conf import settings
+
 from apps.qcat.tests import TestCase
 from .test_models import create_new_user
 from ..client import WocatWebsiteUserClient
@@ -34,29 +38,78 @@ class TestClient(TestCase):
             self.assertEqual(user.email, self.user.email)
             self.assertEqual(user, self.user)
 
-    @patch('requests.get')
-    def test_get_user_info(self, mock_request_get):
+    @patch('apps.accounts.client.cache')
+    @patch.object(WocatWebsiteUserClient, 'session')
+    def test_get_user_info(self, mock_session, mock_cache):
+        mock_cache.get.return_value = None
         api_request = MagicMock()
         api_request.status_code = 200
         api_request.ok = PropertyMock(return_value=True)
         api_request.json = lambda: dict(success=True)
-        mock_request_get.return_value = api_request
+        mock_session.get.return_value = api_request
         self.assertIsInstance(
             self.remote_user_client.get_user_information('123'), dict
         )
+        self.assertEqual(
+            mock_session.get.call_args[1]['timeout'],
+            settings.ACCOUNTS_REMOTE_TIMEOUT
+        )
 
-    @patch('requests.post')
-    @patch.object(WocatWebsiteUserClient, '_get')
-    def test_search_users(self, mock_get, mock_request_post):
-        request_post = MagicMock()
-        request_post.status_code = 200
-        request_post.ok = PropertyMock(return_value=True)
-        request_post.json = lambda: dict(success=True)
-        mock_request_post.return_value = request_post
+    @patch('apps.accounts.client.cache')
+    @patch.object(WocatWebsiteUserClient, 'session')
+    def test_search_users(self, mock_session, mock_cache):
+        mock_cache.get.return_value = None
+        request_get = MagicMock()
+        request_get.status_code = 200
+        request_get.ok = PropertyMock(return_value=True)
+        request_get.json = lambda: dict(success=True)
+        mock_session.get.return_value = request_get
         self.assertIsInstance(
             self.remote_user_client.search_users('foo'), dict
         )
 
+    @patch('apps.accounts.client.cache')
+    @patch.object(WocatWebsiteUserClient, '_get')
+    def test_get_user_info_fresh_cache(self, mock_get, mock_cache):
+        mock_cache.get.return_value = {
+            'value': {'pk': 1}, 'expires': time.time() + 10}
+        info = self.remote_user_client.get_user_information(1)
+        self.assertEqual(info, {'pk': 1})
+        mock_get.assert_not_called()
+
+    @patch('apps.accounts.client.cache')
+    @patch.object(WocatWebsiteUserClient, 'executor')
+    @patch.object(WocatWebsiteUserClient, '_get')
+    def test_get_user_info_stale_cache(
+            self, mock_get, mock_executor, mock_cache):
+        mock_cache.get.return_value = {
+            'value': {'pk': 1}, 'expires': time.time() - 10}
+        mock_cache.add.return_value = True
+        info = self.remote_user_client.get_user_information(1)
+        self.assertEqual(info, {'pk': 1})
+        mock_get.assert_not_called()
+        self.assertTrue(mock_executor.submit.called)
+
+    @patch('apps.accounts.client.cache')
+    @patch.object(WocatWebsiteUserClient, '_get')
+    def test_get_user_info_negative_cache(self, mock_get, mock_cache):
+        mock_cache.get.return_value = None
+        mock_get.return_value = MagicMock(ok=False, status_code=404)
+        self.assertIsNone(self.remote_user_client.get_user_information(1))
+        self.assertEqual(
+            mock_cache.set.call_args[1]['timeout'],
+            settings.ACCOUNTS_REMOTE_CACHE_NEGATIVE_TTL +
+            settings.ACCOUNTS_REMOTE_CACHE_STALE
+        )
+
+    @patch('apps.accounts.client.cache')
+    @patch.object(WocatWebsiteUserClient, '_get')
+    def test_get_user_info_not_available(self, mock_get, mock_cache):
+        mock_cache.get.return_value = None
+        mock_get.side_effect = requests.ConnectionError()
+        self.assertIsNone(self.remote_user_client.get_user_information(1))
+        mock_cache.set.assert_not_called()
+
     def test_update_user(self):
         # This is tested within test_models.
         pass
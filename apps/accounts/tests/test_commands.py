@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
 from django.core.management import call_command
 
@@ -45,3 +47,20 @@ class SuperUserCommandTest(TestCase):
         self.assertListEqual(
             sorted(list(superuser_emails)),
             sorted(make_superuser))
+
+
+class RefreshRemoteUsersCommandTest(TestCase):
+
+    def setUp(self):
+        self.user = create_new_user()
+
+    @patch('apps.accounts.management.commands.refresh_remote_users.'
+           'remote_user_client')
+    def test_refreshes_users(self, mock_client):
+        mock_client.get_user_information.return_value = {
+            'email': 'c@d.com', 'first_name': 'Foo', 'last_name': 'Bar'}
+        call_command('refresh_remote_users')
+        mock_client.get_user_information.assert_called_once_with(
+            self.user.id, refresh=True)
+        mock_client.update_user.assert_called_once_with(
+            self.user, mock_client.get_user_information.return_value)
@@ -204,7 +204,7 @@ class QuestionnaireListMixin(ListView):
             only_current=False, limit=None, **self.get_filter_user()
         ).filter(
             status=self.status
-        )
+        ).with_list_metadata()
 
     def get_context_data(self, **kwargs) -> dict:
         """
@@ -321,7 +321,7 @@ class QuestionnaireSearchView(LoginRequiredMixin, ListView):
     def get_queryset(self):
         return Questionnaire.with_status.not_deleted().filter(
             functools.reduce(operator.and_, self.get_query_filters())
-        ).distinct()
+        ).distinct().with_list_metadata()
 
     def get_json_data(self):
         """
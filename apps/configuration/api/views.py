@@ -1,11 +1,17 @@
+import gzip
+import json
 from collections import OrderedDict
-from django.http import Http404
+
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import quote_etag
 from rest_framework.generics import GenericAPIView
 from rest_framework.response import Response
 
 from apps.api.views import PermissionMixin, LogUserMixin
-from apps.configuration.structure import ConfigurationStructure
+from apps.configuration.structure import get_structure_dump
 from apps.configuration.models import Configuration
+from apps.qcat.utils import get_not_modified_response, patch_validators
 
 
 class ConfigurationStructureView(PermissionMixin, LogUserMixin, GenericAPIView):
@@ -25,19 +31,50 @@ class ConfigurationStructureView(PermissionMixin, LogUserMixin, GenericAPIView):
     """
 
     def get(self, request, *args, **kwargs) -> Response:
-        flat = request.GET.get('flat', False)
+        flat = bool(request.GET.get('flat', False))
+
+        # The structure only changes with the configuration, which is
+        # checked before loading the (precomputed) dump of the structure.
+        created = Configuration.objects.filter(
+            code=kwargs['code'], edition=kwargs['edition']
+        ).values_list('created', flat=True).first()
+        if created is None:
+            # No configuration was found for this code and edition.
+            raise Http404()
 
-        structure_obj = ConfigurationStructure(
-            code=kwargs['code'],
-            edition=kwargs['edition'],
-            flat=flat,
+        dump = get_structure_dump(
+            code=kwargs['code'], edition=kwargs['edition'], flat=flat,
+            created=created
         )
-
-        if structure_obj.error:
-            # No configuration was found for this code and edition.
+        if dump is None:
             raise Http404()
 
-        return Response(structure_obj.structure)
+        if request.accepted_renderer.format != 'json':
+            # Browsable API.
+            return Response(json.loads(gzip.decompress(dump['content'])))
+
+        # The dump is served as is, the ETag is the hash of its content.
+        use_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        validators = {
+            'etag': quote_etag(
+                '{}-gzip'.format(dump['etag']) if use_gzip else dump['etag']),
+            'last_modified': created,
+        }
+        response = get_not_modified_response(request, **validators)
+        if response is None:
+            if use_gzip:
+                response = HttpResponse(
+                    dump['content'], content_type='application/json')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(
+                    gzip.decompress(dump['content']),
+                    content_type='application/json')
+
+        patch_vary_headers(response, ('Accept-Encoding', ))
+        return patch_validators(
+            response, public=not request.user.is_authenticated, **validators
+        )
 
 
 class ConfigurationView(PermissionMixin, LogUserMixin, GenericAPIView):
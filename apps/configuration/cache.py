@@ -6,6 +6,7 @@ from django.core.cache import cache
 from django.utils.translation import get_language
 
 from apps.qcat.decorators import log_memory_usage
+from apps.qcat.instrumentation import record, record_cache
 
 
 def get_configuration(code: str, edition: str):
@@ -45,6 +46,7 @@ def get_cached_configuration(cache_key: str, code: str, edition: str):
     section or such.
     """
     configuration = cache.get(cache_key)
+    record_cache(hit=bool(configuration))
 
     if not configuration:
         configuration = get_configuration_by_code_edition(code, edition)
@@ -58,6 +60,7 @@ def get_configuration_by_code_edition(code: str, edition: str):
     Get the configuration object.
     """
     from apps.configuration.configuration import QuestionnaireConfiguration
+    record('configuration_builds')
     configuration_object = Configuration.objects.get(code=code, edition=edition)
     return QuestionnaireConfiguration(
         code, configuration_object=configuration_object)
@@ -32,6 +32,13 @@ from .fields import XMLCompatCharField
 
 User = get_user_model()
 
+# Note that path and label need to appear first so they can be used as select
+# options.
+FilterKey = collections.namedtuple(
+    'FilterKey',
+    ['path', 'label', 'order', 'key', 'questiongroup', 'filter_type',
+     'section_label'])
+
 
 class BaseConfigurationObject(object):
     """
@@ -2419,12 +2426,6 @@ class QuestionnaireConfiguration(BaseConfigurationObject):
         Returns:
             List of FilterKey named tuples.
         """
-        # Note that path and label need to appear first so they can be used as
-        # select options.
-        FilterKey = collections.namedtuple(
-            'FilterKey',
-            ['path', 'label', 'order', 'key', 'questiongroup', 'filter_type',
-             'section_label'])
         filter_keys = []
         for questiongroup in self.get_questiongroups():
             for question in questiongroup.questions:
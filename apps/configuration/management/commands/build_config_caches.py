@@ -4,11 +4,13 @@ from django.utils.translation import activate
 
 from apps.configuration.cache import get_configuration
 from apps.configuration.models import Configuration
+from apps.configuration.structure import build_structure_dumps
 
 
 class Command(BaseCommand):
     """
-    This command creates all configuration caches for the current process.
+    This command creates all configuration caches for the current process,
+    and the dumps of the configuration structures.
     """
     def handle(self, **options):
         languages = dict(settings.LANGUAGES).keys()
@@ -16,3 +18,4 @@ class Command(BaseCommand):
             for language in languages:
                 activate(language)
                 get_configuration(configuration.code, configuration.edition)
+            build_structure_dumps(configuration)
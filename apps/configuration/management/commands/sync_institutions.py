@@ -4,6 +4,7 @@ from django.core.management.base import BaseCommand
 from apps.accounts.client import WocatWebsiteUserClient
 from apps.configuration.models import Institution, Country
 from apps.configuration.conf import settings
+from apps.questionnaire.cache import invalidate_filters
 
 
 class Command(BaseCommand, WocatWebsiteUserClient):
@@ -68,3 +69,5 @@ class Command(BaseCommand, WocatWebsiteUserClient):
     def update_cache():
         # Update happens on first call of Institution.as_select()
         cache.delete(settings.CONFIGURATION_CACHE_KEY_INSTITUTION_SELECT)
+        # The institutions are part of the cached filters of the list views.
+        invalidate_filters()
@@ -55,6 +55,14 @@ class Configuration(models.Model):
     def latest_by_code(cls, code):
         return cls.objects.filter(code=code).latest('created')
 
+    @classmethod
+    def has_edition(cls, code, edition) -> bool:
+        """
+        Check if a configuration exists, without building it (use
+        get_configuration only if the configuration itself is needed).
+        """
+        return cls.objects.filter(code=code, edition=edition).exists()
+
     def __str__(self):
         return f'{self.code} {self.edition}'
 
@@ -1,6 +1,67 @@
+import gzip
+import hashlib
+import json
+from datetime import datetime
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import get_language, override
+
 from apps.configuration.cache import get_configuration
 from apps.configuration.configuration import QuestionnaireQuestion
 from apps.configuration.models import Configuration
+from apps.qcat.instrumentation import record_cache
+
+# Increase if the format of the structure changes, so cached dumps are not
+# used anymore.
+STRUCTURE_DUMP_VERSION = 1
+
+
+def get_structure_dump(code: str, edition: str, flat: bool,
+                       created: datetime) -> Optional[dict]:
+    """
+    Return the dump of a structure: the gzipped JSON (``content``) and its
+    strong ETag (``etag``, the hash of the JSON). Dumps are cached per code,
+    edition, locale and flat/nested, and only built again if the
+    configuration changed (``created`` is updated on each save) or
+    ``STRUCTURE_DUMP_VERSION`` was increased.
+
+    Returns ``None`` if no configuration exists for code and edition.
+    """
+    cache_key = 'configuration_structure_{}_{}_{}_{}_{}'.format(
+        STRUCTURE_DUMP_VERSION, code, edition, int(flat), get_language())
+    timestamp = created.timestamp()
+    dump = cache.get(cache_key)
+    if dump is not None and dump['created'] != timestamp:
+        dump = None
+    record_cache(hit=dump is not None)
+    if dump is None:
+        structure_obj = ConfigurationStructure(
+            code=code, edition=edition, flat=flat)
+        if structure_obj.error:
+            return None
+        content = json.dumps(structure_obj.structure).encode('utf-8')
+        dump = {
+            'created': timestamp,
+            'etag': hashlib.sha1(content).hexdigest(),
+            'content': gzip.compress(content),
+        }
+        cache.set(cache_key, dump, timeout=None)
+    return dump
+
+
+def build_structure_dumps(configuration: Configuration) -> None:
+    """
+    Precompute the dumps of all structures of a configuration (all languages,
+    flat and nested).
+    """
+    for language in dict(settings.LANGUAGES).keys():
+        with override(language):
+            for flat in [False, True]:
+                get_structure_dump(
+                    code=configuration.code, edition=configuration.edition,
+                    flat=flat, created=configuration.created)
 
 
 class ConfigurationStructure:
@@ -1,9 +1,15 @@
+import gzip
+import json
 import logging
 
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
 from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
 
 from apps.qcat.tests import TestCase
-from apps.configuration.api.views import ConfigurationView, ConfigurationEditionView
+from apps.configuration.api.views import ConfigurationView, \
+    ConfigurationEditionView, ConfigurationStructureView
 
 
 class ConfigurationViewTest(TestCase):
@@ -56,3 +62,51 @@ class ConfigurationEditionViewTest(TestCase):
         response = self.view.get(self.request, code=self.code)
         self.assertEqual(response.status_code, 200)
 
+
+class ConfigurationStructureViewTest(TestCase):
+
+    fixtures = [
+        'global_key_values',
+        'sample',
+    ]
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.factory = RequestFactory()
+        self.url = '/en/api/v2/configuration/sample/2015'
+        self.request = self.get_request()
+        self.view = self.setup_view(
+            ConfigurationStructureView(), self.request, code='sample',
+            edition='2015'
+        )
+
+    def get_request(self, **headers):
+        request = self.factory.get(self.url, **headers)
+        request.version = 'v2'
+        request.user = AnonymousUser()
+        request.accepted_renderer = JSONRenderer()
+        return request
+
+    def test_get_structure(self):
+        response = self.view.get(self.request, code='sample', edition='2015')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertIsInstance(json.loads(response.content), list)
+
+    def test_get_structure_gzip(self):
+        request = self.get_request(HTTP_ACCEPT_ENCODING='gzip, deflate')
+        response = self.view.get(request, code='sample', edition='2015')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIsInstance(
+            json.loads(gzip.decompress(response.content)), list)
+
+    def test_not_modified(self):
+        etag = self.view.get(
+            self.request, code='sample', edition='2015')['ETag']
+        request = self.get_request(HTTP_IF_NONE_MATCH=etag)
+        response = self.view.get(request, code='sample', edition='2015')
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_edition(self):
+        with self.assertRaises(Http404):
+            self.view.get(self.request, code='sample', edition='2000')
@@ -91,6 +91,37 @@ class NotificationsConf(AppConf):
         (ALL_MAILS, _('All emails')),
     )
 
+    # Collect the mails in a digest (summary), sent at most once per interval.
+    NO_DIGEST = 'none'
+    HOURLY_DIGEST = 'hourly'
+    DAILY_DIGEST = 'daily'
+
+    DIGESTS = (
+        (NO_DIGEST, _('Send each email immediately')),
+        (HOURLY_DIGEST, _('Hourly summary')),
+        (DAILY_DIGEST, _('Daily summary')),
+    )
+    # Interval in seconds.
+    DIGEST_INTERVALS = {
+        HOURLY_DIGEST: 60 * 60,
+        DAILY_DIGEST: 24 * 60 * 60,
+    }
+    # Seconds a digest may be sent before its interval is over. The digests
+    # are sent by a cron job which does not run at exactly the same second.
+    DIGEST_TOLERANCE = 5 * 60
+
     TEASER_PAGINATE_BY = 5
     LIST_PAGINATE_BY = 10
+
+    # Number of logs claimed and sent at once by send_notification_mails.
+    MAIL_CHUNK_SIZE = 200
+    # Attempts to send a single mail, reconnecting after each failure.
+    MAIL_SEND_ATTEMPTS = 2
+    # Logs of which no mail could be sent are processed again with the next
+    # run, up to this number of runs.
+    MAIL_MAX_DELIVERY_ATTEMPTS = 5
+
+    # Cached number of unread logs per user (menu badge).
+    CACHE_KEY_UNREAD_COUNT = 'notifications_unread_count'
+    UNREAD_COUNT_CACHE_TIMEOUT = 60 * 60
     SALT = settings.BASE_DIR
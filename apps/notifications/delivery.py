@@ -0,0 +1,366 @@
+"""
+Delivery of the notification mails, see management command
+``send_notification_mails``.
+"""
+import logging
+import smtplib
+from collections import defaultdict
+from datetime import datetime
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.translation import activate, get_language, ngettext
+
+from apps.accounts.models import User
+
+from .conf import settings
+from .models import DigestLog, Log, MailPreferences
+
+logger = logging.getLogger(__name__)
+
+
+class MailDelivery:
+    """
+    Send the mails of all unprocessed logs.
+
+    Logs are claimed in chunks: a short transaction locks the unprocessed logs
+    (logs locked by a concurrent run are skipped) and marks them as
+    processed. The mails are compiled and sent afterwards, without holding any
+    locks, through a single connection which is reused for all mails. The
+    number of sent and failed mails is stored on each log right after its
+    mails are sent.
+
+    Logs of which no mail could be sent (e.g. the mail server is not
+    available, or the mail could not be rendered) are marked as unprocessed
+    again at the end of the run, and retried by the next run (up to
+    NOTIFICATIONS_MAIL_MAX_DELIVERY_ATTEMPTS). Logs with some sent mails are
+    not retried, as this would send the mails twice. Claimed logs which were
+    not handled at all (e.g. the run is aborted by a database error) are
+    marked as unprocessed again as well.
+
+    Logs for users that prefer a digest are not sent, but stored for the
+    next digest (see DigestDelivery).
+    """
+
+    def __init__(self, chunk_size: int = None):
+        self.chunk_size = chunk_size or settings.NOTIFICATIONS_MAIL_CHUNK_SIZE
+        self.digest_logs = []
+        self.failed_log_ids = []
+        # Claimed logs which are not handled yet.
+        self.unfinished_log_ids = set()
+
+    @staticmethod
+    def get_unprocessed_logs():
+        return Log.objects.filter(was_processed=False)
+
+    def claim_logs(self) -> list:
+        """
+        Mark the next chunk of unprocessed logs as processed and return their
+        IDs.
+        """
+        with transaction.atomic():
+            log_ids = list(self.get_unprocessed_logs().select_for_update(
+                skip_locked=True
+            ).order_by(
+                'created'
+            ).values_list(
+                'id', flat=True
+            )[:self.chunk_size])
+            Log.objects.filter(id__in=log_ids).update(was_processed=True)
+        return log_ids
+
+    def run(self):
+        """
+        Send the mails for all unprocessed logs, chunk by chunk. Yield each
+        log once its mails are sent.
+        """
+        connection = get_connection()
+        original_locale = get_language()
+        try:
+            while True:
+                log_ids = self.claim_logs()
+                if not log_ids:
+                    break
+                self.unfinished_log_ids.update(log_ids)
+                yield from self.send_chunk(log_ids, connection)
+        finally:
+            close_connection(connection)
+            activate(original_locale)
+            self.requeue_logs()
+
+    def requeue_logs(self):
+        """
+        Mark the failed and the unfinished logs as unprocessed again.
+        """
+        log_ids = [*self.failed_log_ids, *self.unfinished_log_ids]
+        if log_ids:
+            Log.objects.filter(id__in=log_ids).update(was_processed=False)
+        self.failed_log_ids = []
+        self.unfinished_log_ids = set()
+
+    def send_chunk(self, log_ids: list, connection):
+        logs = list(Log.objects.filter(
+            id__in=log_ids
+        ).select_related(
+            'questionnaire', 'catalyst', 'statusupdate', 'memberupdate',
+            'memberupdate__affected', 'informationupdate'
+        ).order_by(
+            'created'
+        ))
+        recipients = {log.id: log.recipients for log in logs}
+        preferences = self.get_preferences(recipients)
+        pending_log_ids = self.get_pending_log_ids(logs, preferences.values())
+
+        for log in logs:
+            self.digest_logs = []
+            try:
+                messages = list(self.compile_messages(
+                    log=log,
+                    recipients=recipients[log.id],
+                    preferences=preferences,
+                    pending_log_ids=pending_log_ids
+                ))
+            except Exception:
+                logger.exception(
+                    f'Could not compile the mails of log {log.id}.')
+                self.digest_logs = []
+                self.finish_log(log, failed=True)
+                continue
+            log.mails_sent, log.mails_failed = send_messages(
+                messages=messages, connection=connection,
+                description=f'log {log.id}'
+            )
+            self.finish_log(
+                log, failed=bool(log.mails_failed and not log.mails_sent))
+            yield log
+
+    def finish_log(self, log: Log, failed: bool):
+        """
+        Store the results of the log and its entries for the digests. Failed
+        logs are retried with the next run, up to
+        NOTIFICATIONS_MAIL_MAX_DELIVERY_ATTEMPTS.
+        """
+        log.delivery_attempts += 1
+        max_attempts = settings.NOTIFICATIONS_MAIL_MAX_DELIVERY_ATTEMPTS
+        if failed and log.delivery_attempts < max_attempts:
+            self.failed_log_ids.append(log.id)
+        with transaction.atomic():
+            Log.objects.filter(id=log.id).update(
+                mails_sent=log.mails_sent,
+                mails_failed=log.mails_failed,
+                delivery_attempts=log.delivery_attempts
+            )
+            if self.digest_logs:
+                DigestLog.objects.bulk_create(
+                    self.digest_logs, ignore_conflicts=True)
+        self.digest_logs = []
+        self.unfinished_log_ids.discard(log.id)
+
+    @staticmethod
+    def get_preferences(recipients: dict) -> dict:
+        """
+        The mail preferences of all recipients, with one query.
+        """
+        user_ids = {user.id for users in recipients.values() for user in users}
+        return {
+            preferences.user_id: preferences for preferences in
+            MailPreferences.objects.filter(
+                user_id__in=user_ids
+            ).select_related('user')
+        }
+
+    @staticmethod
+    def get_pending_log_ids(logs: list, preferences) -> dict:
+        """
+        The IDs of the pending logs of the chunk, once per recipient that
+        wants to receive mails for pending logs only.
+        """
+        change_log_ids = [log.id for log in logs if log.is_change_log]
+        pending_log_ids = {}
+        for preference in preferences:
+            if preference.subscription == settings.NOTIFICATIONS_TODO_MAILS:
+                pending_log_ids[preference.user_id] = set(
+                    Log.actions.user_pending_list(
+                        user=preference.user
+                    ).filter(
+                        id__in=change_log_ids
+                    ).values_list('id', flat=True)
+                ) if change_log_ids else set()
+        return pending_log_ids
+
+    def compile_messages(self, log: Log, recipients, preferences: dict,
+                         pending_log_ids: dict):
+        """
+        Compile the messages of all recipients, grouped by language.
+        """
+        by_language = defaultdict(list)
+        for recipient in recipients:
+            preference = preferences.get(recipient.id)
+            if not preference or not preference.do_send_mail(
+                    log, pending_log_ids=pending_log_ids.get(recipient.id)):
+                continue
+            if preference.is_digest:
+                self.digest_logs.append(DigestLog(user=recipient, log=log))
+            else:
+                # Avoid the query for the preferences when compiling the mail.
+                recipient.mailpreferences = preference
+                by_language[preference.language].append(recipient)
+
+        for language, language_recipients in by_language.items():
+            activate(language)
+            for recipient in language_recipients:
+                yield log.compile_message_to(recipient=recipient)
+
+
+class DigestDelivery:
+    """
+    Send the digests of all users whose digest is due: one mail per user with
+    all logs collected since the last digest.
+
+    The logs are loaded once for all users, so the parts of the mail which
+    are the same for all recipients (Log.get_shared_mail_data) are rendered
+    once per log and language only.
+    """
+
+    def __init__(self, now: datetime = None):
+        self.now = now or timezone.now()
+
+    def get_due_preferences(self) -> list:
+        return [
+            preferences for preferences in MailPreferences.objects.filter(
+                digest__in=settings.NOTIFICATIONS_DIGEST_INTERVALS.keys(),
+                user__digest_logs__isnull=False
+            ).select_related('user').distinct()
+            if preferences.is_digest_due(self.now)
+        ]
+
+    def run(self) -> int:
+        """
+        Returns the number of sent digests.
+        """
+        preferences = self.get_due_preferences()
+        if not preferences:
+            return 0
+
+        digest_logs = defaultdict(list)
+        for user_id, log_id in DigestLog.objects.filter(
+                user_id__in=[p.user_id for p in preferences]
+        ).values_list('user_id', 'log_id'):
+            digest_logs[user_id].append(log_id)
+        logs = Log.objects.filter(
+            id__in={
+                log_id for log_ids in digest_logs.values()
+                for log_id in log_ids
+            }
+        ).select_related(
+            'questionnaire', 'catalyst', 'statusupdate', 'memberupdate',
+            'memberupdate__affected', 'informationupdate'
+        ).in_bulk()
+
+        connection = get_connection()
+        original_locale = get_language()
+        sent_preferences = []
+        try:
+            for preference in sorted(preferences, key=lambda p: p.language):
+                user_logs = [
+                    logs[log_id] for log_id in digest_logs[preference.user_id]
+                    if log_id in logs
+                ]
+                activate(preference.language)
+                preference.user.mailpreferences = preference
+                message = self.compile_digest_to(preference.user, user_logs)
+                sent, failed = send_messages(
+                    messages=[message], connection=connection,
+                    description=f'digest for user {preference.user_id}'
+                )
+                if sent:
+                    preference.last_digest_sent = self.now
+                    sent_preferences.append(preference)
+        finally:
+            close_connection(connection)
+            activate(original_locale)
+
+        # Only the logs that were sent; logs collected in the meantime are
+        # sent with the next digest.
+        for preference in sent_preferences:
+            DigestLog.objects.filter(
+                user_id=preference.user_id,
+                log_id__in=digest_logs[preference.user_id]
+            ).delete()
+        MailPreferences.objects.bulk_update(
+            sent_preferences, ['last_digest_sent'])
+        return len(sent_preferences)
+
+    @staticmethod
+    def compile_digest_to(recipient: User,
+                          logs: list) -> EmailMultiAlternatives:
+        entries = []
+        for log in logs:
+            context, subject = log.get_shared_mail_data()
+            entries.append({
+                'title': context['title'],
+                'content': context['content'],
+                'questionnaire_url': context['questionnaire_url'],
+            })
+
+        title = ngettext(
+            'Summary of %(count)s notification',
+            'Summary of %(count)s notifications',
+            len(logs)
+        ) % {'count': len(logs)}
+        context = {
+            **Log.get_recipient_mail_context(recipient),
+            'title': title,
+            'content': render_to_string(
+                'notifications/mail/partial/digest.html',
+                context={'entries': entries}
+            ),
+            'base_url': settings.BASE_URL,
+        }
+        message = EmailMultiAlternatives(
+            subject=f'[WOCAT] {title}',
+            body=Log.get_mail_template('plain_text.txt', context=context),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[recipient.email],
+        )
+        message.attach_alternative(
+            content=Log.get_mail_template('html_text.html', context=context),
+            mimetype='text/html'
+        )
+        return message
+
+
+def send_messages(messages: list, connection, description: str) -> tuple:
+    """
+    Returns the number of sent and failed messages. The connection is opened
+    with the first message, and kept open for all further messages. After a
+    failure, the connection is closed and the message is sent again through
+    a new connection, so a broken connection does not fail all further
+    messages.
+    """
+    sent = 0
+    for message in messages:
+        for attempt in range(settings.NOTIFICATIONS_MAIL_SEND_ATTEMPTS):
+            try:
+                connection.open()
+                sent += connection.send_messages([message]) or 0
+                break
+            except (smtplib.SMTPException, OSError):
+                logger.exception(
+                    f'Could not send a mail of {description} '
+                    f'(attempt {attempt + 1}).')
+                close_connection(connection)
+    return sent, len(messages) - sent
+
+
+def close_connection(connection):
+    """
+    Close the connection, also if it is broken. The SMTP backend only opens a
+    new connection if the previous one was closed.
+    """
+    try:
+        connection.close()
+    except (smtplib.SMTPException, OSError):
+        logger.exception('Could not close the mail connection.')
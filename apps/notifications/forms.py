@@ -25,7 +25,7 @@ class MailPreferencesUpdateForm(forms.ModelForm):
 
     class Meta:
         model = MailPreferences
-        fields = ('subscription', 'wanted_actions', 'language', )
+        fields = ('subscription', 'wanted_actions', 'digest', 'language', )
         widgets = {
             'wanted_actions': forms.CheckboxSelectMultiple(choices=(
                 (status, actions_dict[status]) for status in settings.NOTIFICATIONS_EMAIL_PREFERENCES)
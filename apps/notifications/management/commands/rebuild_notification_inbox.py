@@ -0,0 +1,14 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.notifications.models import InboxLog
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the notification inbox of all users from the logs. Required once
+    after the inbox was introduced, and whenever the inbox is out of sync.
+    """
+    def handle(self, **options):
+        for user in get_user_model().objects.all().iterator():
+            InboxLog.objects.rebuild(user=user)
@@ -0,0 +1,20 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from apps.notifications.delivery import DigestDelivery
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Send the digests (summary mails) which are due. Run this command at least
+    once per hour.
+    """
+    def handle(self, **options):
+        count = DigestDelivery().run()
+        logger.info('{date}: sent {count} digests'.format(
+            date=now(), count=count
+        ))
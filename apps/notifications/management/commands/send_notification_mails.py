@@ -4,7 +4,7 @@ from django.core.management.base import BaseCommand
 from django.db import OperationalError
 from django.utils.timezone import now
 
-from apps.notifications.models import Log
+from apps.notifications.delivery import MailDelivery
 
 logger = logging.getLogger(__name__)
 
@@ -18,30 +18,13 @@ class Command(BaseCommand):
         self.is_blocked = False
 
     def handle(self, **options):
-        logs = Log.objects.filter(was_processed=False)
-        for log in self.logged_generator(logs):
-            try:
-                log.send_mails()
-            except OperationalError:
-                self.is_blocked = True
-                logger.info(
-                    '{date}: could not process logs: database blocked by other '
-                    'process.'.format(
-                        date=now()
-                    )
-                )
-
-    def logged_generator(self, logs):
-        """
-        Log start of loop, each step, and end.
-        """
+        delivery = MailDelivery()
         start = now()
         logger.info('{date}: start processing {count} logs'.format(
-            date=start, count=logs.count()
+            date=start, count=delivery.get_unprocessed_logs().count()
         ))
-        for log in logs:
-            yield log
-            if not self.is_blocked:
+        try:
+            for log in delivery.run():
                 logger.info(
                     '{date}: sent log {id} ({action}) for questionnaire '
                     '{questionnaire_code} to {recipients} recipients'.format(
@@ -49,14 +32,17 @@ class Command(BaseCommand):
                         id=log.pk,
                         questionnaire_code=log.questionnaire.code,
                         action=log.get_action_display(),
-                        recipients=len(
-                            [
-                                r for r in log.recipients
-                                if r.mailpreferences.do_send_mail(log)
-                            ]
-                        )
+                        recipients=log.mails_sent
                     )
                 )
+        except OperationalError:
+            self.is_blocked = True
+            logger.info(
+                '{date}: could not process logs: database blocked by other '
+                'process.'.format(
+                    date=now()
+                )
+            )
         end = now()
         delta = end - start
         action = 'finished' if self.is_blocked is False else 'canceled'
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('questionnaire', '0022_auto_20200514_1659'),
+        ('notifications', '0010_auto_20200514_1659'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboxLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.PositiveIntegerField(choices=[(1, 'created questionnaire'), (2, 'deleted questionnaire'), (3, 'changed status'), (4, 'invited member'), (5, 'removed member'), (6, 'edited content'), (7, 'editor finished')])),
+                ('created', models.DateTimeField()),
+                ('is_read', models.BooleanField(default=False)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('is_pending', models.BooleanField(default=False)),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_logs', to='notifications.Log')),
+                ('questionnaire', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='questionnaire.Questionnaire')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_logs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created'],
+                'unique_together': {('user', 'log')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='inboxlog',
+            index=models.Index(fields=['user', 'is_deleted', 'is_read'], name='inbox_user_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inboxlog',
+            index=models.Index(fields=['user', 'is_pending'], name='inbox_user_pending_idx'),
+        ),
+    ]
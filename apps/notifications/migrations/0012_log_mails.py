@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0011_inboxlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='log',
+            name='mails_failed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='log',
+            name='mails_sent',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
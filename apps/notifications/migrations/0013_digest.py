@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notifications', '0012_log_mails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mailpreferences',
+            name='digest',
+            field=models.CharField(choices=[('none', 'Send each email immediately'), ('hourly', 'Hourly summary'), ('daily', 'Daily summary')], default='none', max_length=10, verbose_name='Summary of emails'),
+        ),
+        migrations.AddField(
+            model_name='mailpreferences',
+            name='last_digest_sent',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DigestLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='notifications.Log')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_logs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created'],
+                'unique_together': {('user', 'log')},
+            },
+        ),
+    ]
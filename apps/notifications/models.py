@@ -1,15 +1,18 @@
+import collections
 import functools
 import itertools
 import logging
 import operator
+from datetime import datetime
 
 from django.core import signing
+from django.core.cache import cache
 from django.core.mail import EmailMultiAlternatives
 from django.urls import reverse, reverse_lazy
 from django.db import models, transaction
 from django.db.models import F, Q
 from django.template.loader import render_to_string
-from django.utils.translation import ugettext_lazy as _, get_language, activate
+from django.utils.translation import ugettext_lazy as _, get_language
 from django.utils.functional import cached_property
 
 from apps.accounts.models import User
@@ -29,6 +32,9 @@ class ActionContextQuerySet(models.QuerySet):
     def get_questionnaires_for_permissions(self, user) -> list:
         """
         Create filters for questionnaire statuses according to permissions.
+
+        Memberships are filtered with one subquery per role, so the size of
+        the SQL does not depend on the number of memberships of the user.
         """
         filters = []
         user_permissions = user.get_all_permissions()
@@ -37,15 +43,18 @@ class ActionContextQuerySet(models.QuerySet):
                 filters.append(
                     Q(statusupdate__status=status, action=settings.NOTIFICATIONS_CHANGE_STATUS)
                 )
-        questionnaire_memberships = QuestionnaireMembership.objects.filter(
-            user=user
-        )
-        for membership in questionnaire_memberships:
-            permissions = settings.NOTIFICATIONS_QUESTIONNAIRE_MEMBERSHIP_PERMISSIONS.get(membership.role)
+        memberships = QuestionnaireMembership.objects.filter(user=user)
+        roles = set(memberships.values_list('role', flat=True).distinct())
+        role_permissions = \
+            settings.NOTIFICATIONS_QUESTIONNAIRE_MEMBERSHIP_PERMISSIONS
+        for role in sorted(roles):
+            permissions = role_permissions.get(role)
             if permissions:
                 filters.append(
                     Q(statusupdate__status__in=permissions,
-                      questionnaire=membership.questionnaire)
+                      questionnaire__in=memberships.filter(
+                          role=role
+                      ).values('questionnaire_id'))
                 )
         return filters
 
@@ -60,6 +69,17 @@ class ActionContextQuerySet(models.QuerySet):
           is compiler / editor in which case content edits are listed also
         - notifications that are sent to the current user
         """
+        return self.not_deleted_logs(
+            user=user
+        ).user_visible_logs(
+            user=user
+        )
+
+    def user_visible_logs(self, user: User):
+        """
+        All logs that the user is permitted to see (see: user_log_list),
+        including logs that the user deleted.
+        """
         # construct filters depending on the users permissions.
         status_filters = self.get_questionnaires_for_permissions(user)
         # extend basic filters according to catalyst / subscriber
@@ -67,9 +87,7 @@ class ActionContextQuerySet(models.QuerySet):
             [Q(subscribers=user), Q(catalyst=user)]
         )
 
-        return self.not_deleted_logs(
-            user=user
-        ).filter(
+        return self.filter(
             Q(action__in=settings.NOTIFICATIONS_USER_PROFILE_ACTIONS) |
             Q(action=settings.NOTIFICATIONS_EDIT_CONTENT,
               questionnaire__questionnairemembership__user=user,
@@ -114,7 +132,11 @@ class ActionContextQuerySet(models.QuerySet):
             'id', 'questionnaire_id'
         )
 
-        read_logs = self.read_logs(user=user, log__statusupdate__isnull=False)
+        # Only read logs of the same questionnaires are relevant.
+        read_logs = self.read_logs(
+            user=user, log__statusupdate__isnull=False,
+            log__questionnaire_id__in=logs.values('questionnaire_id')
+        )
         if read_logs.exists():
             # If a log is marked as read, exclude all previous logs for the
             # same questionnaire and the same status from the 'pending'
@@ -235,10 +257,17 @@ class ActionContextQuerySet(models.QuerySet):
         previously existing logs, all logs are removed before the bulk insert.
         """
         self.delete_all_read_logs(user=user)
-        log_ids = self.user_log_list(user=user).values_list('id', flat=True)
+        log_ids = InboxLog.objects.filter(
+            user=user, is_deleted=False
+        ).values_list('log_id', flat=True)
         ReadLog.objects.bulk_create(
             [ReadLog(user=user, log_id=log, is_read=True) for log in log_ids]
         )
+        # Logs that are read are never pending.
+        InboxLog.objects.filter(user=user, is_deleted=False).update(
+            is_read=True, is_pending=False
+        )
+        InboxLog.objects.delete_counters(user.id)
 
     @staticmethod
     def delete_all_read_logs(user: User):
@@ -280,6 +309,10 @@ class Log(models.Model):
     questionnaire = models.ForeignKey(Questionnaire,on_delete=models.CASCADE)
     action = models.PositiveIntegerField(choices=settings.NOTIFICATIONS_ACTIONS)
     was_processed = models.BooleanField(default=False)
+    # Delivery results of the notification mails.
+    mails_sent = models.PositiveIntegerField(default=0)
+    mails_failed = models.PositiveIntegerField(default=0)
+    delivery_attempts = models.PositiveSmallIntegerField(default=0)
 
     objects = models.Manager()
     actions = ActionContextQuerySet.as_manager()
@@ -287,6 +320,11 @@ class Log(models.Model):
     class Meta:
         ordering = ['-created']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Mail data shared by all recipients, per language.
+        self._shared_mail_data = {}
+
     def __str__(self):
         return '{questionnaire}: {action}'.format(
             questionnaire=self.questionnaire.get_name(),
@@ -375,27 +413,6 @@ class Log(models.Model):
             key = self.action
         return settings.NOTIFICATIONS_ACTION_ICON.get(key)
 
-    def send_mails(self) -> None:
-        """
-        Send mails to all recipients, but not compiler and mark log as sent.
-        The log is fetched from the db again, as select_for_update must be in
-        the same method where the sending of the mail happens to prevent double
-        execution.
-        """
-        with transaction.atomic():
-            log = Log.objects.select_for_update(nowait=True).get(id=self.id)
-            if not log.was_processed:
-                original_locale = get_language()
-                for recipient in log.recipients:
-                    if recipient.mailpreferences.do_send_mail(log):
-                        activate(recipient.mailpreferences.language)
-                        message = log.compile_message_to(recipient=recipient)
-                        message.send()
-
-                log.was_processed = True
-                log.save(update_fields=['was_processed'])
-                activate(original_locale)
-
     def get_assigned_users(self):
         """
         Get users linked (assigned) to the questionnaire who will be notified.
@@ -479,9 +496,9 @@ class Log(models.Model):
     def get_affected(self):
         return [self.memberupdate.affected] if hasattr(self, 'memberupdate') else []
 
-    def get_mail_context(self, recipient: User) -> dict:
+    def get_mail_context(self) -> dict:
         # Prepare and return the context used to render both HTML and plain text
-        # mails.
+        # mails. This part of the context is the same for all recipients.
         compilers = self.questionnaire.get_users_by_role(
             settings.QUESTIONNAIRE_COMPILER)
         if compilers:
@@ -500,12 +517,6 @@ class Log(models.Model):
             role = self.memberupdate.role
 
         return {
-            'recipient_name': recipient.get_display_name(),
-            'recipient_url': f'{settings.BASE_URL}{recipient.get_absolute_url()}',
-            'subscription_url': '{base_url}{url}'.format(
-                base_url=settings.BASE_URL,
-                url=recipient.mailpreferences.get_signed_url()
-            ),
             'questionnaire': self.questionnaire,
             'questionnaire_url': f'{settings.BASE_URL}{self.questionnaire.get_absolute_url()}',
             'questionnaire_name': self.get_questionnaire_name_mail(),
@@ -516,10 +527,38 @@ class Log(models.Model):
             'base_url': settings.BASE_URL,
         }
 
+    @staticmethod
+    def get_recipient_mail_context(recipient: User) -> dict:
+        return {
+            'recipient_name': recipient.get_display_name(),
+            'recipient_url': '{base_url}{url}'.format(
+                base_url=settings.BASE_URL, url=recipient.get_absolute_url()
+            ),
+            'subscription_url': '{base_url}{url}'.format(
+                base_url=settings.BASE_URL,
+                url=recipient.mailpreferences.get_signed_url()
+            ),
+        }
+
     def get_mail_data(self, recipient: User) -> tuple:
         # Return a tuple with [0] context (with key "content" containing the
         # dynamic parts of the mail) and [1] subject for the mail.
-        context = self.get_mail_context(recipient)
+        context, subject = self.get_shared_mail_data()
+        recipient_context = self.get_recipient_mail_context(recipient)
+        return {**context, **recipient_context}, subject
+
+    def get_shared_mail_data(self) -> tuple:
+        """
+        The parts of the mail that are the same for all recipients with the
+        same language are rendered only once per language.
+        """
+        language = get_language()
+        if language not in self._shared_mail_data:
+            self._shared_mail_data[language] = self.compile_shared_mail_data()
+        return self._shared_mail_data[language]
+
+    def compile_shared_mail_data(self) -> tuple:
+        context = self.get_mail_context()
 
         # Decide which subject and template to use for the mail. Not very nice,
         # but it works ...
@@ -594,7 +633,6 @@ class Log(models.Model):
             'content': content,
         })
 
-
         return context, f'[WOCAT] {self.questionnaire.get_name()}: {subject}'
 
     def compile_message_to(self, recipient: User) -> EmailMultiAlternatives:
@@ -689,6 +727,300 @@ class ReadLog(models.Model):
         unique_together = ['log', 'user']
 
 
+class InboxLogQuerySet(models.QuerySet):
+    """
+    The inbox is a denormalized copy of the logs as selected by
+    ``Log.actions`` (user_log_list, user_pending_list and the read logs),
+    which are the source of truth. New logs are added to the inbox of their
+    receivers and read logs update the inbox of their user, both with set
+    based queries; only membership changes synchronize the inbox of a single
+    user with the source of truth. Listing and counting the notifications of
+    a user are simple, indexed queries on a single table.
+    """
+
+    def user_inbox(self, user: User):
+        return self.filter(user=user, is_deleted=False)
+
+    def unread_count(self, user: User) -> int:
+        """
+        Number of unread logs, cached per user (menu badge).
+        """
+        cache_key = get_unread_count_cache_key(user.id)
+        count = cache.get(cache_key)
+        if count is None:
+            count = self.user_inbox(user=user).filter(is_read=False).count()
+            cache.set(
+                cache_key, count,
+                timeout=settings.NOTIFICATIONS_UNREAD_COUNT_CACHE_TIMEOUT
+            )
+        return count
+
+    @staticmethod
+    def delete_counters(*user_ids: int):
+        cache.delete_many([
+            get_unread_count_cache_key(user_id) for user_id in user_ids
+        ])
+
+    @staticmethod
+    def get_permitted_users(statuses: set) -> dict:
+        """
+        IDs of the (active) users with permissions for status changes of all
+        questionnaires, per status. One query per status.
+        """
+        permitted = {}
+        for status in statuses:
+            status_permissions = [
+                permission for permission, permission_status in
+                settings.NOTIFICATIONS_QUESTIONNAIRE_STATUS_PERMISSIONS.items()
+                if permission_status == status
+            ]
+            if not status_permissions:
+                permitted[status] = set()
+                continue
+            # Superusers have all permissions.
+            permissions = Q(is_superuser=True)
+            for permission in status_permissions:
+                app_label, codename = permission.split('.')
+                permissions |= Q(
+                    groups__permissions__content_type__app_label=app_label,
+                    groups__permissions__codename=codename
+                ) | Q(
+                    user_permissions__content_type__app_label=app_label,
+                    user_permissions__codename=codename
+                )
+            permitted[status] = set(User.objects.filter(
+                permissions, is_active=True
+            ).values_list('id', flat=True).distinct())
+        return permitted
+
+    def add_logs(self, log_ids: list):
+        """
+        Add new logs to the inbox of their receivers, with a constant number
+        of queries. This applies the rules of ``Log.actions.user_log_list``
+        and ``Log.actions.user_pending_list`` to the new logs only, instead
+        of synchronizing the inbox of all users that may see the
+        questionnaire.
+
+        A new status change is the only pending log of its questionnaire,
+        all previously pending logs of the questionnaire are updated with a
+        single query.
+        """
+        logs = list(Log.objects.filter(id__in=log_ids).values_list(
+            'id', 'questionnaire_id', 'action', 'created', 'catalyst_id',
+            'statusupdate__status', 'questionnaire__status'
+        ).order_by('created', 'id'))
+        if not logs:
+            return
+
+        subscribers = collections.defaultdict(set)
+        for log_id, user_id in Log.subscribers.through.objects.filter(
+                log_id__in=log_ids).values_list('log_id', 'user_id'):
+            subscribers[log_id].add(user_id)
+
+        roles = collections.defaultdict(lambda: collections.defaultdict(set))
+        for questionnaire_id, user_id, role in \
+                QuestionnaireMembership.objects.filter(
+                    questionnaire_id__in={log[1] for log in logs}
+                ).values_list('questionnaire_id', 'user_id', 'role'):
+            roles[questionnaire_id][user_id].add(role)
+
+        permitted = self.get_permitted_users({
+            status for _, _, action, _, _, status, _ in logs
+            if action == settings.NOTIFICATIONS_CHANGE_STATUS
+        })
+
+        # Only the latest status change of a questionnaire may be pending.
+        latest_status_changes = {
+            questionnaire_id: log_id
+            for log_id, questionnaire_id, action, *_ in logs
+            if action == settings.NOTIFICATIONS_CHANGE_STATUS
+        }
+
+        role_permissions = \
+            settings.NOTIFICATIONS_QUESTIONNAIRE_MEMBERSHIP_PERMISSIONS
+        entries = []
+        for log_id, questionnaire_id, action, created, catalyst_id, status, \
+                questionnaire_status in logs:
+            is_status_change = action == settings.NOTIFICATIONS_CHANGE_STATUS
+            log_permitted = permitted.get(status, set()) \
+                if is_status_change else set()
+            receivers = {catalyst_id} | subscribers[log_id] | log_permitted | \
+                set(roles[questionnaire_id].keys())
+            for user_id in receivers:
+                user_roles = roles[questionnaire_id][user_id]
+                if action in settings.NOTIFICATIONS_USER_PROFILE_ACTIONS:
+                    is_listed = True
+                elif action == settings.NOTIFICATIONS_EDIT_CONTENT:
+                    is_listed = bool(user_roles & {
+                        settings.QUESTIONNAIRE_COMPILER,
+                        settings.QUESTIONNAIRE_EDITOR
+                    })
+                else:
+                    is_listed = (
+                        action == settings.NOTIFICATIONS_FINISH_EDITING and
+                        user_id in subscribers[log_id]
+                    )
+                has_status_permission = status is not None and (
+                    user_id in log_permitted or any(
+                        status in role_permissions.get(role, [])
+                        for role in user_roles
+                    )
+                )
+                is_visible = has_status_permission or \
+                    user_id == catalyst_id or user_id in subscribers[log_id]
+                if not (is_listed and is_visible):
+                    continue
+                entries.append(self.model(
+                    user_id=user_id,
+                    log_id=log_id,
+                    questionnaire_id=questionnaire_id,
+                    action=action,
+                    created=created,
+                    is_pending=(
+                        is_status_change and has_status_permission and
+                        status == questionnaire_status and
+                        latest_status_changes[questionnaire_id] == log_id
+                    ),
+                ))
+
+        if latest_status_changes:
+            self.filter(
+                questionnaire_id__in=latest_status_changes.keys(),
+                is_pending=True
+            ).exclude(
+                log_id__in=latest_status_changes.values()
+            ).update(is_pending=False)
+        self.bulk_create(entries, ignore_conflicts=True)
+        self.delete_counters(*{entry.user_id for entry in entries})
+
+    def update_read_state(self, read_log: ReadLog):
+        """
+        Copy the state of a read log to the inbox of its user. A read status
+        change is no longer pending, neither are the previous logs of the
+        same questionnaire (see ``Log.actions.user_pending_list``).
+        """
+        log = read_log.log
+        if not read_log.is_read:
+            # The log may be pending again, which depends on all other logs
+            # of the questionnaire.
+            self.sync(questionnaire_id=log.questionnaire_id,
+                      user_ids=[read_log.user_id])
+            return
+
+        self.filter(user_id=read_log.user_id, log_id=log.id).update(
+            is_read=True, is_deleted=read_log.is_deleted, is_pending=False
+        )
+        status = StatusUpdate.objects.filter(log_id=log.id).values_list(
+            'status', flat=True).first()
+        if status is not None and status == log.questionnaire.status:
+            self.filter(
+                user_id=read_log.user_id,
+                questionnaire_id=log.questionnaire_id,
+                created__lte=log.created,
+                is_pending=True
+            ).update(is_pending=False)
+        self.delete_counters(read_log.user_id)
+
+    def sync(self, questionnaire_id: int, user_ids: list):
+        """
+        Synchronize the inbox of some users for the logs of a questionnaire
+        with the source of truth. This runs the complete queries of
+        ``Log.actions`` per user, use it for single users only (e.g. for
+        membership changes).
+
+        Args:
+            ``questionnaire_id`` (int): The questionnaire of the logs.
+
+            ``user_ids`` (list): Synchronize the inbox of these users.
+        """
+        logs = Log.actions.filter(questionnaire_id=questionnaire_id)
+
+        with transaction.atomic():
+            for user in User.objects.filter(id__in=user_ids):
+                visible = logs.user_visible_logs(user=user).values_list(
+                    'id', 'action', 'created'
+                )
+                pending = set(logs.user_pending_list(user=user).values_list(
+                    'id', flat=True
+                ))
+                read_logs = {
+                    read_log.log_id: read_log for read_log in
+                    ReadLog.objects.filter(user=user, log__in=logs)
+                }
+                entries = self.filter(user=user, log__in=logs)
+                entries.delete()
+                self.bulk_create([
+                    self.model(
+                        user=user,
+                        log_id=log_id,
+                        questionnaire_id=questionnaire_id,
+                        action=action,
+                        created=created,
+                        is_read=getattr(
+                            read_logs.get(log_id), 'is_read', False),
+                        is_deleted=getattr(
+                            read_logs.get(log_id), 'is_deleted', False),
+                        is_pending=log_id in pending,
+                    ) for log_id, action, created in visible
+                ])
+
+        self.delete_counters(*user_ids)
+
+    def rebuild(self, user: User):
+        """
+        Rebuild the complete inbox of a user.
+        """
+        questionnaire_ids = set(Log.actions.user_visible_logs(
+            user=user
+        ).values_list('questionnaire_id', flat=True))
+        questionnaire_ids.update(self.filter(
+            user=user
+        ).values_list('questionnaire_id', flat=True))
+        for questionnaire_id in questionnaire_ids:
+            self.sync(questionnaire_id=questionnaire_id, user_ids=[user.id])
+
+
+def get_unread_count_cache_key(user_id: int) -> str:
+    return f'{settings.NOTIFICATIONS_CACHE_KEY_UNREAD_COUNT}_{user_id}'
+
+
+class InboxLog(models.Model):
+    """
+    A log in the notification inbox of a user. See InboxLogQuerySet.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='inbox_logs'
+    )
+    log = models.ForeignKey(
+        Log, on_delete=models.CASCADE, related_name='inbox_logs'
+    )
+    # Copied from the log, for filtering and ordering without joins.
+    questionnaire = models.ForeignKey(
+        Questionnaire, on_delete=models.CASCADE, related_name='+'
+    )
+    action = models.PositiveIntegerField(choices=settings.NOTIFICATIONS_ACTIONS)
+    created = models.DateTimeField()
+    is_read = models.BooleanField(default=False)
+    is_deleted = models.BooleanField(default=False)
+    is_pending = models.BooleanField(default=False)
+
+    objects = InboxLogQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created']
+        unique_together = ['user', 'log']
+        indexes = [
+            models.Index(
+                fields=['user', 'is_deleted', 'is_read'],
+                name='inbox_user_unread_idx'
+            ),
+            models.Index(
+                fields=['user', 'is_pending'], name='inbox_user_pending_idx'
+            ),
+        ]
+
+
 class MailPreferences(models.Model):
     """
     User preferences for receiving email notifications.
@@ -705,6 +1037,12 @@ class MailPreferences(models.Model):
         max_length=2, choices=settings.LANGUAGES, default=settings.LANGUAGES[0][0]
     )
     has_changed_language = models.BooleanField(default=False)
+    digest = models.CharField(
+        max_length=10, choices=settings.NOTIFICATIONS_DIGESTS,
+        default=settings.NOTIFICATIONS_NO_DIGEST,
+        verbose_name=_('Summary of emails')
+    )
+    last_digest_sent = models.DateTimeField(null=True, blank=True)
 
     def get_defaults(self) -> tuple:
         """
@@ -721,11 +1059,11 @@ class MailPreferences(models.Model):
 
         return subscription, wanted_actions
 
-    def do_send_mail(self, log: Log) -> bool:
+    def do_send_mail(self, log: Log, pending_log_ids=None) -> bool:
         return all([
             self.is_allowed_send_mails,
             self.is_wanted_action(log.action),
-            self.is_todo_log(log)
+            self.is_todo_log(log, pending_log_ids=pending_log_ids)
         ])
 
     def set_defaults(self):
@@ -741,16 +1079,51 @@ class MailPreferences(models.Model):
     def is_wanted_action(self, action: int) -> bool:
         return str(action) in self.wanted_actions.split(',')
 
-    def is_todo_log(self, log: Log):
+    def is_todo_log(self, log: Log, pending_log_ids=None):
         """
-        Implemented like this to make sure to reuse code. Could be better
-        performance-wise, but doesn't really matter as long as mails are sent
-        within a management command.
+        Implemented like this to make sure to reuse code. When sending many
+        mails, the IDs of the pending logs of the user can be passed in
+        (pending_log_ids) instead of querying them for every log.
         """
-        return self.subscription != settings.NOTIFICATIONS_TODO_MAILS or \
-               log.is_change_log and log in Log.actions.user_pending_list(user=self.user)
+        if self.subscription != settings.NOTIFICATIONS_TODO_MAILS:
+            return True
+        if not log.is_change_log:
+            return False
+        if pending_log_ids is not None:
+            return log.id in pending_log_ids
+        return log in Log.actions.user_pending_list(user=self.user)
 
     def get_signed_url(self):
         return reverse_lazy('signed_notification_preferences', kwargs={
             'token': signing.Signer(salt=settings.NOTIFICATIONS_SALT).sign(self.id)
         })
+
+    @property
+    def is_digest(self) -> bool:
+        return self.digest in settings.NOTIFICATIONS_DIGEST_INTERVALS
+
+    def is_digest_due(self, now: datetime) -> bool:
+        if not self.is_digest:
+            return False
+        if self.last_digest_sent is None:
+            return True
+        interval = settings.NOTIFICATIONS_DIGEST_INTERVALS[self.digest]
+        elapsed = (now - self.last_digest_sent).total_seconds()
+        return elapsed >= interval - settings.NOTIFICATIONS_DIGEST_TOLERANCE
+
+
+class DigestLog(models.Model):
+    """
+    A log which is sent to the user with the next digest, see
+    MailPreferences.digest.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='digest_logs'
+    )
+    log = models.ForeignKey(Log, on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created']
+        unique_together = ['user', 'log']
@@ -1,15 +1,17 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth import user_logged_in
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.utils.translation import ugettext_lazy as _
 from django.dispatch import receiver
 
 from apps.accounts.models import User
-from apps.questionnaire.models import Questionnaire
+from apps.questionnaire.models import Questionnaire, QuestionnaireMembership
 from apps.questionnaire import signals
 
-from .models import MailPreferences
-from .utils import ContentLog, MemberLog, StatusLog
+from .models import ContentUpdate, InboxLog, InformationUpdate, \
+    MailPreferences, MemberUpdate, ReadLog, StatusUpdate
+from .utils import BulkMemberLog, BulkStatusLog, ContentLog, MemberLog, \
+    StatusLog
 
 
 @receiver(signals.change_status)
@@ -32,6 +34,21 @@ def modify_member(sender: int, questionnaire: Questionnaire, user: User, affecte
     )
 
 
+@receiver(signals.change_status_bulk)
+def create_status_notifications(sender: int, changes: list, user: User,
+                                **kwargs):
+    BulkStatusLog(
+        sender=user,
+        changes=[{'action': sender, **change} for change in changes]
+    ).create()
+
+
+@receiver(signals.change_member_bulk)
+def modify_members(sender, changes: list, user: User, **kwargs):
+    # The action differs per change (added / removed member).
+    BulkMemberLog(sender=user, changes=changes).create()
+
+
 @receiver(signals.create_questionnaire)
 def create_questionnaire(sender: int, questionnaire: Questionnaire, user: User, **kwargs):
     StatusLog(
@@ -72,3 +89,32 @@ def update_language(sender, request, user, **kwargs):
     if not user.mailpreferences.has_changed_language and hasattr(request, 'LANGUAGE_CODE'):
         user.mailpreferences.language = request.LANGUAGE_CODE
         user.mailpreferences.save()
+
+
+@receiver(signal=post_save, sender=StatusUpdate)
+@receiver(signal=post_save, sender=ContentUpdate)
+@receiver(signal=post_save, sender=MemberUpdate)
+@receiver(signal=post_save, sender=InformationUpdate)
+def add_log_to_inbox(sender, instance, created, **kwargs):
+    if created:
+        InboxLog.objects.add_logs(log_ids=[instance.log_id])
+
+
+@receiver(signal=post_save, sender=ReadLog)
+def update_inbox_read_state(sender, instance, **kwargs):
+    InboxLog.objects.update_read_state(read_log=instance)
+
+
+@receiver(signal=post_save, sender=QuestionnaireMembership)
+@receiver(signal=post_delete, sender=QuestionnaireMembership)
+def sync_inbox_for_membership(sender, instance, **kwargs):
+    # Nothing to synchronize if the membership is deleted along with its
+    # questionnaire or user.
+    origin = kwargs.get('origin')
+    origin_model = getattr(origin, 'model', type(origin))
+    if origin is not None and origin_model is not QuestionnaireMembership:
+        return
+    InboxLog.objects.sync(
+        questionnaire_id=instance.questionnaire_id,
+        user_ids=[instance.user_id]
+    )
@@ -1,15 +1,18 @@
+import re
+from datetime import timedelta
 from unittest.mock import patch, MagicMock
 
 from django.contrib.auth import get_user_model
 from django.db.models import Q
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import activate
 from django.test import override_settings
 from model_mommy import mommy
 from apps.qcat.tests import TestCase
 
-from apps.notifications.models import ActionContextQuerySet, Log, StatusUpdate, \
-    ReadLog, ContentUpdate, MemberUpdate, InformationUpdate
+from apps.notifications.models import ActionContextQuerySet, InboxLog, Log, \
+    StatusUpdate, ReadLog, ContentUpdate, MemberUpdate, InformationUpdate
 from apps.questionnaire.models import Questionnaire, QuestionnaireMembership
 
 
@@ -585,6 +588,156 @@ class LogTest(TestCase):
         self.assertTrue(self.member_log.get_affected())
 
 
+class ManyMembershipsBenchmarkTest(TestCase):
+    """
+    Benchmark for a user with 2000 memberships (e.g. an editor of the
+    secretariat). The filters for memberships must not grow with the number
+    of memberships.
+    """
+    roles = [
+        settings.QUESTIONNAIRE_COMPILER,
+        settings.QUESTIONNAIRE_REVIEWER,
+        settings.QUESTIONNAIRE_PUBLISHER,
+    ]
+
+    def setUp(self):
+        self.user = mommy.make(_model=get_user_model())
+        self.other_user = mommy.make(_model=get_user_model())
+        questionnaire = mommy.make(
+            _model=Questionnaire, status=settings.QUESTIONNAIRE_SUBMITTED
+        )
+        questionnaires = Questionnaire.objects.bulk_create(mommy.prepare(
+            _model=Questionnaire,
+            configuration=questionnaire.configuration,
+            status=settings.QUESTIONNAIRE_SUBMITTED,
+            _quantity=2000
+        ))
+        QuestionnaireMembership.objects.bulk_create([
+            QuestionnaireMembership(
+                questionnaire=questionnaire, user=self.user,
+                role=self.roles[index % len(self.roles)]
+            ) for index, questionnaire in enumerate(questionnaires)
+        ] + [
+            QuestionnaireMembership(
+                questionnaire=questionnaire, user=self.other_user, role=role
+            ) for role in self.roles
+        ])
+        logs = Log.objects.bulk_create([
+            Log(
+                catalyst=self.other_user, questionnaire=questionnaire,
+                action=settings.NOTIFICATIONS_CHANGE_STATUS
+            ) for questionnaire in questionnaires[:99]
+        ])
+        StatusUpdate.objects.bulk_create([
+            StatusUpdate(log=log, status=settings.QUESTIONNAIRE_SUBMITTED)
+            for log in logs
+        ])
+
+    @staticmethod
+    def get_sql(queryset) -> str:
+        # Compare the SQL without the (different) IDs of the users.
+        return re.sub(r'\d+', '', str(queryset.query))
+
+    def test_filters_independent_of_memberships(self):
+        self.assertEqual(
+            len(Log.actions.get_questionnaires_for_permissions(self.user)),
+            len(Log.actions.get_questionnaires_for_permissions(self.other_user))
+        )
+
+    def test_sql_independent_of_memberships(self):
+        # user_pending_list is not compared: it filters by the IDs of the
+        # pending logs, which differ per user.
+        self.assertEqual(
+            self.get_sql(Log.actions.user_log_list(self.user)),
+            self.get_sql(Log.actions.user_log_list(self.other_user))
+        )
+
+    def test_user_log_list(self):
+        # Every third questionnaire is reviewed by the user; only submitted
+        # logs are visible for reviewers.
+        self.assertEqual(Log.actions.user_pending_list(self.user).count(), 33)
+        self.assertEqual(Log.actions.user_log_list(self.user).count(), 33)
+
+
+class InboxLogTest(TestCase):
+
+    def setUp(self):
+        self.catalyst = mommy.make(_model=get_user_model())
+        self.questionnaire = mommy.make(
+            _model=Questionnaire,
+            status=settings.QUESTIONNAIRE_SUBMITTED
+        )
+        self.log = mommy.make(
+            _model=Log,
+            action=settings.NOTIFICATIONS_CHANGE_STATUS,
+            catalyst=self.catalyst,
+            questionnaire=self.questionnaire
+        )
+        mommy.make(
+            _model=StatusUpdate,
+            log=self.log,
+            status=settings.QUESTIONNAIRE_SUBMITTED
+        )
+
+    def test_status_update_syncs_inbox(self):
+        entry = InboxLog.objects.get(user=self.catalyst)
+        self.assertEqual(entry.log, self.log)
+        self.assertEqual(entry.action, settings.NOTIFICATIONS_CHANGE_STATUS)
+        self.assertFalse(entry.is_read)
+
+    def test_new_status_change_replaces_pending_log(self):
+        reviewer = mommy.make(_model=get_user_model())
+        mommy.make(
+            _model=QuestionnaireMembership,
+            questionnaire=self.questionnaire,
+            user=reviewer,
+            role=settings.QUESTIONNAIRE_REVIEWER
+        )
+        self.assertTrue(
+            InboxLog.objects.get(user=reviewer, log=self.log).is_pending
+        )
+        Questionnaire.objects.filter(id=self.questionnaire.id).update(
+            status=settings.QUESTIONNAIRE_REVIEWED
+        )
+        log = mommy.make(
+            _model=Log,
+            action=settings.NOTIFICATIONS_CHANGE_STATUS,
+            catalyst=self.catalyst,
+            questionnaire=self.questionnaire
+        )
+        mommy.make(
+            _model=StatusUpdate,
+            log=log,
+            status=settings.QUESTIONNAIRE_REVIEWED
+        )
+        self.assertFalse(
+            InboxLog.objects.get(user=reviewer, log=self.log).is_pending
+        )
+        self.assertFalse(
+            InboxLog.objects.filter(user=reviewer, log=log).exists()
+        )
+
+    def test_read_log_syncs_inbox(self):
+        mommy.make(
+            _model=ReadLog, user=self.catalyst, log=self.log, is_read=True
+        )
+        self.assertTrue(InboxLog.objects.get(user=self.catalyst).is_read)
+        self.assertEqual(InboxLog.objects.unread_count(user=self.catalyst), 0)
+
+    def test_unread_count_is_cached(self):
+        self.assertEqual(InboxLog.objects.unread_count(user=self.catalyst), 1)
+        with self.assertNumQueries(0):
+            InboxLog.objects.unread_count(user=self.catalyst)
+
+    def test_rebuild(self):
+        InboxLog.objects.all().delete()
+        InboxLog.objects.rebuild(user=self.catalyst)
+        self.assertEqual(
+            list(InboxLog.objects.values_list('user_id', 'log_id')),
+            [(self.catalyst.id, self.log.id)]
+        )
+
+
 class MailPreferencesTest(TestCase):
 
     def setUp(self):
@@ -646,6 +799,28 @@ class MailPreferencesTest(TestCase):
         mock_pending_list.return_value = [MagicMock()]
         self.assertFalse(self.obj.is_todo_log(log))
 
+    def test_is_digest_due(self):
+        now = timezone.now()
+        self.obj.digest = settings.NOTIFICATIONS_HOURLY_DIGEST
+        self.assertTrue(self.obj.is_digest_due(now))
+        self.obj.last_digest_sent = now - timedelta(minutes=30)
+        self.assertFalse(self.obj.is_digest_due(now))
+        self.obj.last_digest_sent = now - timedelta(minutes=60)
+        self.assertTrue(self.obj.is_digest_due(now))
+
+    def test_is_digest_due_cron_jitter(self):
+        # The previous run of the cron job finished a few seconds late.
+        now = timezone.now()
+        self.obj.digest = settings.NOTIFICATIONS_HOURLY_DIGEST
+        self.obj.last_digest_sent = now - timedelta(minutes=59, seconds=50)
+        self.assertTrue(self.obj.is_digest_due(now))
+        self.obj.last_digest_sent = now - timedelta(minutes=50)
+        self.assertFalse(self.obj.is_digest_due(now))
+
+    def test_is_digest_due_no_digest(self):
+        self.obj.digest = settings.NOTIFICATIONS_NO_DIGEST
+        self.assertFalse(self.obj.is_digest_due(timezone.now()))
+
     def test_is_todo_log_other_prefs(self):
         self.obj.subscription = settings.NOTIFICATIONS_ALL_MAILS
         self.assertTrue(self.obj.is_todo_log(MagicMock()))
@@ -1,5 +1,6 @@
 import contextlib
 import itertools
+import smtplib
 from unittest.mock import patch
 
 from django.conf import settings
@@ -9,11 +10,13 @@ from django.core.mail.backends.locmem import EmailBackend
 from django.core.management import call_command
 from django.db import OperationalError
 from django.test import override_settings
+from django.utils import timezone
 
 from model_mommy import mommy
 
 from apps.configuration.models import Configuration
-from apps.notifications.models import MailPreferences, Log
+from apps.notifications.delivery import DigestDelivery, MailDelivery
+from apps.notifications.models import DigestLog, MailPreferences, Log
 from apps.notifications.utils import StatusLog, MemberLog, ContentLog, InformationLog
 from apps.qcat.tests import TestCase
 from apps.questionnaire.models import Questionnaire, QuestionnaireMembership
@@ -122,15 +125,16 @@ class SendMailRecipientMixin(TestCase):
         """
         outbox = []
         with patch.object(EmailBackend, 'send_messages') as mock_send:
+            mock_send.side_effect = len
             call_command('send_notification_mails')
             for call in mock_send.call_args_list:
-                email_obj = call[0][0][0]
-                message = email_obj.message()
-                outbox.append({
-                    'recipient': email_obj.recipients()[0],
-                    'subject': message['Subject'].replace('\n', ''),
-                    'log_id': message['qcat_log']
-                })
+                for email_obj in call[0][0]:
+                    message = email_obj.message()
+                    outbox.append({
+                        'recipient': email_obj.recipients()[0],
+                        'subject': message['Subject'].replace('\n', ''),
+                        'log_id': message['qcat_log']
+                    })
 
             yield outbox
 
@@ -214,6 +218,166 @@ class SettingsMailTest(SendMailRecipientMixin):
 
 
 @override_settings(DO_SEND_STAFF_ONLY=False)
+class SubmittedLogsMixin(SendMailRecipientMixin):
+    """
+    A submitted questionnaire with one status log per compiler.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.questionnaire.status = settings.QUESTIONNAIRE_SUBMITTED
+        self.questionnaire.save()
+        self.questionnaire.add_user(self.reviewer_all, 'reviewer')
+        self.logs = [
+            self.create_log(
+                klass=StatusLog,
+                action=settings.NOTIFICATIONS_CHANGE_STATUS,
+                sender=compiler,
+                is_rejected=False,
+                message='submit',
+                previous_status=settings.QUESTIONNAIRE_DRAFT
+            ) for compiler in self.compilers
+        ]
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class MailDeliveryTest(SubmittedLogsMixin):
+
+    def test_records_results(self):
+        with patch.object(EmailBackend, 'send_messages') as mock_send:
+            mock_send.side_effect = len
+            list(MailDelivery(chunk_size=2).run())
+        sent = sum(len(call[0][0]) for call in mock_send.call_args_list)
+        self.assertGreater(sent, 0)
+        self.assert_no_unsent_logs(3)
+        self.assertEqual(
+            sum(Log.objects.values_list('mails_sent', flat=True)), sent
+        )
+        self.assertFalse(Log.objects.filter(mails_failed__gt=0).exists())
+
+    def test_records_failures(self):
+        with patch.object(EmailBackend, 'send_messages') as mock_send:
+            mock_send.side_effect = smtplib.SMTPException
+            list(MailDelivery().run())
+        self.assertFalse(Log.objects.filter(mails_sent__gt=0).exists())
+        self.assertTrue(Log.objects.filter(mails_failed__gt=0).exists())
+
+    def test_failed_logs_are_retried(self):
+        with patch.object(EmailBackend, 'send_messages') as mock_send:
+            mock_send.side_effect = smtplib.SMTPException
+            list(MailDelivery().run())
+        failed = Log.objects.filter(mails_failed__gt=0)
+        self.assertTrue(failed.exists())
+        self.assertFalse(failed.filter(was_processed=True).exists())
+        self.assertEqual(
+            set(failed.values_list('delivery_attempts', flat=True)), {1}
+        )
+
+    @override_settings(NOTIFICATIONS_MAIL_MAX_DELIVERY_ATTEMPTS=1)
+    def test_failed_logs_are_not_retried_forever(self):
+        with patch.object(EmailBackend, 'send_messages') as mock_send:
+            mock_send.side_effect = smtplib.SMTPException
+            list(MailDelivery().run())
+        self.assert_no_unsent_logs(3)
+
+    @patch.object(EmailBackend, 'close')
+    def test_reconnects_after_failure(self, mock_close):
+        with patch.object(EmailBackend, 'send_messages') as mock_send:
+            mock_send.side_effect = itertools.chain(
+                [smtplib.SMTPServerDisconnected], itertools.repeat(1)
+            )
+            list(MailDelivery().run())
+        mock_close.assert_called()
+        self.assertFalse(Log.objects.filter(mails_failed__gt=0).exists())
+        self.assertGreater(
+            sum(Log.objects.values_list('mails_sent', flat=True)), 0
+        )
+
+    def test_rendering_error_requeues_log(self):
+        failing_log = self.logs[0]
+        compile_message_to = Log.compile_message_to
+
+        def compile_or_fail(log, recipient):
+            if log.id == failing_log.id:
+                raise ValueError
+            return compile_message_to(log, recipient=recipient)
+
+        with patch.object(EmailBackend, 'send_messages') as mock_send, \
+                patch.object(Log, 'compile_message_to', compile_or_fail):
+            mock_send.side_effect = len
+            sent_logs = list(MailDelivery().run())
+        self.assertNotIn(failing_log.id, [log.id for log in sent_logs])
+        failing_log.refresh_from_db()
+        self.assertFalse(failing_log.was_processed)
+        self.assertEqual(failing_log.delivery_attempts, 1)
+        others = Log.objects.exclude(id=failing_log.id)
+        self.assertFalse(others.filter(was_processed=False).exists())
+        self.assertGreater(
+            sum(others.values_list('mails_sent', flat=True)), 0)
+
+    def test_aborted_run_requeues_unfinished_logs(self):
+        with patch('apps.notifications.delivery.send_messages') as mock_send:
+            mock_send.side_effect = [(1, 0), OperationalError]
+            with self.assertRaises(OperationalError):
+                list(MailDelivery().run())
+        # The first log is handled, the other two are claimed again.
+        self.assertEqual(Log.objects.filter(was_processed=False).count(), 2)
+
+    def test_skips_processed_logs(self):
+        Log.objects.update(was_processed=True)
+        self.assertEqual(list(MailDelivery().run()), [])
+
+
+@override_settings(
+    DO_SEND_STAFF_ONLY=False,
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+)
+class DigestDeliveryTest(SubmittedLogsMixin):
+
+    def setUp(self):
+        super().setUp()
+        preferences = self.reviewer_all.mailpreferences
+        preferences.digest = settings.NOTIFICATIONS_DAILY_DIGEST
+        preferences.save()
+
+    def send(self, run) -> list:
+        with patch.object(EmailBackend, 'send_messages') as mock_send:
+            mock_send.side_effect = len
+            run()
+        return [
+            message for call in mock_send.call_args_list
+            for message in call[0][0]
+        ]
+
+    def test_logs_are_collected(self):
+        messages = self.send(lambda: list(MailDelivery().run()))
+        self.assertNotIn(
+            self.reviewer_all.email,
+            [message.to[0] for message in messages]
+        )
+        self.assertEqual(
+            DigestLog.objects.filter(user=self.reviewer_all).count(), 3
+        )
+
+    def test_digest_is_sent(self):
+        self.send(lambda: list(MailDelivery().run()))
+        messages = self.send(DigestDelivery().run)
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0].to, [self.reviewer_all.email])
+        self.assertIn(self.questionnaire.code, messages[0].body)
+        self.assertFalse(DigestLog.objects.exists())
+        self.reviewer_all.mailpreferences.refresh_from_db()
+        self.assertIsNotNone(self.reviewer_all.mailpreferences.last_digest_sent)
+
+    def test_digest_not_due(self):
+        self.send(lambda: list(MailDelivery().run()))
+        self.reviewer_all.mailpreferences.last_digest_sent = timezone.now()
+        self.reviewer_all.mailpreferences.save()
+        self.assertEqual(self.send(DigestDelivery().run), [])
+        self.assertTrue(DigestLog.objects.exists())
+
+
 class PublicationWorkflowMailTest(SendMailRecipientMixin):
     """
     Tests for the typical publication workflow of a questionnaire.
@@ -466,9 +630,9 @@ class SendNotificationMailsTest(TestCase):
             'finished processing logs',
         ], log_calls)
 
-    @patch.object(Log, 'send_mails')
-    def test_log_blocked(self, mock_send_mails, mock_logger):
-        mock_send_mails.side_effect = OperationalError
+    @patch.object(MailDelivery, 'claim_logs')
+    def test_log_blocked(self, mock_claim_logs, mock_logger):
+        mock_claim_logs.side_effect = OperationalError
         mommy.make(
             _model=Log,
         )
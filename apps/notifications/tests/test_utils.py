@@ -1,12 +1,15 @@
 from unittest import mock
 
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from model_mommy import mommy
 from apps.qcat.tests import TestCase
 from apps.questionnaire.models import Questionnaire, QuestionnaireMembership
 
+from apps.notifications.models import InboxLog, Log, StatusUpdate
 from apps.notifications.utils import CreateLog, ContentLog, StatusLog, MemberLog, \
-    InformationLog
+    InformationLog, BulkStatusLog
 
 
 class CreateLogTest(TestCase):
@@ -107,3 +110,64 @@ class InformationUpdateTest(TestCase):
         mock_create.assert_called_once_with(
             log='log', info='foo'
         )
+
+
+class BulkStatusLogTest(TestCase):
+
+    def setUp(self):
+        self.catalyst = mommy.make(_model=get_user_model())
+        self.subscriber = mommy.make(_model=get_user_model())
+        self.questionnaires = mommy.make(
+            _model=Questionnaire, status=2, _quantity=3
+        )
+        for questionnaire in self.questionnaires:
+            for user in [self.catalyst, self.subscriber]:
+                mommy.make(
+                    _model=QuestionnaireMembership,
+                    questionnaire=questionnaire,
+                    user=user
+                )
+
+    def create(self):
+        return BulkStatusLog(sender=self.catalyst, changes=[
+            {'action': 3, 'questionnaire': questionnaire, 'previous_status': 1}
+            for questionnaire in self.questionnaires
+        ]).create()
+
+    def test_creates_logs(self):
+        self.create()
+        self.assertEqual(Log.objects.filter(catalyst=self.catalyst).count(), 3)
+        self.assertEqual(
+            StatusUpdate.objects.filter(status=2, previous_status=1).count(), 3
+        )
+
+    def test_subscribers(self):
+        for log in self.create():
+            self.assertQuerysetEqual(
+                log.subscribers.all(), [self.subscriber.id],
+                transform=lambda user: user.id
+            )
+
+    def count_queries(self, questionnaires: list) -> int:
+        with CaptureQueriesContext(connection) as context:
+            BulkStatusLog(sender=self.catalyst, changes=[
+                {'action': 3, 'questionnaire': questionnaire,
+                 'previous_status': 1}
+                for questionnaire in questionnaires
+            ]).create()
+        return len(context)
+
+    def test_constant_number_of_queries(self):
+        # Including the inboxes of the receivers.
+        self.assertEqual(
+            self.count_queries(self.questionnaires[:1]),
+            self.count_queries(self.questionnaires)
+        )
+
+    def test_adds_logs_to_inboxes(self):
+        logs = self.create()
+        self.assertCountEqual(
+            InboxLog.objects.values_list('user_id', 'log_id'),
+            [(user.id, log.id) for log in logs
+             for user in [self.catalyst, self.subscriber]]
+        )
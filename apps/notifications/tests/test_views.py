@@ -12,8 +12,8 @@ from django.test import RequestFactory
 from braces.views import LoginRequiredMixin
 from django.test import override_settings
 from model_mommy import mommy
-from apps.notifications.models import Log, StatusUpdate, MemberUpdate, ReadLog, \
-    ActionContextQuerySet
+from apps.notifications.models import InboxLog, Log, StatusUpdate, \
+    MemberUpdate, ReadLog
 from apps.notifications.views import LogListView, LogCountView, ReadLogUpdateView, \
     LogQuestionnairesListView, LogInformationUpdateCreateView, \
     LogSubscriptionPreferencesView, SignedLogSubscriptionPreferencesView
@@ -43,6 +43,17 @@ class LogListViewTest(TestCase):
         )
         mommy.make(_model=StatusUpdate, log=self.change_log)
         mommy.make(_model=MemberUpdate, log=member_add_log)
+        self.inbox_user = mommy.make(_model=get_user_model())
+        for log, is_read in [(member_add_log, False), (self.change_log, True)]:
+            mommy.make(
+                _model=InboxLog,
+                user=self.inbox_user,
+                log=log,
+                questionnaire=log.questionnaire,
+                action=log.action,
+                created=log.created,
+                is_read=is_read
+            )
 
     def get_view_with_get_querystring(self, param):
         request = RequestFactory().get(
@@ -54,16 +65,12 @@ class LogListViewTest(TestCase):
     def test_force_login(self):
         self.assertIsInstance(self.view_instance, LoginRequiredMixin)
 
-    def test_queryset_method(self):
-        self.assertEqual(
-            self.view_instance.queryset_method,
-            'user_log_list'
-        )
+    def test_is_pending(self):
+        self.assertFalse(self.view_instance.is_pending)
 
-    def test_queryset_method_pending(self):
-        self.assertEqual(
-            self.get_view_with_get_querystring('is_pending').queryset_method,
-            'user_pending_list'
+    def test_is_pending_querystring(self):
+        self.assertTrue(
+            self.get_view_with_get_querystring('is_pending').is_pending
         )
 
     def test_get_paginate_by(self):
@@ -78,15 +85,22 @@ class LogListViewTest(TestCase):
             settings.NOTIFICATIONS_TEASER_PAGINATE_BY
         )
 
-    @mock.patch('apps.notifications.views.Log.actions.user_log_list')
-    def test_get_queryset(self, mock_actions):
+    @mock.patch('apps.notifications.views.InboxLog.objects.user_inbox')
+    def test_get_queryset(self, mock_user_inbox):
         self.view_instance.get_queryset()
-        mock_actions.assert_called_once_with(user={})
+        mock_user_inbox.assert_called_once_with(user={})
 
-    @mock.patch('apps.notifications.views.Log.actions.user_pending_list')
-    def test_get_queryset_pending(self, mock_actions):
+    @mock.patch('apps.notifications.views.InboxLog.objects.user_inbox')
+    def test_get_queryset_pending(self, mock_user_inbox):
         self.get_view_with_get_querystring('is_pending').get_queryset()
-        mock_actions.assert_called_once_with(user={})
+        mock_user_inbox.return_value.select_related.return_value.filter.\
+            assert_called_once_with(is_pending=True)
+
+    def test_get_queryset_unread(self):
+        self.user = self.inbox_user
+        view = self.get_view_with_get_querystring('is_unread')
+        queryset = view.get_queryset()
+        self.assertEqual([entry.log_id for entry in queryset], [8])
 
     @mock.patch.object(LogListView, 'add_user_aware_data')
     def test_get_context_data_logs(self, mock_add_user_aware_data):
@@ -95,15 +109,8 @@ class LogListViewTest(TestCase):
         mock_add_user_aware_data.assert_called_once_with('foo')
 
     def _test_add_user_aware_data(self):
-        # for faster tests, mock all the elements. elements are created here
-        # as this makes the tests more readable.
-        pth = 'apps.notifications.views.Log.actions'
-        with mock.patch('{}.read_id_list'.format(pth)) as read_id_list:
-            read_id_list.return_value = [42]
-            with mock.patch('{}.user_pending_list'.format(pth)) as pending:
-                pending.values_list.return_value = [8, 42]
-                logs = Log.objects.all()
-                return list(self.view_instance.add_user_aware_data(logs))
+        entries = InboxLog.objects.filter(user=self.inbox_user)
+        return list(self.view_instance.add_user_aware_data(entries))
 
     def test_add_user_aware_data_keys(self):
         data_keys = self._test_add_user_aware_data()[0].keys()
@@ -136,16 +143,16 @@ class LogListViewTest(TestCase):
             {'foo': 'bar', 'result': '42'}
         )
 
-    @mock.patch('apps.notifications.views.Log.actions.user_log_list')
-    def test_status_filter_queryset(self, mock_user_log_list):
-        mock_user_log_list.return_value = []
-        self.assertEqual(
-            [], self.view_instance.get_queryset()
+    def test_status_filter_queryset(self):
+        self.request.user = self.inbox_user
+        self.assertQuerysetEqual(
+            self.view_instance.get_queryset(),
+            [self.change_log.id, 8],
+            transform=lambda item: item.log_id
         )
 
-    @mock.patch('apps.notifications.views.Log.actions.user_log_list')
-    def test_status_filter_queryset_for_status(self, mock_user_log_list):
-        mock_user_log_list.return_value = Log.objects.filter()
+    def test_status_filter_queryset_for_status(self):
+        self.request.user = self.inbox_user
         view = self.view
         view.get_statuses = mock.MagicMock(return_value=[3])
         view_instance = self.setup_view(
@@ -154,7 +161,7 @@ class LogListViewTest(TestCase):
         self.assertQuerysetEqual(
             view_instance.get_queryset(),
             [self.change_log.id],
-            transform=lambda item: item.id
+            transform=lambda item: item.log_id
         )
 
     def test_get_status_invalid(self):
@@ -251,13 +258,13 @@ class LogCountViewTest(TestCase):
             action=settings.NOTIFICATIONS_EDIT_CONTENT,
             _quantity=2
         )
+        InboxLog.objects.rebuild(user=self.request.user)
 
-    @mock.patch('apps.notifications.views.Log.actions.only_unread_logs')
-    def test_get_unread_only(self, mock_only_unread_logs):
+    @mock.patch('apps.notifications.views.InboxLog.objects.unread_count')
+    def test_get_unread_only(self, mock_unread_count):
+        mock_unread_count.return_value = 1
         self.view.get(request=self.request)
-        mock_only_unread_logs.assert_called_once_with(
-            user=self.request.user
-        )
+        mock_unread_count.assert_called_once_with(user=self.request.user)
 
     def test_log_count(self):
         response = self.view.get(request=self.request)
@@ -282,10 +289,10 @@ class LogQuestionnairesListViewTest(TestCase):
         self.request.user = 'foo'
         self.view = self.setup_view(view=LogQuestionnairesListView(), request=self.request)
 
-    @mock.patch.object(ActionContextQuerySet, 'user_log_list')
-    def test_get_questionnaire_logs(self, mock_user_log_list):
+    @mock.patch('apps.notifications.views.InboxLog.objects.user_inbox')
+    def test_get_questionnaire_logs(self, mock_user_inbox):
         self.view.get_questionnaire_logs('foo')
-        mock_user_log_list.assert_called_once_with(user='foo')
+        mock_user_inbox.assert_called_once_with(user='foo')
 
 
     @mock.patch.object(LogQuestionnairesListView, 'get_questionnaire_logs')
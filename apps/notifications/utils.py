@@ -1,8 +1,11 @@
+import abc
+from collections import defaultdict
+
 from apps.accounts.models import User
-from apps.questionnaire.models import Questionnaire
+from apps.questionnaire.models import Questionnaire, QuestionnaireMembership
 
 from .models import Log, StatusUpdate, ContentUpdate, MemberUpdate, \
-    InformationUpdate
+    InformationUpdate, InboxLog
 
 
 class CreateLog:
@@ -88,3 +91,88 @@ class InformationLog(CreateLog):
             log=self.log,
             info=info
         )
+
+
+class BulkLog(abc.ABC):
+    """
+    Create logs for many questionnaires at once, with a constant number of
+    queries. Each change is a dict with the keys 'action' and 'questionnaire',
+    the other keys are passed to the update model (see get_update_fields).
+    """
+    # The model of the updates, e.g. StatusUpdate.
+    update_model = None
+
+    def __init__(self, sender: User, changes: list):
+        self.sender = sender
+        self.changes = changes
+
+    def create(self) -> list:
+        logs = Log.objects.bulk_create([
+            Log(
+                catalyst=self.sender,
+                action=change['action'],
+                questionnaire=change['questionnaire']
+            ) for change in self.changes
+        ])
+        self.add_members(logs)
+        self.update_model.objects.bulk_create([
+            self.update_model(log=log, **self.get_update_fields(change))
+            for log, change in zip(logs, self.changes)
+        ])
+        # bulk_create sends no signals, so the logs are added to the inboxes
+        # here, all at once.
+        InboxLog.objects.add_logs(log_ids=[log.id for log in logs])
+        return logs
+
+    def add_members(self, logs: list):
+        # Add current members as receivers, same as CreateLog.
+        members = defaultdict(set)
+        memberships = QuestionnaireMembership.objects.filter(
+            questionnaire_id__in={log.questionnaire_id for log in logs}
+        ).exclude(
+            user=self.sender
+        ).values_list(
+            'questionnaire_id', 'user_id'
+        )
+        for questionnaire_id, user_id in memberships:
+            members[questionnaire_id].add(user_id)
+
+        subscriber_model = Log.subscribers.through
+        subscriber_model.objects.bulk_create([
+            subscriber_model(log_id=log.id, user_id=user_id)
+            for log in logs for user_id in members[log.questionnaire_id]
+        ])
+
+    @abc.abstractmethod
+    def get_update_fields(self, change: dict) -> dict:
+        """
+        The fields of the update model for a change.
+        """
+
+
+class BulkStatusLog(BulkLog):
+    """
+    Bulk variant of StatusLog.
+    """
+    update_model = StatusUpdate
+
+    def get_update_fields(self, change: dict) -> dict:
+        return {
+            'status': change['questionnaire'].status,
+            'is_rejected': change.get('is_rejected', False),
+            'message': change.get('message', ''),
+            'previous_status': change.get('previous_status'),
+        }
+
+
+class BulkMemberLog(BulkLog):
+    """
+    Bulk variant of MemberLog.
+    """
+    update_model = MemberUpdate
+
+    def get_update_fields(self, change: dict) -> dict:
+        return {
+            'affected': change['affected'],
+            'role': change['role'],
+        }
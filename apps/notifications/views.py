@@ -26,7 +26,7 @@ from apps.questionnaire.view_utils import get_pagination_parameters
 
 from .forms import MailPreferencesUpdateForm
 from .utils import InformationLog
-from .models import Log, ReadLog, MailPreferences
+from .models import InboxLog, Log, ReadLog, MailPreferences
 
 logger = logging.getLogger(__name__)
 
@@ -47,35 +47,28 @@ class LogListView(LoginRequiredMixin, ListView):
     """
     template_name = 'notifications/partial/list.html'
 
-    def add_user_aware_data(self, logs):
+    def add_user_aware_data(self, entries):
         """
         Provide all info required for the template, so as little logic as
         possible is required within the template.
         """
-        # Don't filter out only the logs on display, as running this subquery is very expensive.
-        readlog_list = set(
-            Log.actions.read_id_list(user=self.request.user)
-        )
-
-        for log in logs.iterator():
+        for entry in entries:
+            log = entry.log
             yield {
                 'id': log.id,
                 'created': log.created,
                 'subject': log.notification_subject,
                 'text': log.get_notification_html(user=self.request.user),
                 'action_icon': log.action_icon(),
-                'is_read': log.id in readlog_list,
+                'is_read': entry.is_read,
                 'is_todo': False,
                 'edit_url': '',
                 'next_status_text': False
             }
 
     @property
-    def queryset_method(self):
-        """
-        Get the proper method name according to the GET request.
-        """
-        return 'user_pending_list' if 'is_pending' in self.request.GET.keys() else 'user_log_list'
+    def is_pending(self) -> bool:
+        return 'is_pending' in self.request.GET.keys()
 
     def get_paginate_by(self, queryset) -> int:
         """
@@ -105,10 +98,17 @@ class LogListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         """
-        Fetch notifications for the current user. Use the method as defined by
-        the instance variable. Filter according to questionnaire if requested.
+        Fetch notifications for the current user from the inbox. Filter
+        according to questionnaire if requested.
         """
-        qs = getattr(Log.actions, self.queryset_method)(user=self.request.user)
+        qs = InboxLog.objects.user_inbox(
+            user=self.request.user
+        ).select_related(
+            'log', 'log__questionnaire', 'log__catalyst'
+        )
+
+        if self.is_pending:
+            qs = qs.filter(is_pending=True)
 
         # apply filter for actions ('status' on the frontend)
         statuses = self.get_statuses()
@@ -121,7 +121,7 @@ class LogListView(LoginRequiredMixin, ListView):
 
         # apply filter for read/unread notifications
         if 'is_unread' in self.request.GET.keys():
-            qs = qs.only_unread_logs(user=self.request.user)
+            qs = qs.filter(is_read=False)
 
         return qs
 
@@ -193,11 +193,7 @@ class LogCountView(LoginRequiredMixin, View):
 
     def get(self, request, *args, **kwargs):
         return HttpResponse(
-            content=Log.actions.only_unread_logs(
-                user=self.request.user
-            ).user_log_count(
-                user=self.request.user
-            )
+            content=InboxLog.objects.unread_count(user=self.request.user)
         )
 
 
@@ -209,7 +205,11 @@ class LogTodoView(LoginRequiredMixin, View):
     http_method_names = ['post']
 
     def post(self, request, *args, **kwargs):
-        pending = Log.actions.user_pending_list(user=request.user).values_list('id', flat=True)
+        pending = InboxLog.objects.user_inbox(
+            user=request.user
+        ).filter(
+            is_pending=True
+        ).values_list('log_id', flat=True)
         log_ids = [int(log_id) for log_id in request.POST.getlist('logs[]', [])]
         return HttpResponse(
             content=json.dumps(list(set(pending).intersection(log_ids))),
@@ -228,7 +228,7 @@ class LogQuestionnairesListView(LoginRequiredMixin, View):
         """
         Get all distinct questionnaires that the user has logs for.
         """
-        return Log.actions.user_log_list(
+        return InboxLog.objects.user_inbox(
             user=user
         ).values_list(
             'questionnaire__code', flat=True
@@ -311,6 +311,12 @@ class LogAllReadView(LoginRequiredMixin, View):
         ).update(
             is_deleted=True
         )
+        InboxLog.objects.filter(
+            user=self.request.user, is_read=True
+        ).update(
+            is_deleted=True
+        )
+        InboxLog.objects.delete_counters(self.request.user.id)
 
     def post(self, request, *args, **kwargs):
         if self.request.GET.get('delete', '') == 'true':
@@ -74,6 +74,10 @@ class BaseSettings(Configuration):
     )
 
     MIDDLEWARE = (
+        # First, so the queries of all other middlewares are included.
+        'apps.qcat.middleware.InstrumentationMiddleware',
+        # Before all middlewares which may set cookies.
+        'apps.qcat.middleware.PublicCacheControlMiddleware',
         'django.contrib.sessions.middleware.SessionMiddleware',
         'django.middleware.security.SecurityMiddleware',
         'django.middleware.locale.LocaleMiddleware',
@@ -274,6 +278,17 @@ class BaseSettings(Configuration):
     ES_INDEX_PREFIX = values.Value(default='qcat_', environ_prefix='')
     # For Elasticsearch >= 2.3: https://www.elastic.co/guide/en/elasticsearch/reference/current/breaking-changes-2.3.html  # noqa
     ES_NESTED_FIELDS_LIMIT = values.IntegerValue(default=250, environ_prefix='')
+    # Connections of the client (per process). Requests time out after
+    # ES_TIMEOUT seconds and are retried at most ES_MAX_RETRIES times.
+    ES_MAXSIZE = values.IntegerValue(default=10, environ_prefix='')
+    ES_TIMEOUT = values.IntegerValue(default=10, environ_prefix='')
+    ES_MAX_RETRIES = values.IntegerValue(default=2, environ_prefix='')
+    # After ES_CIRCUIT_BREAKER_THRESHOLD consecutive connection errors, all
+    # requests fail immediately for ES_CIRCUIT_BREAKER_RESET_TIMEOUT seconds.
+    ES_CIRCUIT_BREAKER_THRESHOLD = values.IntegerValue(
+        default=5, environ_prefix='')
+    ES_CIRCUIT_BREAKER_RESET_TIMEOUT = values.IntegerValue(
+        default=30, environ_prefix='')
     # For each language (as set in the setting ``LANGUAGES``), a language
     # analyzer can be specified. This helps to analyze the text in the
     # corresponding language for better search results.
@@ -364,6 +379,12 @@ class BaseSettings(Configuration):
     CACHES = values.DictValue(environ_prefix='')
     KEY_PREFIX = values.Value(environ_prefix='', default='')
 
+    # Conditional GET for public pages: 'max-age' of the Cache-Control header
+    # for anonymous users. The version is part of all ETags; increase it to
+    # invalidate all validators (e.g. after changes to the templates).
+    HTTP_CACHE_MAX_AGE = values.IntegerValue(environ_prefix='', default=60 * 5)
+    HTTP_CACHE_VERSION = values.Value(environ_prefix='', default='1')
+
     # If set to true, the template 503.html is displayed.
     MAINTENANCE_MODE = values.BooleanValue(environ_prefix='', default=False)
     MAINTENANCE_LOCKFILE_PATH = join(BASE_DIR, 'maintenance.lock')
@@ -378,6 +399,21 @@ class BaseSettings(Configuration):
     IS_ACTIVE_FEATURE_MEMORY_PROFILER = values.BooleanValue(
         environ_prefix='', default=False
     )
+    IS_ACTIVE_FEATURE_INSTRUMENTATION = values.BooleanValue(
+        environ_prefix='', default=False
+    )
+    # Number of requests per URL name in the rolling window of the
+    # instrumentation overview.
+    INSTRUMENTATION_WINDOW_SIZE = values.IntegerValue(
+        environ_prefix='', default=500
+    )
+    # Directory for the Prometheus text files (e.g. for the textfile collector
+    # of the node exporter); no files are written if empty.
+    INSTRUMENTATION_PROMETHEUS_PATH = values.Value(
+        environ_prefix='', default='')
+    INSTRUMENTATION_EXPORT_INTERVAL = values.IntegerValue(
+        environ_prefix='', default=60
+    )
 
     HOST_STRING_DEV = values.Value(environ_prefix='')
     HOST_STRING_DEMO = values.Value(environ_prefix='')
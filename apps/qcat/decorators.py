@@ -1,3 +1,4 @@
+import functools
 import inspect
 import logging
 import os
@@ -5,6 +6,9 @@ import psutil
 
 from django.conf import settings
 
+from .utils import get_not_modified_response, is_public_request, \
+    patch_validators
+
 
 logger = logging.getLogger('profile_log')
 
@@ -26,16 +30,16 @@ def log_memory_usage(func):
     def wrapper(*args, **kwargs):
         if settings.IS_ACTIVE_FEATURE_MEMORY_PROFILER:
             django_process = psutil.Process(pid=os.getpid())
-            memory_before = django_process.memory_info().vms
+            memory_before = django_process.memory_info().rss
 
         result = func(*args, **kwargs)
 
         if settings.IS_ACTIVE_FEATURE_MEMORY_PROFILER:
-            increment = django_process.memory_info().vms - memory_before
+            increment = django_process.memory_info().rss - memory_before
 
             if increment:
-                called_from = inspect.stack()[1]
-                callee_module = inspect.getmodule(called_from[0])
+                # inspect.stack() would read the source of all frames.
+                callee_module = inspect.getmodule(inspect.currentframe().f_back)
 
                 # Don't log any params for sensitive vars, the record type should be sufficient.
                 params = callee_module.__name__
@@ -54,3 +58,31 @@ def log_memory_usage(func):
     return wrapper
 
 
+def conditional_public_page(validators):
+    """
+    Conditional GET for pages requested by anonymous users. If the request
+    contains matching conditional headers, a 304 response is returned without
+    calling the view at all. Otherwise, the validators and a public
+    Cache-Control header are added to the response of the view.
+
+    Args:
+        ``validators`` (callable): Called with the same arguments as the view,
+        returns a dict with the key ``etag`` and optionally
+        ``last_modified``. This must be cheap to compute.
+    """
+    def decorator(view_func):
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not is_public_request(request):
+                return view_func(request, *args, **kwargs)
+
+            page_validators = validators(request, *args, **kwargs)
+            response = get_not_modified_response(request, **page_validators)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            return patch_validators(response, **page_validators)
+
+        return wrapper
+
+    return decorator
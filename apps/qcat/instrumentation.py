@@ -0,0 +1,240 @@
+"""
+Opt-in instrumentation of requests (setting
+``IS_ACTIVE_FEATURE_INSTRUMENTATION``).
+
+For each request, the number and duration of SQL queries and elasticsearch
+requests, cache hits and misses, configuration builds, the time spent
+rendering templates and the memory (RSS) of the process are collected. The
+values are aggregated per URL name: a rolling window of the latest requests
+(``INSTRUMENTATION_WINDOW_SIZE``) for the staff overview, and cumulative
+histograms which are written as Prometheus text file to
+``INSTRUMENTATION_PROMETHEUS_PATH``.
+
+All values are collected per process, the Prometheus files contain the pid
+as label.
+"""
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+import psutil
+from django.conf import settings
+
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+HISTOGRAMS = {
+    'duration_seconds': DURATION_BUCKETS,
+    'sql_queries': COUNT_BUCKETS,
+    'sql_seconds': DURATION_BUCKETS,
+    'es_requests': COUNT_BUCKETS,
+    'es_seconds': DURATION_BUCKETS,
+    'template_seconds': DURATION_BUCKETS,
+}
+COUNTERS = ('cache_hits', 'cache_misses', 'configuration_builds')
+
+_current_metrics = contextvars.ContextVar('request_metrics', default=None)
+# The psutil process by pid, created on first use. Workers are forked after
+# this module is imported and must not measure the parent process.
+_processes = {}
+
+
+class RequestMetrics:
+    """
+    The values collected during a single request.
+    """
+
+    def __init__(self):
+        self.values = dict.fromkeys([*HISTOGRAMS, *COUNTERS], 0)
+        self.started = time.perf_counter()
+
+    def add(self, name: str, value=1):
+        self.values[name] += value
+
+    def finish(self) -> dict:
+        self.values['duration_seconds'] = time.perf_counter() - self.started
+        return self.values
+
+
+def start_request() -> contextvars.Token:
+    return _current_metrics.set(RequestMetrics())
+
+
+def finish_request(token: contextvars.Token) -> dict:
+    metrics = _current_metrics.get()
+    _current_metrics.reset(token)
+    return metrics.finish()
+
+
+def record(name: str, value=1):
+    """
+    Add a value to a metric of the current request. Nothing happens if the
+    current request is not instrumented.
+    """
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.add(name, value)
+
+
+def record_cache(hit: bool):
+    record('cache_hits' if hit else 'cache_misses')
+
+
+@contextlib.contextmanager
+def timed(count_name: str, time_name: str):
+    """
+    Count and time the wrapped block.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(count_name)
+        record(time_name, time.perf_counter() - started)
+
+
+def sql_execute_wrapper(execute, sql, params, many, context):
+    """
+    See: https://docs.djangoproject.com/en/3.2/topics/db/instrumentation/
+    """
+    with timed('sql_queries', 'sql_seconds'):
+        return execute(sql, params, many, context)
+
+
+def get_process() -> psutil.Process:
+    pid = os.getpid()
+    process = _processes.get(pid)
+    if process is None:
+        _processes.clear()
+        process = _processes[pid] = psutil.Process(pid=pid)
+    return process
+
+
+def get_rss() -> int:
+    return get_process().memory_info().rss
+
+
+class MetricsRegistry:
+    """
+    Aggregated values of all instrumented requests of this process, per URL
+    name.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(self._new_window)
+        self.histograms = defaultdict(self._new_histograms)
+        self.counters = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        self.rss = 0
+        self.last_export = 0
+
+    @staticmethod
+    def _new_window():
+        return deque(maxlen=settings.INSTRUMENTATION_WINDOW_SIZE)
+
+    @staticmethod
+    def _new_histograms():
+        return {
+            name: {'buckets': [0] * len(buckets), 'count': 0, 'sum': 0}
+            for name, buckets in HISTOGRAMS.items()
+        }
+
+    def add(self, view_name: str, values: dict, rss: int):
+        with self.lock:
+            self.samples[view_name].append(values)
+            self.rss = rss
+            for name, buckets in HISTOGRAMS.items():
+                histogram = self.histograms[view_name][name]
+                histogram['count'] += 1
+                histogram['sum'] += values[name]
+                for index, upper_bound in enumerate(buckets):
+                    if values[name] <= upper_bound:
+                        histogram['buckets'][index] += 1
+            for name in COUNTERS:
+                self.counters[view_name][name] += values[name]
+
+    def get_summary(self) -> dict:
+        """
+        Statistics of the rolling window, per URL name and metric.
+        """
+        with self.lock:
+            samples = {
+                name: list(window) for name, window in self.samples.items()
+            }
+
+        summary = {}
+        for view_name, window in sorted(samples.items()):
+            summary[view_name] = {'requests': len(window)}
+            for name in [*HISTOGRAMS, *COUNTERS]:
+                values = sorted(sample[name] for sample in window)
+                p95_index = min(int(len(values) * 0.95), len(values) - 1)
+                summary[view_name][name] = {
+                    'mean': sum(values) / len(values),
+                    'p50': values[len(values) // 2],
+                    'p95': values[p95_index],
+                    'max': values[-1],
+                }
+        return summary
+
+    def to_prometheus(self) -> str:
+        """
+        All cumulative values in the Prometheus text format.
+        """
+        pid = os.getpid()
+        lines = []
+        with self.lock:
+            for name, buckets in HISTOGRAMS.items():
+                metric = f'qcat_request_{name}'
+                lines.append(f'# TYPE {metric} histogram')
+                for view_name, histograms in sorted(self.histograms.items()):
+                    labels = f'view="{view_name}",pid="{pid}"'
+                    histogram = histograms[name]
+                    count = histogram['count']
+                    for upper_bound, bucket_count in zip(
+                            buckets, histogram['buckets']):
+                        lines.append(
+                            f'{metric}_bucket{{{labels},le="{upper_bound}"}} '
+                            f'{bucket_count}'
+                        )
+                    lines.append(
+                        f'{metric}_bucket{{{labels},le="+Inf"}} {count}')
+                    lines.append(
+                        f'{metric}_sum{{{labels}}} {histogram["sum"]}')
+                    lines.append(f'{metric}_count{{{labels}}} {count}')
+
+            for name in COUNTERS:
+                metric = f'qcat_request_{name}_total'
+                lines.append(f'# TYPE {metric} counter')
+                for view_name, counters in sorted(self.counters.items()):
+                    labels = f'view="{view_name}",pid="{pid}"'
+                    lines.append(f'{metric}{{{labels}}} {counters[name]}')
+
+            lines.append('# TYPE qcat_process_rss_bytes gauge')
+            lines.append(f'qcat_process_rss_bytes{{pid="{pid}"}} {self.rss}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self):
+        """
+        Write the Prometheus file, at most every
+        ``INSTRUMENTATION_EXPORT_INTERVAL`` seconds.
+        """
+        path = settings.INSTRUMENTATION_PROMETHEUS_PATH
+        now = time.monotonic()
+        interval = settings.INSTRUMENTATION_EXPORT_INTERVAL
+        if not path or now - self.last_export < interval:
+            return
+        self.last_export = now
+
+        file_path = os.path.join(path, f'qcat_{os.getpid()}.prom')
+        # Write to a temporary file first; the collector must never read a
+        # partial file.
+        tmp_path = f'{file_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, file_path)
+
+
+registry = MetricsRegistry()
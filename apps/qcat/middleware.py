@@ -1,17 +1,29 @@
+import contextlib
 import os
 import psutil
 import logging
+import time
 
 from django.conf import settings
-from django.core.cache import cache
+from django.db import connections
+
+from . import instrumentation
+from .utils import patch_public_cache_control
 
 
 class StaffFeatureToggleMiddleware:
     """
     Staff members are either logged in, or are making requests from the CDE subnet.
+
+    The result is set as ``request.is_cde_user``, without any I/O. This
+    middleware is not installed.
     """
-    def process_request(self, request):
-        cache.set(key='is_cde_user', value=self.is_cde_user(request=request))
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.is_cde_user = self.is_cde_user(request=request)
+        return self.get_response(request)
 
     def is_cde_user(self, request) -> bool:
         """
@@ -75,4 +87,73 @@ class ProfilerMiddleware:
     def current_memory_usage(self):
         django_process = psutil.Process(pid=os.getpid())
         memory = django_process.memory_info()
-        return memory.vms
+        return memory.rss
+
+
+class PublicCacheControlMiddleware:
+    """
+    Set the Cache-Control header of responses marked as public (see
+    ``patch_validators``). This must be placed before all middlewares which
+    may set cookies (session, CSRF, messages), so their cookies are known.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return patch_public_cache_control(self.get_response(request))
+
+
+class InstrumentationMiddleware:
+    """
+    Collect metrics (sql queries, elasticsearch requests, cache, template
+    rendering, memory) per request and aggregate them per URL name. See
+    ``apps.qcat.instrumentation``.
+
+    Only active if the setting ``IS_ACTIVE_FEATURE_INSTRUMENTATION`` is set.
+    """
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.IS_ACTIVE_FEATURE_INSTRUMENTATION:
+            return self.get_response(request)
+
+        token = instrumentation.start_request()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(
+                        instrumentation.sql_execute_wrapper
+                    ))
+                response = self.get_response(request)
+        finally:
+            values = instrumentation.finish_request(token)
+
+        # Instrumentation must never break the response.
+        try:
+            view_name = request.resolver_match.view_name \
+                if request.resolver_match else 'unresolved'
+            instrumentation.registry.add(
+                view_name=view_name, values=values,
+                rss=instrumentation.get_rss()
+            )
+            instrumentation.registry.export()
+        except Exception as e:
+            self.logger.error(e)
+        return response
+
+    def process_template_response(self, request, response):
+        """
+        Measure the rendering of template responses, which happens right after
+        this hook.
+        """
+        if settings.IS_ACTIVE_FEATURE_INSTRUMENTATION:
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: instrumentation.record(
+                    'template_seconds', time.perf_counter() - started
+                )
+            )
+        return response
@@ -0,0 +1,71 @@
+import os
+from unittest import mock
+
+from apps.qcat import instrumentation
+from apps.qcat.tests import TestCase
+
+
+class RecordTest(TestCase):
+
+    def test_records_values_of_current_request(self):
+        token = instrumentation.start_request()
+        instrumentation.record('sql_queries')
+        instrumentation.record('sql_queries', 2)
+        instrumentation.record_cache(hit=False)
+        values = instrumentation.finish_request(token)
+        self.assertEqual(values['sql_queries'], 3)
+        self.assertEqual(values['cache_misses'], 1)
+        self.assertEqual(values['cache_hits'], 0)
+
+    def test_no_current_request(self):
+        # Must not fail outside of instrumented requests.
+        instrumentation.record('sql_queries')
+
+    def test_timed(self):
+        token = instrumentation.start_request()
+        with instrumentation.timed('es_requests', 'es_seconds'):
+            pass
+        values = instrumentation.finish_request(token)
+        self.assertEqual(values['es_requests'], 1)
+        self.assertGreater(values['es_seconds'], 0)
+
+
+class GetProcessTest(TestCase):
+
+    def test_process_of_current_pid(self):
+        self.assertEqual(instrumentation.get_process().pid, os.getpid())
+
+    @mock.patch('apps.qcat.instrumentation.psutil.Process')
+    def test_new_process_after_fork(self, mock_process):
+        instrumentation._processes.clear()
+        with mock.patch('os.getpid', return_value=1):
+            instrumentation.get_process()
+            instrumentation.get_process()
+        with mock.patch('os.getpid', return_value=2):
+            instrumentation.get_process()
+        self.assertEqual(
+            mock_process.call_args_list, [mock.call(pid=1), mock.call(pid=2)])
+        instrumentation._processes.clear()
+
+
+class MetricsRegistryTest(TestCase):
+
+    def setUp(self):
+        self.registry = instrumentation.MetricsRegistry()
+        for sql_queries in [1, 20, 300]:
+            values = instrumentation.RequestMetrics().finish()
+            values['sql_queries'] = sql_queries
+            self.registry.add(view_name='foo', values=values, rss=1024)
+
+    def test_summary(self):
+        summary = self.registry.get_summary()['foo']
+        self.assertEqual(summary['requests'], 3)
+        self.assertEqual(summary['sql_queries']['p50'], 20)
+        self.assertEqual(summary['sql_queries']['max'], 300)
+
+    def test_prometheus(self):
+        text = self.registry.to_prometheus()
+        self.assertIn('# TYPE qcat_request_sql_queries histogram', text)
+        self.assertIn('le="25"} 2', text)
+        self.assertIn('qcat_request_sql_queries_count{view="foo"', text)
+        self.assertIn('qcat_process_rss_bytes', text)
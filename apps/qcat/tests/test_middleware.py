@@ -0,0 +1,59 @@
+from unittest.mock import MagicMock
+
+from django.http import HttpResponse
+from django.test import override_settings
+from django.test.client import RequestFactory
+
+from apps.qcat.middleware import PublicCacheControlMiddleware, \
+    StaffFeatureToggleMiddleware
+from apps.qcat.tests import TestCase
+from apps.qcat.utils import patch_validators
+
+
+@override_settings(CDE_SUBNET_ADDR='10.0.')
+class StaffFeatureToggleMiddlewareTest(TestCase):
+
+    def setUp(self):
+        self.middleware = StaffFeatureToggleMiddleware(
+            get_response=lambda request: request.is_cde_user
+        )
+
+    def get_request(self, remote_addr='127.0.0.1', is_staff=False):
+        request = RequestFactory().get('/', REMOTE_ADDR=remote_addr)
+        request.user = MagicMock(is_staff=is_staff)
+        return request
+
+    def test_staff(self):
+        request = self.get_request(is_staff=True)
+        self.assertTrue(self.middleware(request))
+        self.assertTrue(request.is_cde_user)
+
+    def test_subnet(self):
+        request = self.get_request(remote_addr='10.0.0.1')
+        self.assertTrue(self.middleware(request))
+
+    def test_other_user(self):
+        request = self.get_request()
+        self.assertFalse(self.middleware(request))
+        self.assertFalse(request.is_cde_user)
+
+
+class PublicCacheControlMiddlewareTest(TestCase):
+
+    def get_response(self, set_cookie=False):
+        def view(request):
+            response = patch_validators(HttpResponse(), etag='"foo"')
+            if set_cookie:
+                # E.g. CsrfViewMiddleware, after the validators were added.
+                response.set_cookie('csrftoken', 'foo')
+            return response
+        middleware = PublicCacheControlMiddleware(get_response=view)
+        return middleware(RequestFactory().get('/'))
+
+    def test_public(self):
+        self.assertIn('public', self.get_response()['Cache-Control'])
+
+    def test_private_with_cookie(self):
+        cache_control = self.get_response(set_cookie=True)['Cache-Control']
+        self.assertIn('private', cache_control)
+        self.assertNotIn('public', cache_control)
@@ -1,7 +1,19 @@
+from datetime import datetime, timezone
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from apps.accounts.tests.test_models import create_new_user
+from apps.qcat.decorators import conditional_public_page
 from apps.qcat.tests import TestCase
 from apps.qcat.utils import (
     find_dict_in_list,
+    get_etag,
     is_empty_list_of_dicts,
+    patch_public_cache_control,
+    patch_validators,
 )
 
 
@@ -79,3 +91,92 @@ class FindDictInListTest(TestCase):
     def test_returns_not_found_if_value_None(self):
         retu = find_dict_in_list(self.l, 'foo', None)
         self.assertEqual(retu, {})
+
+
+class GetEtagTest(TestCase):
+
+    def test_returns_quoted_etag(self):
+        etag = get_etag('foo', 1)
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+
+    def test_different_parts(self):
+        self.assertNotEqual(get_etag('foo', 1), get_etag('foo', 2))
+
+    def test_includes_version(self):
+        etag = get_etag('foo')
+        with override_settings(HTTP_CACHE_VERSION='foo'):
+            self.assertNotEqual(etag, get_etag('foo'))
+
+
+class PatchValidatorsTest(TestCase):
+
+    def setUp(self):
+        self.last_modified = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+    def test_adds_validators(self):
+        response = patch_validators(
+            HttpResponse(), etag='"foo"', last_modified=self.last_modified
+        )
+        self.assertEqual(response['ETag'], '"foo"')
+        self.assertEqual(
+            response['Last-Modified'], 'Wed, 01 Jan 2020 00:00:00 GMT'
+        )
+
+    def test_public(self):
+        response = patch_public_cache_control(
+            patch_validators(HttpResponse(), etag='"foo"')
+        )
+        self.assertIn('public', response['Cache-Control'])
+        self.assertNotIn('private', response['Cache-Control'])
+        self.assertNotIn('no-cache', response['Cache-Control'])
+
+    def test_public_with_cookie(self):
+        response = patch_validators(HttpResponse(), etag='"foo"')
+        response.set_cookie('csrftoken', 'foo')
+        response = patch_public_cache_control(response)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('public', response['Cache-Control'])
+
+    def test_private(self):
+        response = patch_public_cache_control(
+            patch_validators(HttpResponse(), etag='"foo"', public=False)
+        )
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('public', response['Cache-Control'])
+
+    def test_ignores_errors(self):
+        response = patch_validators(HttpResponse(status=404), etag='"foo"')
+        self.assertFalse(response.has_header('ETag'))
+
+
+class ConditionalPublicPageTest(TestCase):
+
+    def setUp(self):
+        self.view = conditional_public_page(
+            lambda request: {'etag': '"foo"', 'last_modified': None}
+        )(lambda request: HttpResponse('content'))
+
+    def get_request(self, user, **headers):
+        request = RequestFactory().get('/', **headers)
+        request.user = user
+        return request
+
+    def test_not_modified(self):
+        response = self.view(
+            self.get_request(AnonymousUser(), HTTP_IF_NONE_MATCH='"foo"')
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_modified(self):
+        response = self.view(
+            self.get_request(AnonymousUser(), HTTP_IF_NONE_MATCH='"bar"')
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"foo"')
+
+    def test_logged_in_user(self):
+        response = self.view(
+            self.get_request(create_new_user(), HTTP_IF_NONE_MATCH='"foo"')
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
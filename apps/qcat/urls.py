@@ -40,6 +40,7 @@ urlpatterns += i18n_patterns(
     url(r'^configuration', include(('apps.configuration.urls','configuration'), namespace='configuration')),
     url(r'^notifications/', include('apps.notifications.urls')),
     url(r'^qcat/facts_teaser', views.FactsTeaserView.as_view(), name='facts_teaser'),
+    url(r'^qcat/instrumentation/$', views.instrumentation, name='instrumentation'),
     url(r'^questionnaire/', include('apps.questionnaire.urls')),
     url(r'^search/', include(('apps.search.urls','search'), namespace='search')),
     url(r'^samplemulti/', include(('apps.samplemulti.urls','search'), namespace='samplemulti')),
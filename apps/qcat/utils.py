@@ -1,4 +1,12 @@
+import hashlib
 import urllib
+from datetime import datetime
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, \
+    patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.utils.translation import get_language
 
 
 def find_dict_in_list(list_, key, value, not_found=None):
@@ -74,3 +82,88 @@ def url_with_querystring(path, **kwargs):
         ``str``. A URL with query strings.
     """
     return path + '?' + urllib.parse.urlencode(kwargs)
+
+
+def get_etag(*parts) -> str:
+    """
+    Create a (quoted) ETag from the given parts. The current language and the
+    version as set in the settings (``HTTP_CACHE_VERSION``) are always part of
+    the ETag.
+
+    Returns:
+        ``str``. The quoted ETag.
+    """
+    value = '-'.join(
+        str(part) for part in
+        (settings.HTTP_CACHE_VERSION, get_language(), *parts)
+    )
+    return quote_etag(hashlib.md5(value.encode('utf-8')).hexdigest())
+
+
+def is_public_request(request) -> bool:
+    """
+    Only safe requests of anonymous users are answered with validators and
+    made cacheable, content for logged in users may differ per user.
+    """
+    return request.method in ('GET', 'HEAD') and \
+        not request.user.is_authenticated
+
+
+def get_not_modified_response(request, etag: str = None,
+                              last_modified: datetime = None):
+    """
+    Check the conditional headers (``If-None-Match``, ``If-Modified-Since``)
+    of the request against the validators. Call this before doing any
+    expensive work.
+
+    Returns:
+        ``HttpResponse`` (304) if the resource was not modified, ``None``
+        otherwise.
+    """
+    return get_conditional_response(
+        request, etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None
+    )
+
+
+def patch_validators(response, etag: str = None,
+                     last_modified: datetime = None, public: bool = True):
+    """
+    Add the validators and the Cache-Control header to a successful response.
+    Public responses may be cached by shared caches (nginx) for
+    ``HTTP_CACHE_MAX_AGE`` seconds, all other responses must be revalidated.
+
+    Whether a public response is really cacheable depends on the cookies it
+    sets (e.g. the CSRF cookie), which are only known after all middlewares
+    processed it. Public responses are therefore only marked here, the header
+    is set by ``PublicCacheControlMiddleware`` (see
+    ``patch_public_cache_control``).
+    """
+    if response.status_code not in (200, 304) or response.streaming:
+        return response
+
+    if etag and not response.has_header('ETag'):
+        response['ETag'] = etag
+    if last_modified and not response.has_header('Last-Modified'):
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+
+    response.is_public = public
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie', ))
+    return response
+
+
+def patch_public_cache_control(response):
+    """
+    Make a response which was marked as public by ``patch_validators``
+    cacheable by shared caches, unless it sets any cookies.
+    """
+    if not getattr(response, 'is_public', False) or response.cookies:
+        return response
+
+    if response.has_header('Cache-Control'):
+        del response['Cache-Control']
+    patch_cache_control(
+        response, public=True, max_age=settings.HTTP_CACHE_MAX_AGE
+    )
+    return response
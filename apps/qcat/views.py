@@ -6,7 +6,9 @@ import requests
 from django.conf import settings
 from django.contrib import sitemaps
 from django.contrib.auth import get_user_model
-from django.http import HttpResponseRedirect
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.urls import reverse, reverse_lazy
 from django.shortcuts import render
 from django.utils.decorators import method_decorator
@@ -16,6 +18,7 @@ from django.views.generic import TemplateView
 from requests.exceptions import RequestException
 
 from apps.questionnaire.models import Questionnaire, QuestionnaireMembership
+from .instrumentation import registry
 
 logger = logging.getLogger(__name__)
 
@@ -189,3 +192,23 @@ class AdminLoginView(TemplateView):
         Assuming the name of the external system's login url is "login"
         """
         return HttpResponseRedirect(reverse('accounts:login'))
+
+
+@login_required
+def instrumentation(request):
+    """
+    Staff only: the metrics of the instrumented requests of the current
+    process, aggregated per URL name. Use ``?format=prometheus`` for the
+    Prometheus text format.
+    """
+    if request.user.is_staff is not True:
+        raise PermissionDenied()
+
+    if request.GET.get('format') == 'prometheus':
+        return HttpResponse(
+            registry.to_prometheus(), content_type='text/plain; version=0.0.4'
+        )
+    return JsonResponse({
+        'is_active': settings.IS_ACTIVE_FEATURE_INSTRUMENTATION,
+        'views': registry.get_summary(),
+    })
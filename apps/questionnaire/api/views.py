@@ -4,7 +4,6 @@ import logging
 from django.core.paginator import EmptyPage
 from django.http import Http404
 from django.utils.translation import get_language
-from django.shortcuts import get_list_or_404
 from django.db.models import Q
 from django.utils import timezone
 
@@ -22,13 +21,17 @@ from PIL import Image
 
 from apps.questionnaire.serializers import QuestionnaireInputSerializer
 from apps.questionnaire.utils import validate_questionnaire_data, is_valid_questionnaire_format, compare_questionnaire_data
-from apps.configuration.structure import ConfigurationStructure
 from apps.api.views import LogEditAPIMixin, AppPermissionMixin
 from apps.configuration.cache import get_configuration
+from apps.configuration.models import Configuration
 from apps.api.views import LogUserMixin, PermissionMixin
 from apps.configuration.configured_questionnaire import ConfiguredQuestionnaire
+from apps.qcat.utils import get_etag, get_not_modified_response, \
+    patch_validators
 from apps.questionnaire.views import ESQuestionnaireQueryMixin
 from apps.search.search import get_element
+from apps.search.utils import get_index_generation
+from ..cache import get_details_generation
 from ..conf import settings
 from ..models import Questionnaire, APIEditRequests, File
 from ..utils import get_list_values, get_questionnaire_data_in_single_language
@@ -243,12 +246,42 @@ class QuestionnaireDetailView(QuestionnaireAPIMixin):
         in the method 'replace_keys'.
         """
         self.object = self.get_current_object()
+        validators = self.get_validators()
+        response = get_not_modified_response(request, **validators)
+        if response is not None:
+            return self.add_validators(response, **validators)
+
         # Get the single element from ES.
         es_hit = get_element(questionnaire=self.object)
         if not es_hit:
             raise Http404
 
-        return Response(self.replace_keys(es_hit={'_source': es_hit}))
+        return self.add_validators(
+            Response(self.replace_keys(es_hit={'_source': es_hit})),
+            **validators
+        )
+
+    def get_validators(self) -> dict:
+        """
+        The response only contains public data, so it is the same for all
+        users. Validators are checked only after the authentication. As for
+        the details page, there is no Last-Modified validator: the response
+        changes with the generations, not only with the updated timestamp.
+        """
+        return {
+            'etag': get_etag(
+                self.request.version, self.request.get_full_path(),
+                self.request.META.get('HTTP_ACCEPT', ''), self.object.id,
+                self.object.updated.timestamp(), get_index_generation(),
+                get_details_generation(self.object.code)
+            ),
+        }
+
+    def add_validators(self, response, **validators):
+        return patch_validators(
+            response, public=not self.request.user.is_authenticated,
+            **validators
+        )
 
 
 class ConfiguredQuestionnaireDetailView(QuestionnaireDetailView):
@@ -297,8 +330,16 @@ class ConfiguredQuestionnaireDetailView(QuestionnaireDetailView):
 
     def get(self, request, *args, **kwargs):
         self.object = self.get_current_object()
+        validators = self.get_validators()
+        response = get_not_modified_response(request, **validators)
+        if response is not None:
+            return self.add_validators(response, **validators)
+
         prepared_data = self.prepare_data()
-        return Response(self.get_configured_questionnaire(**prepared_data))
+        return self.add_validators(
+            Response(self.get_configured_questionnaire(**prepared_data)),
+            **validators
+        )
 
 
 class QuestionnaireCreateNew(CreateModelMixin, AppPermissionMixin, LogEditAPIMixin, GenericAPIView):
@@ -336,9 +377,8 @@ class QuestionnaireCreateNew(CreateModelMixin, AppPermissionMixin, LogEditAPIMix
         request_edition = kwargs['edition']
 
         # Validate configuration exists for code and edition
-        structure_obj = ConfigurationStructure(code=request_code, edition=request_edition,)
-
-        if structure_obj.error:
+        if not Configuration.has_edition(
+                code=request_code, edition=request_edition):
             # No configuration found for this code and edition.
             return Response({'detail': 'No configuration found for this code and edition.'},
                             status=status.HTTP_404_NOT_FOUND)
@@ -389,6 +429,30 @@ class QuestionnaireEdit(AppPermissionMixin, LogEditAPIMixin, GenericAPIView):
 
     serializer_class = QuestionnaireInputSerializer
 
+    @staticmethod
+    def get_latest_version(identifier: str) -> Questionnaire:
+        """
+        The latest (not deleted) version of the questionnaire, in a single
+        query.
+        """
+        questionnaire = Questionnaire.with_status.not_deleted().filter(
+            code=identifier
+        ).select_related('configuration').order_by('-version').first()
+        if questionnaire is None:
+            raise Http404()
+        return questionnaire
+
+    @staticmethod
+    def matches_configuration(
+            questionnaire: Questionnaire, code: str, edition: str) -> bool:
+        configuration = questionnaire.configuration
+        return (configuration.code, configuration.edition) == (code, edition)
+
+    def get_user_role(self, questionnaire: Questionnaire) -> str:
+        return questionnaire.questionnairemembership_set.filter(
+            user=self.request.user
+        ).values_list('role', flat=True).first() or ''
+
     def get(self, request, *args, **kwargs):
         """
         Get a Questionnaire by its identifier for API v2.
@@ -408,36 +472,24 @@ class QuestionnaireEdit(AppPermissionMixin, LogEditAPIMixin, GenericAPIView):
         request_identifier = kwargs['identifier']
 
         # Validate configuration exists for code and edition
-        structure_obj = ConfigurationStructure(code=request_code, edition=request_edition, )
-
-        if structure_obj.error:
+        if not Configuration.has_edition(
+                code=request_code, edition=request_edition):
             # No configuration found for this code and edition.
             return Response({'detail': 'No configuration found for this configuration code and edition.'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        # Fetch all questionnaire versions for the identifier
-        questionnaire_all = get_list_or_404(Questionnaire.with_status.not_deleted(), code=request_identifier)
-        # questionnaire = Questionnaire.with_status.not_deleted().filter(code=request_identifier).latest('version')
-
-        # Use the latest version of the questionnaire if more than one version exists
-        questionnaire = sorted(questionnaire_all, key=lambda x: x.version, reverse=True)[0]
-        if questionnaire is None:
-            # No questionnaire exists or is deleted
-            # - this is a redundant check...
-            raise Http404()
+        # Fetch the latest version of the questionnaire
+        questionnaire = self.get_latest_version(request_identifier)
 
         # Check configuration matches
-        if not questionnaire.configuration_object == get_configuration(code=request_code, edition=request_edition):
+        if not self.matches_configuration(
+                questionnaire, request_code, request_edition):
             # Configuration mismatch
             return Response({'detail': 'Questionnaire does not match configuration code and edition.'},
                             status=status.HTTP_400_BAD_REQUEST)
 
         # Get request user's role in this questionnaire
-        request_user_role = ''
-        for user_role, user in questionnaire.get_users():
-            if user == request.user:
-                request_user_role = user_role
-                break
+        request_user_role = self.get_user_role(questionnaire)
 
         if not request_user_role:
             # User has no role on this questionnaire
@@ -507,9 +559,8 @@ class QuestionnaireEdit(AppPermissionMixin, LogEditAPIMixin, GenericAPIView):
         request_identifier = kwargs['identifier']
 
         # Validate configuration exists for code and edition
-        structure_obj = ConfigurationStructure(code=request_code, edition=request_edition, )
-
-        if structure_obj.error:
+        if not Configuration.has_edition(
+                code=request_code, edition=request_edition):
             # No configuration found for this code and edition.
             return Response({'detail': 'No configuration found for this configuration code and edition.'},
                             status=status.HTTP_400_BAD_REQUEST)
@@ -520,16 +571,8 @@ class QuestionnaireEdit(AppPermissionMixin, LogEditAPIMixin, GenericAPIView):
             return Response({'detail': 'Must fetch questionnaire data before submitting edits.'},
                             status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
-        # Fetch all questionnaire versions for the identifier
-        questionnaire_all = get_list_or_404(Questionnaire.with_status.not_deleted(), code=request_identifier)
-        # questionnaire = Questionnaire.with_status.not_deleted().filter(code=request_identifier).latest('version')
-
-        # Use the latest version of the questionnaire if more than one version exists
-        questionnaire = sorted(questionnaire_all, key=lambda x: x.version, reverse=True)[0]
-        if questionnaire is None:
-            # No questionnaire exists or is deleted
-            # - this is a redundant check...
-            raise Http404()
+        # Fetch the latest version of the questionnaire
+        questionnaire = self.get_latest_version(request_identifier)
 
         # Fetch a the configuration
         request_config = get_configuration(code=request_code, edition=request_edition)
@@ -543,17 +586,14 @@ class QuestionnaireEdit(AppPermissionMixin, LogEditAPIMixin, GenericAPIView):
             return Response({'detail': err}, status=status.HTTP_406_NOT_ACCEPTABLE)
 
         # Check configuration matches
-        if questionnaire.configuration_object != request_config:
+        if not self.matches_configuration(
+                questionnaire, request_code, request_edition):
             # Configuration mismatch
             return Response({'detail': 'Questionnaire does not match configuration code and edition.'},
                             status=status.HTTP_400_BAD_REQUEST)
 
         # Get request user's role in this questionnaire
-        request_user_role = ''
-        for user_role, user in questionnaire.get_users():
-            if user == request.user:
-                request_user_role = user_role
-                break
+        request_user_role = self.get_user_role(questionnaire)
 
         if not request_user_role:
             # User has no role on this questionnaire
@@ -701,9 +741,15 @@ class QuestionnaireMyData(AppPermissionMixin, LogEditAPIMixin, GenericAPIView):
                                 ])
         )
 
-        # All the public/draft questionnaires for the request.user are fetched
+        # All the public/draft questionnaires for the request.user are fetched.
+        # Only the columns required for the list are selected, the metadata
+        # (members, translations, flags) is not part of the response.
         query = Questionnaire.with_status.not_deleted()\
             .filter(status_filter)\
+            .select_related('configuration')\
+            .only('id', 'code', 'data', 'created', 'updated', 'status',
+                  'configuration', 'configuration__code',
+                  'configuration__edition')\
             .order_by('code', '-updated') \
             .distinct('code')
 
@@ -738,37 +784,17 @@ class QuestionnaireMyData(AppPermissionMixin, LogEditAPIMixin, GenericAPIView):
                 if key.endswith('_definition') or key.endswith('_description'):
                     del questionnaire_data[key]
 
-            # Metadata is fetched and appended
-            questionnaire_data.update(obj.get_metadata())
-
-            # Questionnaire edition is added
-            if 'configuration' in questionnaire_data:
-                questionnaire_data.update({'edition': questionnaire_data['configuration'].edition})
-
-            # Extra attributes are removed
-            if 'status' in questionnaire_data:
-                del questionnaire_data['status']
-
-            if 'compilers' in questionnaire_data:
-                del questionnaire_data['compilers']
-
-            if 'reviewers' in questionnaire_data:
-                del questionnaire_data['reviewers']
-
-            if 'editors' in questionnaire_data:
-                del questionnaire_data['editors']
-
-            if 'configuration' in questionnaire_data:
-                del questionnaire_data['configuration']
-
-            if 'translations' in questionnaire_data:
-                del questionnaire_data['translations']
-
-            if 'flags' in questionnaire_data:
-                del questionnaire_data['flags']
-
-            if 'original_locale' in questionnaire_data:
-                del questionnaire_data['original_locale']
+            # Metadata is appended, other metadata attributes are removed
+            questionnaire_data.update({
+                'created': obj.created,
+                'updated': obj.updated,
+                'code': obj.code,
+                'edition': obj.configuration.edition,
+            })
+            for key in ['status', 'compilers', 'reviewers', 'editors',
+                        'configuration', 'translations', 'flags',
+                        'original_locale']:
+                questionnaire_data.pop(key, None)
 
             # Status attribute is added as a string and the last attribute
             questionnaire_data.update({'status': obj.get_status_display().lower()})
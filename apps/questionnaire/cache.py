@@ -0,0 +1,231 @@
+import hashlib
+from typing import Optional
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.utils.translation import get_language
+
+from apps.qcat.instrumentation import record_cache
+from apps.search.utils import get_index_generation
+
+from .conf import settings
+
+
+def get_details_generation(code: str) -> str:
+    """
+    Return the current 'generation' of the rendered details of all versions
+    of a questionnaire. The generation is part of the fragment cache key, so
+    changing it invalidates all cached fragments (all versions, editions,
+    languages and view modes) for given code at once.
+    """
+    generation_key = '{prefix}_{code}'.format(
+        prefix=settings.QUESTIONNAIRE_CACHE_KEY_DETAILS_GENERATION, code=code)
+    generation = cache.get(generation_key)
+    if generation is None:
+        generation = uuid4().hex
+        cache.set(generation_key, generation, timeout=None)
+    return generation
+
+
+def invalidate_details(*codes: str) -> None:
+    """
+    Invalidate the rendered details of the questionnaires with given codes.
+    """
+    for code in set(codes):
+        if code:
+            cache.delete(
+                f'{settings.QUESTIONNAIRE_CACHE_KEY_DETAILS_GENERATION}_{code}'
+            )
+
+
+def get_filters_generation() -> str:
+    """
+    The 'generation' of the cached filter scaffolding (choices of the global
+    and advanced filters). It is changed whenever projects, institutions,
+    flags or configurations change.
+    """
+    generation = cache.get(settings.QUESTIONNAIRE_CACHE_KEY_FILTERS_GENERATION)
+    if generation is None:
+        generation = uuid4().hex
+        cache.set(
+            settings.QUESTIONNAIRE_CACHE_KEY_FILTERS_GENERATION, generation,
+            timeout=None
+        )
+    return generation
+
+
+def invalidate_filters() -> None:
+    cache.delete(settings.QUESTIONNAIRE_CACHE_KEY_FILTERS_GENERATION)
+
+
+def get_cached_filters(name: str, build_filters, code: str, edition: str = ''):
+    """
+    Return filter scaffolding from the cache. The key is composed as:
+    ``[prefix]_[name]_[code]_[edition]_[locale]_[generation]``
+
+    Args:
+        ``name`` (str): The name of the cached value.
+
+        ``build_filters`` (callable): Returns the value if not cached yet.
+
+        ``code`` (str): The code of the configuration.
+
+        ``edition`` (str): The edition of the configuration.
+    """
+    cache_key = '{prefix}_{name}_{code}_{edition}_{locale}_{generation}'.format(
+        prefix=settings.QUESTIONNAIRE_CACHE_KEY_FILTERS,
+        name=name,
+        code=code,
+        edition=edition,
+        locale=get_language(),
+        generation=get_filters_generation(),
+    )
+    filters = cache.get(cache_key)
+    record_cache(hit=filters is not None)
+    if filters is None:
+        filters = build_filters()
+        cache.set(
+            cache_key, filters,
+            timeout=settings.QUESTIONNAIRE_FILTERS_CACHE_TIMEOUT
+        )
+    return filters
+
+
+def get_list_page_cache_key(search_params: dict) -> str:
+    """
+    The key of a page of elasticsearch results, composed of the hashed search
+    parameters (filters, offset, limit, ...) and the generation of the index.
+    """
+    hashed_params = hashlib.sha1(
+        repr(sorted(search_params.items())).encode('utf-8')).hexdigest()
+    return '{prefix}_{params}_{generation}'.format(
+        prefix=settings.QUESTIONNAIRE_CACHE_KEY_LIST_PAGE,
+        params=hashed_params,
+        generation=get_index_generation(),
+    )
+
+
+def get_prefetched_list_page(search_params: dict) -> Optional[dict]:
+    page = cache.get(get_list_page_cache_key(search_params))
+    record_cache(hit=page is not None)
+    return page
+
+
+def set_prefetched_list_page(search_params: dict, page: dict) -> None:
+    cache.set(
+        get_list_page_cache_key(search_params), page,
+        timeout=settings.QUESTIONNAIRE_LIST_PAGE_CACHE_TIMEOUT
+    )
+
+
+def get_list_cache_key(view_name: str, configuration, request) -> str:
+    """
+    Key for the rendered parts of a list view. The query parameters (filters,
+    search query, page, ...) are normalized and hashed. The key is composed
+    as:
+    ``[prefix]_[view_name]_[code]_[edition]_[ajax]_[locale]_[query]_``
+    ``[index generation]_[filters generation]``
+    """
+    query = sorted(request.GET.lists())
+    return (
+        '{prefix}_{view_name}_{code}_{edition}_{ajax}_{locale}_{query}_'
+        '{index_generation}_{filters_generation}'
+    ).format(
+        prefix=settings.QUESTIONNAIRE_CACHE_KEY_LIST,
+        view_name=view_name,
+        code=configuration.keyword,
+        edition=configuration.edition,
+        ajax=int(request.is_ajax()),
+        locale=get_language(),
+        query=hashlib.sha1(repr(query).encode('utf-8')).hexdigest(),
+        index_generation=get_index_generation(),
+        filters_generation=get_filters_generation(),
+    )
+
+
+def get_cached_list(view_name: str, configuration, request) -> Optional[dict]:
+    values = cache.get(get_list_cache_key(view_name, configuration, request))
+    record_cache(hit=values is not None)
+    return values
+
+
+def set_cached_list(
+        view_name: str, configuration, request, values: dict) -> None:
+    cache.set(
+        get_list_cache_key(view_name, configuration, request), values,
+        timeout=settings.QUESTIONNAIRE_LIST_CACHE_TIMEOUT
+    )
+
+
+def get_permission_class(user) -> Optional[str]:
+    """
+    The rendered details contain user specific elements (review panel, edit
+    buttons, history of versions visible to the user). Only requests that
+    render the same output for all users of a class can be cached; right now
+    this is the case for anonymous users only. Cached renders must not
+    contain values of the request (e.g. the CSRF token).
+    """
+    if not user or not user.is_authenticated:
+        return 'anonymous'
+    return None
+
+
+def get_details_cache_key(
+        questionnaire, view_mode: str, permission_class: str) -> str:
+    """
+    Key for the rendered details of a questionnaire. The key is composed as:
+    ``[prefix]_[id]_[version]_[edition]_[locale]_[view_mode]_``
+    ``[permission_class]_[generation]``
+    """
+    return (
+        '{prefix}_{id}_{version}_{edition}_{locale}_{view_mode}_'
+        '{permission_class}_{generation}'
+    ).format(
+        prefix=settings.QUESTIONNAIRE_CACHE_KEY_DETAILS,
+        id=questionnaire.id,
+        version=questionnaire.version,
+        edition=questionnaire.configuration.edition,
+        locale=get_language(),
+        view_mode=view_mode,
+        permission_class=permission_class,
+        generation=get_details_generation(questionnaire.code),
+    )
+
+
+def get_cached_details(
+        questionnaire, view_mode: str, user, render_details) -> dict:
+    """
+    Return the rendered details (sections, images, ...) of a questionnaire
+    from the cache. If the details are not cached yet, or the request can not
+    be served from the cache, ``render_details`` is called.
+
+    Args:
+        ``questionnaire`` (questionnaire.models.Questionnaire): The
+        questionnaire which is displayed.
+
+        ``view_mode`` (str): The view mode of the details page.
+
+        ``user`` (accounts.models.User): The current user.
+
+        ``render_details`` (callable): Returns the rendered details as dict.
+
+    Returns:
+        ``dict``. The rendered details.
+    """
+    permission_class = get_permission_class(user)
+    if not questionnaire or permission_class is None:
+        return render_details()
+
+    cache_key = get_details_cache_key(
+        questionnaire=questionnaire, view_mode=view_mode,
+        permission_class=permission_class
+    )
+    details = cache.get(cache_key)
+    record_cache(hit=details is not None)
+    if details is None:
+        details = render_details()
+        cache.set(
+            cache_key, details,
+            timeout=settings.QUESTIONNAIRE_DETAILS_CACHE_TIMEOUT
+        )
+    return details
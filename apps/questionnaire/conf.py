@@ -80,3 +80,33 @@ class QuestionnaireConf(AppConf):
     )
 
     LOCK_TIME = 10  # Number of minutes that questionnaires are locked.
+    # Seconds between the deletion of finished and expired locks (per
+    # process, see Lock.reap).
+    LOCK_REAP_INTERVAL = 60 * 10
+
+    # Fragment cache for the rendered details of questionnaires. Fragments are
+    # invalidated when the questionnaire (or its links, members, ...) change,
+    # the timeout only limits staleness after configuration updates.
+    CACHE_KEY_DETAILS = 'questionnaire_details'
+    CACHE_KEY_DETAILS_GENERATION = 'questionnaire_details_generation'
+    DETAILS_CACHE_TIMEOUT = 60 * 60 * 24
+
+    # Filter scaffolding of the list and filter views (latest editions,
+    # choices of the filters). Invalidated when projects, institutions, flags
+    # or configurations change.
+    CACHE_KEY_FILTERS = 'questionnaire_filters'
+    CACHE_KEY_FILTERS_GENERATION = 'questionnaire_filters_generation'
+    FILTERS_CACHE_TIMEOUT = 60 * 60 * 24
+
+    # If True, the list views fetch the hits of the next page along with the
+    # current page and keep them in the cache for a short time (clicks on
+    # "next").
+    LIST_PREFETCH_NEXT_PAGE = False
+    CACHE_KEY_LIST_PAGE = 'questionnaire_list_page'
+    LIST_PAGE_CACHE_TIMEOUT = 60
+
+    # Rendered parts of the list and filter views for anonymous users. They
+    # are invalidated with each change of the search index (and of the
+    # filters).
+    CACHE_KEY_LIST = 'questionnaire_list'
+    LIST_CACHE_TIMEOUT = 60 * 60
@@ -6,13 +6,13 @@ old questionnaires (around ID 500).
 
 DO NOT FORGET TO UPDATE ELASTICSEARCH INDEX AFTER RUNNING THE SCRIPT!
 """
+import contextlib
 
 from django.core.management.base import BaseCommand
 from django.db.models import Count
-from django.db.models.signals import pre_save
 
 from apps.questionnaire.models import Questionnaire, QuestionnaireLink
-from apps.questionnaire.receivers import prevent_updates_on_published_items
+from apps.questionnaire.receivers import allow_updates_on_published_items
 from apps.questionnaire.utils import clean_questionnaire_data
 
 
@@ -41,9 +41,9 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
 
         do_data_clean = options.get('clean_data')
+        allow_updates = contextlib.ExitStack()
         if do_data_clean:
-            pre_save.disconnect(prevent_updates_on_published_items,
-                                sender=Questionnaire)
+            allow_updates.enter_context(allow_updates_on_published_items())
 
         questionnaires = Questionnaire.with_status.not_deleted().all()
         error_questionnaires = []
@@ -151,9 +151,7 @@ class Command(BaseCommand):
 
                     print_error_message(fixable_string, error, fixed_string)
 
-        if do_data_clean:
-            pre_save.connect(prevent_updates_on_published_items,
-                             sender=Questionnaire)
+        allow_updates.close()
 
         print("\n\n{} questionnaires found with errors (out of {})".format(
             len(error_questionnaires), len(questionnaires)))
@@ -0,0 +1,257 @@
+"""
+Migrate the data of all questionnaires of a configuration to its latest
+edition, using the "update_questionnaire_data" of each edition in between
+(see apps.configuration.editions).
+
+Without this, the data is migrated when a public questionnaire is edited for
+the first time after the release of a new edition (see
+QuestionnaireEditView.update_case_data_for_editions).
+
+Only versions which are not published (draft, submitted, reviewed) are
+migrated in place. Public and inactive versions are left unchanged: their
+content was reviewed, and the lazy migration only applies the editions to a
+new draft version, which goes through the review again.
+
+The questionnaires are updated in chunks, each chunk in a transaction.
+Migrated questionnaires are linked to the latest edition, therefore an
+interrupted run can simply be started again.
+"""
+import copy
+import multiprocessing
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from apps.configuration.models import Configuration
+from apps.questionnaire.cache import invalidate_details
+from apps.questionnaire.models import Questionnaire
+
+DEFAULT_CHUNK_SIZE = 200
+
+# Editions to apply per configuration ID. Set before the worker processes
+# are forked.
+_editions = {}
+
+
+def get_editions(code: str) -> tuple:
+    """
+    Return the latest configuration of given code and the editions to apply
+    for each of its previous configurations:
+    ``{configuration_id: [(name, [operations])]}``
+    """
+    configurations = list(
+        Configuration.objects.filter(code=code).order_by('created'))
+    if not configurations:
+        raise CommandError(f'No configuration found for code "{code}".')
+
+    editions = {}
+    for index, configuration in enumerate(configurations[:-1]):
+        editions[configuration.id] = []
+        for next_configuration in configurations[index + 1:]:
+            edition = next_configuration.get_edition()
+            if edition:
+                editions[configuration.id].append(
+                    (str(edition), list(edition.operations)))
+    return configurations[-1], editions
+
+
+def migrate_data(item: tuple) -> tuple:
+    """
+    Apply all editions to the data of a single questionnaire. Returns the
+    migrated data and the duration of each operation.
+    """
+    questionnaire_id, configuration_id, data = item
+    data = copy.deepcopy(data)
+    timings = {}
+    for name, operations in _editions.get(configuration_id, []):
+        for operation in operations:
+            if not operation.transform_questionnaire:
+                continue
+            started = time.perf_counter()
+            data = operation.update_questionnaire_data(**data)
+            operation_name = '{}: {}'.format(
+                name, operation.transform_questionnaire.__name__)
+            timings[operation_name] = time.perf_counter() - started
+    return questionnaire_id, data, timings
+
+
+def get_changed_questiongroups(old_data: dict, new_data: dict) -> dict:
+    """
+    The keywords of the questiongroups which were added, removed or changed.
+    """
+    return {
+        'added': new_data.keys() - old_data.keys(),
+        'removed': old_data.keys() - new_data.keys(),
+        'changed': {
+            keyword for keyword in old_data.keys() & new_data.keys()
+            if old_data[keyword] != new_data[keyword]
+        },
+    }
+
+
+class Command(BaseCommand):
+    """
+    Run as
+        python3 manage.py migrate_questionnaire_editions technologies --dry-run
+    to see the changes, then without "--dry-run" to save them.
+    """
+    help = 'Migrate the data of all questionnaires of a configuration to ' \
+           'its latest edition.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'code',
+            type=str,
+            help='The code of the configuration (e.g. technologies).'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            dest='dry_run',
+            default=False,
+            help='Only show statistics about the changes, do not save them.'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            dest='processes',
+            default=1,
+            help='Number of processes used to migrate the data.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            dest='chunk_size',
+            default=DEFAULT_CHUNK_SIZE,
+            help='Number of questionnaires updated per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        global _editions
+        self.dry_run = options['dry_run']
+        self.chunk_size = options['chunk_size']
+        self.verbosity = options['verbosity']
+
+        latest_configuration, _editions = get_editions(options['code'])
+        self.latest_configuration = latest_configuration
+        self.stats = defaultdict(Counter)
+        self.timings = defaultdict(float)
+        self.migrated_count = 0
+        self.changed_count = 0
+
+        started = time.perf_counter()
+        try:
+            if options['processes'] > 1:
+                self.migrate_parallel(options['processes'])
+            else:
+                for chunk in self.get_chunks():
+                    results = [migrate_data(self.get_item(q)) for q in chunk]
+                    self.save_chunk(chunk, results)
+        finally:
+            _editions = {}
+
+        self.print_summary(time.perf_counter() - started)
+
+    def get_chunks(self):
+        """
+        Yield the questionnaires to migrate in chunks, paginated by ID.
+        """
+        queryset = Questionnaire.objects.filter(
+            configuration__code=self.latest_configuration.code,
+            is_deleted=False,
+        ).exclude(
+            configuration=self.latest_configuration
+        ).exclude(
+            status__in=[
+                settings.QUESTIONNAIRE_PUBLIC, settings.QUESTIONNAIRE_INACTIVE
+            ]
+        ).select_related('configuration').order_by('id')
+
+        last_id = 0
+        while True:
+            chunk = list(queryset.filter(id__gt=last_id)[:self.chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1].id
+
+    @staticmethod
+    def get_item(questionnaire: Questionnaire) -> tuple:
+        return (
+            questionnaire.id, questionnaire.configuration_id,
+            questionnaire.data
+        )
+
+    def migrate_parallel(self, processes: int):
+        # Database connections must not be shared with the forked processes.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(processes=processes) as pool:
+            for chunk in self.get_chunks():
+                results = pool.map(
+                    migrate_data, [self.get_item(q) for q in chunk],
+                    chunksize=max(1, len(chunk) // processes)
+                )
+                self.save_chunk(chunk, results)
+
+    def save_chunk(self, chunk: list, results: list):
+        """
+        Collect the statistics of the migrated chunk and save it in a single
+        transaction (unless in dry run). The updated timestamp is set, as
+        bulk_update neither sets it nor sends any signals; the validators
+        (ETag) of the details depend on it.
+        """
+        questionnaires = {
+            questionnaire.id: questionnaire for questionnaire in chunk
+        }
+        updated = timezone.now()
+        for questionnaire_id, data, timings in results:
+            questionnaire = questionnaires[questionnaire_id]
+            for operation_name, duration in timings.items():
+                self.timings[operation_name] += duration
+
+            changes = get_changed_questiongroups(questionnaire.data, data)
+            if any(changes.values()):
+                self.changed_count += 1
+            for change, keywords in changes.items():
+                self.stats[change].update(keywords)
+
+            questionnaire.data = data
+            questionnaire.configuration = self.latest_configuration
+            questionnaire.updated = updated
+
+        self.migrated_count += len(chunk)
+        if self.verbosity > 1:
+            self.stdout.write(
+                f'{self.migrated_count} questionnaires migrated.')
+        if self.dry_run:
+            return
+
+        with transaction.atomic():
+            Questionnaire.objects.bulk_update(
+                chunk, ['data', 'configuration', 'updated'])
+
+        invalidate_details(*[questionnaire.code for questionnaire in chunk])
+
+    def print_summary(self, duration: float):
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING(
+                'Dry run, no questionnaires were saved.'))
+        self.stdout.write(
+            f'{self.migrated_count} questionnaires migrated to '
+            f'{self.latest_configuration} in {duration:.1f}s, data of '
+            f'{self.changed_count} questionnaires changed.')
+
+        for change in ['added', 'removed', 'changed']:
+            for keyword, count in self.stats[change].most_common():
+                self.stdout.write(f'  {change}: {keyword} ({count})')
+
+        if self.timings:
+            self.stdout.write('Duration per operation:')
+            for operation_name, duration in sorted(
+                    self.timings.items(), key=lambda t: -t[1]):
+                self.stdout.write(f'  {operation_name}: {duration:.3f}s')
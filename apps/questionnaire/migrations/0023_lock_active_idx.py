@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionnaire', '0022_auto_20200514_1659'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lock',
+            index=models.Index(condition=models.Q(is_finished=False), fields=['questionnaire_code', 'start'], name='lock_active_idx'),
+        ),
+    ]
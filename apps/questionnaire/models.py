@@ -4,9 +4,10 @@ import collections
 
 import os
 import requests
+import time
 from django.contrib.gis.gdal.error import GDALException
 from django.contrib.gis.geos import GeometryCollection, GEOSGeometry
-from django.db.models import Q
+from django.db.models import Q, prefetch_related_objects
 from os.path import join
 from uuid import uuid4
 
@@ -28,7 +29,8 @@ from .signals import create_questionnaire
 
 from .conf import settings
 from .errors import QuestionnaireLockedException
-from .querysets import StatusQuerySet, LockStatusQuerySet, EditRequestsStatusQuerySet
+from .querysets import StatusQuerySet, LockStatusQuerySet, \
+    EditRequestsStatusQuerySet, get_metadata_lookups
 
 from apps.questionnaire.upload import (
     create_thumbnails,
@@ -762,8 +764,18 @@ class Questionnaire(models.Model):
 
             - [1]: ``accounts.models.User``. The user object.
         """
+        if self._is_prefetched('questionnairemembership_set'):
+            # See handle_bulk_review_actions.
+            memberships = [
+                membership for membership in
+                self.questionnairemembership_set.all()
+                if all(getattr(membership, key) == value
+                       for key, value in kwargs.items())
+            ]
+        else:
+            memberships = self.questionnairemembership_set.filter(**kwargs)
         users = []
-        for membership in self.questionnairemembership_set.filter(**kwargs):
+        for membership in memberships:
             users.append((membership.role, membership.user))
         return users
 
@@ -1004,14 +1016,15 @@ class Questionnaire(models.Model):
         questionnaire for this user - else raise an error.
 
         """
-        qs_locks = Lock.with_status.is_blocked(code, for_user=user)
+        lock = Lock.with_status.is_blocked(
+            code, for_user=user
+        ).select_related('user').first()
 
-        if qs_locks.exists():
-            raise QuestionnaireLockedException(
-                qs_locks.first().user
-            )
+        if lock:
+            raise QuestionnaireLockedException(lock.user)
         else:
             Lock.objects.create(questionnaire_code=code, user=user)
+            Lock.reap()
 
     def can_edit(self, user: settings.AUTH_USER_MODEL) -> bool:
         has_questionnaires = self.has_questionnaires_for_code(self.code)
@@ -1029,24 +1042,36 @@ class Questionnaire(models.Model):
         """
         Get status and message for blocked status (blocked or can be edited).
         """
-        locks = Lock.with_status.is_blocked(code=self.code, for_user=user)
+        lock = Lock.with_status.is_blocked(
+            code=self.code, for_user=user
+        ).select_related('user').first()
 
-        if not locks.exists():
+        if not lock:
             return SUCCESS, _(u"This questionnaire can be edited.")
         else:
             return WARNING, _(u"This questionnaire is "
                               u"locked for editing by {user}.".format(
-                user=locks.first().user.get_display_name()
+                user=lock.user.get_display_name()
             ))
 
     # Properties for the get_metadata function.
+    def _is_prefetched(self, relation: str) -> bool:
+        # See StatusQuerySet.with_list_metadata
+        return relation in getattr(self, '_prefetched_objects_cache', {})
+
     def _get_role_list(self, role):
+        if self._is_prefetched('questionnairemembership_set'):
+            memberships = self.questionnairemembership_set.all()
+        else:
+            memberships = self.questionnairemembership_set.filter(
+                role=role).select_related('user')
         members = []
-        for member in self.members.filter(questionnairemembership__role=role):
-            members.append({
-                'id': member.id,
-                'name': str(member),
-            })
+        for membership in memberships:
+            if membership.role == role:
+                members.append({
+                    'id': membership.user.id,
+                    'name': str(membership.user),
+                })
         return members
 
     @cached_property
@@ -1070,14 +1095,23 @@ class Questionnaire(models.Model):
 
     @cached_property
     def translations(self):
+        if self._is_prefetched('questionnairetranslation_set'):
+            return [translation.language for translation
+                    in self.questionnairetranslation_set.all()]
         return list(self.questionnairetranslation_set.values_list(
             'language', flat=True
         ))
 
     @cached_property
     def original_locale(self):
-        translation = self.questionnairetranslation_set.filter(
-            original_language=True).first()
+        if self._is_prefetched('questionnairetranslation_set'):
+            translation = next((
+                translation for translation
+                in self.questionnairetranslation_set.all()
+                if translation.original_language), None)
+        else:
+            translation = self.questionnairetranslation_set.filter(
+                original_language=True).first()
         if translation:
             return translation.language
         else:
@@ -1095,15 +1129,26 @@ class Questionnaire(models.Model):
         links = []
         current_language = get_language()
 
-        for link in self.links.filter(status=settings.QUESTIONNAIRE_PUBLIC):
+        # See StatusQuerySet.with_metadata
+        public_links = getattr(self, 'public_links', None)
+        if public_links is None:
+            public_links = self.links.filter(
+                status=settings.QUESTIONNAIRE_PUBLIC)
+
+        for link in public_links:
 
             link_configuration = get_configuration(
                 code=link.configuration.code,
                 edition=link.configuration.edition)
             name_data = link_configuration.get_questionnaire_name(link.data)
 
+            if link._is_prefetched('questionnairetranslation_set'):
+                translation = next(
+                    iter(link.questionnairetranslation_set.all()), None)
+            else:
+                translation = link.questionnairetranslation_set.first()
             try:
-                original_language = link.questionnairetranslation_set.first().language
+                original_language = translation.language
             except AttributeError:
                 original_language = settings.LANGUAGES[0][0]  # 'en'
 
@@ -1152,6 +1197,17 @@ class Questionnaire(models.Model):
         ).exists()
 
 
+def prefetch_metadata(questionnaires: list):
+    """
+    Fetch the configuration, metadata and public links of already loaded
+    questionnaires at once (see StatusQuerySet.with_metadata). Relations
+    which are already prefetched are not fetched again.
+    """
+    prefetch_related_objects(
+        questionnaires, 'configuration',
+        *get_metadata_lookups(Questionnaire, with_links=True))
+
+
 class QuestionnaireTranslation(models.Model):
     """
     Represents a many-to-many relationship between Questionnaires and
@@ -1362,6 +1418,34 @@ class Lock(models.Model):
     objects = models.Manager()
     with_status = LockStatusQuerySet.as_manager()
 
+    # Time (monotonic) when this process deleted the stale locks the last time.
+    last_reap = 0
+
+    class Meta:
+        indexes = [
+            # Only active locks are queried when saving questionnaires.
+            models.Index(
+                fields=['questionnaire_code', 'start'],
+                name='lock_active_idx',
+                condition=models.Q(is_finished=False),
+            ),
+        ]
+
+    @classmethod
+    def reap(cls, force: bool = False) -> int:
+        """
+        Delete the finished and expired locks, at most every
+        ``QUESTIONNAIRE_LOCK_REAP_INTERVAL`` seconds (unless forced). Called
+        when locks are created, so the table does not grow.
+        """
+        current_time = time.monotonic()
+        interval = settings.QUESTIONNAIRE_LOCK_REAP_INTERVAL
+        if not force and current_time - cls.last_reap < interval:
+            return 0
+        cls.last_reap = current_time
+        deleted, __ = cls.with_status.reapable().delete()
+        return deleted
+
 
 class APIEditRequests(models.Model):
     """
@@ -1,7 +1,7 @@
 from datetime import timedelta
 
 from django.db import models
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.utils.timezone import now
 
 from .conf import settings
@@ -21,6 +21,44 @@ class StatusQuerySet(models.QuerySet):
     def not_deleted(self):
         return self.filter(is_deleted=False)
 
+    def with_list_metadata(self):
+        """
+        Fetch the configuration, memberships (with users), translations and
+        flags of all questionnaires at once; they are used by get_metadata.
+        """
+        return self.select_related('configuration').prefetch_related(
+            *get_metadata_lookups(self.model))
+
+    def with_metadata(self):
+        """
+        Like with_list_metadata, but also fetch the public links (used by
+        links_property), as needed to serialize the questionnaires.
+        """
+        return self.select_related('configuration').prefetch_related(
+            *get_metadata_lookups(self.model, with_links=True))
+
+
+def get_metadata_lookups(model, with_links=False) -> list:
+    """
+    The prefetch lookups of the metadata of a questionnaire. The public links
+    are stored in the attribute "public_links", with their configuration and
+    translations.
+    """
+    lookups = [
+        'questionnairemembership_set__user',
+        'questionnairetranslation_set',
+        'flags',
+    ]
+    if with_links:
+        lookups.append(Prefetch(
+            'links',
+            queryset=model.objects.filter(
+                status=settings.QUESTIONNAIRE_PUBLIC
+            ).select_related('configuration').prefetch_related(
+                'questionnairetranslation_set'),
+            to_attr='public_links'))
+    return lookups
+
 
 class LockStatusQuerySet(models.QuerySet):
     """
@@ -56,6 +94,12 @@ class LockStatusQuerySet(models.QuerySet):
 
         return self.filter_code(code=code).filter(filters)
 
+    def reapable(self):
+        """
+        Locks which are finished or expired and can be deleted.
+        """
+        return self.filter(Q(is_finished=True) | Q(start__lte=self.expired))
+
 
 class EditRequestsStatusQuerySet(models.QuerySet):
     """
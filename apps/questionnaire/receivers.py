@@ -1,35 +1,122 @@
 # -*- coding: utf-8 -*-
+import contextlib
+import contextvars
+
 from django.utils.translation import ugettext_lazy as _
+from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db.models.signals import pre_save
+from django.db.models import Q, Subquery
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+    pre_save
 from django.dispatch import receiver
 
+from apps.configuration.models import Configuration, Institution, Project
+
+from .cache import invalidate_details, invalidate_filters
 from .errors import QuestionnaireLockedException
-from .models import Questionnaire, Lock
+from .models import Flag, Questionnaire, Lock, QuestionnaireLink, \
+    QuestionnaireMembership, QuestionnaireTranslation
 from .conf import settings
 
 
-@receiver(pre_save, sender=Questionnaire)
-def prevent_updates_on_published_items(instance, *args, **kwargs):
-    if instance.id and instance.status != settings.QUESTIONNAIRE_INACTIVE:
-        qs = Questionnaire.objects.filter(id=instance.id, status=4)
-        if qs.exists():
-            raise ValidationError(
-                _(u"Published questionnaires must not be updated.")
-            )
+# Set by allow_updates_on_published_items.
+_published_updates_allowed = contextvars.ContextVar(
+    'published_updates_allowed', default=False)
+
+
+@contextlib.contextmanager
+def allow_updates_on_published_items():
+    """
+    Published questionnaires can be updated (e.g. deleted or cleaned) within
+    this context. Locks are still checked.
+    """
+    token = _published_updates_allowed.set(True)
+    try:
+        yield
+    finally:
+        _published_updates_allowed.reset(token)
 
 
 @receiver(pre_save, sender=Questionnaire)
-def prevent_editing_of_locked_questionnaires(instance, *args, **kwargs):
+def check_status_and_locks(instance, *args, **kwargs):
     """
-    Make sure that no other questionnaire with the same code is blocked.
+    Prevent updates on published questionnaires (see
+    allow_updates_on_published_items) and make sure that no questionnaire
+    with the same code is locked. The status of the saved questionnaire and
+    the active lock of its code are queried at once.
 
     Args:
         instance: Questionnaire
     """
-    if instance.id:
-        locks = Lock.with_status.is_blocked(code=instance.code)
-        if locks.exists():
-            raise QuestionnaireLockedException(
-                locks.first().user
-            )
+    if not instance.id:
+        return
+    active_locks = Lock.with_status.is_blocked(code=instance.code)
+    row = Questionnaire.objects.filter(id=instance.id).annotate(
+        locked_by=Subquery(active_locks.values('user_id')[:1])
+    ).values_list('status', 'locked_by').first()
+    if row is None:
+        # Not saved yet, only the locks are checked.
+        row = None, active_locks.values_list('user_id', flat=True).first()
+    status, locked_by = row
+    if status == settings.QUESTIONNAIRE_PUBLIC \
+            and instance.status != settings.QUESTIONNAIRE_INACTIVE \
+            and not _published_updates_allowed.get():
+        raise ValidationError(
+            _(u"Published questionnaires must not be updated.")
+        )
+    if locked_by:
+        raise QuestionnaireLockedException(
+            get_user_model().objects.get(pk=locked_by)
+        )
+
+
+@receiver(post_save, sender=Questionnaire)
+def invalidate_cached_details(instance, *args, **kwargs):
+    """
+    Invalidate the rendered details of the questionnaire and of all linked
+    questionnaires (which display the name of this questionnaire).
+    """
+    linked_codes = QuestionnaireLink.objects.filter(
+        Q(from_questionnaire__code=instance.code) |
+        Q(to_questionnaire__code=instance.code)
+    ).values_list('from_questionnaire__code', 'to_questionnaire__code')
+    invalidate_details(instance.code, *[
+        code for codes in linked_codes for code in codes
+    ])
+
+
+@receiver(post_save, sender=QuestionnaireLink)
+@receiver(post_delete, sender=QuestionnaireLink)
+def invalidate_cached_details_of_link(instance, *args, **kwargs):
+    invalidate_details(
+        instance.from_questionnaire.code, instance.to_questionnaire.code
+    )
+
+
+@receiver(post_save, sender=QuestionnaireMembership)
+@receiver(post_delete, sender=QuestionnaireMembership)
+@receiver(post_save, sender=QuestionnaireTranslation)
+@receiver(post_delete, sender=QuestionnaireTranslation)
+def invalidate_cached_details_of_questionnaire(instance, *args, **kwargs):
+    invalidate_details(instance.questionnaire.code)
+
+
+@receiver(m2m_changed, sender=Questionnaire.flags.through)
+def invalidate_cached_details_of_flags(instance, action, *args, **kwargs):
+    if action.startswith('post_') and isinstance(instance, Questionnaire):
+        invalidate_details(instance.code)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=Institution)
+@receiver(post_delete, sender=Institution)
+@receiver(post_save, sender=Flag)
+@receiver(post_delete, sender=Flag)
+@receiver(post_save, sender=Configuration)
+@receiver(post_delete, sender=Configuration)
+def invalidate_cached_filters(*args, **kwargs):
+    """
+    The choices of the filters in the list views are cached.
+    """
+    invalidate_filters()
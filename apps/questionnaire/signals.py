@@ -11,3 +11,9 @@ delete_questionnaire = django.dispatch.Signal(providing_args=["questionnaire", "
 change_status = django.dispatch.Signal(providing_args=["questionnaire", "user"])
 change_member = django.dispatch.Signal(providing_args=["questionnaire", "user", "affected", "role"])
 change_questionnaire_data = django.dispatch.Signal(providing_args=["questionnaire", "user"])
+
+# Bulk variants of the signals above, used by bulk review actions. "changes" is
+# a list of dicts with the same arguments as the corresponding single signal
+# (e.g. questionnaire, previous_status, message).
+change_status_bulk = django.dispatch.Signal(providing_args=["changes", "user"])
+change_member_bulk = django.dispatch.Signal(providing_args=["changes", "user"])
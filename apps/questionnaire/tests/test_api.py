@@ -4,6 +4,8 @@ from unittest.mock import patch, MagicMock, sentinel, Mock
 
 import pytest
 from django.conf import settings
+from elasticsearch import ConnectionError as ESConnectionError, \
+    TransportError
 from django.http import Http404
 from django.test import RequestFactory
 from rest_framework.test import force_authenticate, APIRequestFactory
@@ -17,6 +19,7 @@ from apps.questionnaire.api.views import QuestionnaireListView, \
     QuestionnaireDetailView,  QuestionnaireAPIMixin, \
     ConfiguredQuestionnaireDetailView
 from apps.search.tests.test_index import create_temp_indices
+from apps.search.search import LIST_SOURCE
 
 
 @elasticmock
@@ -85,8 +88,51 @@ class QuestionnaireListViewTest(TestCase):
             filter_params=[],
             query_string='',
             configuration_codes=['sample'],
+            source=LIST_SOURCE,
         )
 
+    @patch('apps.questionnaire.views.set_prefetched_list_page')
+    @patch('apps.questionnaire.views.get_prefetched_list_page')
+    @patch('apps.questionnaire.views.advanced_search')
+    def test_prefetches_next_page(
+            self, mock_advanced_search, mock_get_prefetched,
+            mock_set_prefetched):
+        page_size = settings.API_PAGE_SIZE
+        mock_get_prefetched.return_value = None
+        mock_advanced_search.return_value = {
+            'hits': {'total': 100, 'hits': list(range(2 * page_size))}}
+        self.view.set_attributes()
+        with self.settings(QUESTIONNAIRE_LIST_PREFETCH_NEXT_PAGE=True):
+            results = self.view.get_es_results()
+        self.assertEqual(
+            mock_advanced_search.call_args[1]['limit'], 2 * page_size)
+        self.assertEqual(results['hits']['hits'], list(range(page_size)))
+        next_params, next_page = mock_set_prefetched.call_args[0]
+        self.assertEqual(next_params['offset'], page_size)
+        self.assertEqual(
+            next_page['hits']['hits'], list(range(page_size, 2 * page_size)))
+
+    @patch('apps.questionnaire.views.get_prefetched_list_page')
+    @patch('apps.questionnaire.views.advanced_search')
+    def test_prefetch_elasticsearch_unavailable(
+            self, mock_advanced_search, mock_get_prefetched):
+        mock_get_prefetched.return_value = None
+        mock_advanced_search.side_effect = ESConnectionError('N/A', 'down')
+        self.view.set_attributes()
+        with self.settings(QUESTIONNAIRE_LIST_PREFETCH_NEXT_PAGE=True):
+            self.assertEqual(self.view.get_es_results(), {})
+        self.assertEqual(mock_advanced_search.call_count, 1)
+        self.assertTrue(self.view.es_unavailable)
+
+    @patch('apps.questionnaire.views.advanced_search')
+    def test_total_elasticsearch_unavailable(self, mock_advanced_search):
+        mock_advanced_search.side_effect = [
+            TransportError(500, 'error'), ESConnectionError('N/A', 'down')]
+        self.view.set_attributes()
+        with self.settings(QUESTIONNAIRE_LIST_PREFETCH_NEXT_PAGE=False):
+            with self.assertRaises(ESConnectionError):
+                self.view.get_es_results(call_from='api')
+
     @patch('apps.questionnaire.views.advanced_search')
     def test_pagination(self, mock_advanced_search):
         mock_advanced_search.return_value = {}
@@ -0,0 +1,132 @@
+from unittest.mock import MagicMock, Mock, patch
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+
+from apps.accounts.tests.test_models import create_new_user
+from apps.qcat.tests import TestCase
+from apps.questionnaire.cache import get_cached_details, \
+    get_cached_filters, get_details_cache_key, get_list_cache_key, \
+    invalidate_details, invalidate_filters
+
+
+class GetCachedDetailsTest(TestCase):
+
+    def setUp(self):
+        self.questionnaire = MagicMock(id=1, version=2, code='sample_1')
+        self.questionnaire.configuration.edition = '2015'
+        self.render_details = Mock(return_value={'sections': []})
+
+    def get_details(self, user):
+        return get_cached_details(
+            questionnaire=self.questionnaire, view_mode='view', user=user,
+            render_details=self.render_details
+        )
+
+    @patch('apps.questionnaire.cache.cache')
+    def test_authenticated_user_is_not_cached(self, mock_cache):
+        details = self.get_details(create_new_user())
+        self.assertEqual(details, {'sections': []})
+        mock_cache.set.assert_not_called()
+
+    @patch('apps.questionnaire.cache.cache')
+    def test_anonymous_user_cache_hit(self, mock_cache):
+        mock_cache.get.return_value = {'sections': ['cached']}
+        details = self.get_details(AnonymousUser())
+        self.assertEqual(details, {'sections': ['cached']})
+        self.render_details.assert_not_called()
+
+    @patch('apps.questionnaire.cache.cache')
+    def test_anonymous_user_cache_miss(self, mock_cache):
+        mock_cache.get.return_value = None
+        self.get_details(AnonymousUser())
+        self.render_details.assert_called_once_with()
+        self.assertTrue(mock_cache.set.called)
+
+    @patch('apps.questionnaire.cache.get_details_generation')
+    def test_cache_key_contains_generation(self, mock_generation):
+        mock_generation.return_value = 'foo'
+        key = get_details_cache_key(
+            questionnaire=self.questionnaire, view_mode='view',
+            permission_class='anonymous'
+        )
+        self.assertTrue(key.endswith('_view_anonymous_foo'))
+
+    @patch('apps.questionnaire.cache.cache')
+    def test_invalidate_details(self, mock_cache):
+        invalidate_details('sample_1', 'sample_1', None)
+        mock_cache.delete.assert_called_once_with(
+            'questionnaire_details_generation_sample_1'
+        )
+
+
+class GetCachedFiltersTest(TestCase):
+
+    def setUp(self):
+        self.build_filters = Mock(return_value={'projects': []})
+
+    @patch('apps.questionnaire.cache.cache')
+    def test_cache_hit(self, mock_cache):
+        mock_cache.get.return_value = {'projects': ['cached']}
+        filters = get_cached_filters('global', self.build_filters, 'sample')
+        self.assertEqual(filters, {'projects': ['cached']})
+        self.build_filters.assert_not_called()
+
+    @patch('apps.questionnaire.cache.cache')
+    def test_cache_miss(self, mock_cache):
+        mock_cache.get.return_value = None
+        filters = get_cached_filters('global', self.build_filters, 'sample')
+        self.assertEqual(filters, {'projects': []})
+        self.build_filters.assert_called_once_with()
+        self.assertTrue(mock_cache.set.called)
+
+    @patch('apps.questionnaire.cache.get_filters_generation')
+    @patch('apps.questionnaire.cache.cache')
+    def test_cache_key_contains_generation(self, mock_cache, mock_generation):
+        mock_generation.return_value = 'foo'
+        get_cached_filters('advanced', self.build_filters, 'sample', '2015')
+        key = mock_cache.get.call_args[0][0]
+        self.assertTrue(
+            key.startswith('questionnaire_filters_advanced_sample_2015_'))
+        self.assertTrue(key.endswith('_foo'))
+
+    @patch('apps.questionnaire.cache.cache')
+    def test_invalidate_filters(self, mock_cache):
+        invalidate_filters()
+        mock_cache.delete.assert_called_once_with(
+            'questionnaire_filters_generation'
+        )
+
+
+@patch('apps.questionnaire.cache.get_filters_generation',
+       Mock(return_value='bar'))
+class GetListCacheKeyTest(TestCase):
+
+    def setUp(self):
+        self.configuration = Mock(keyword='sample', edition='2015')
+
+    def get_key(self, url):
+        return get_list_cache_key(
+            'list_sample', self.configuration, RequestFactory().get(url))
+
+    @patch('apps.questionnaire.cache.get_index_generation')
+    def test_query_is_normalized(self, mock_generation):
+        mock_generation.return_value = 1
+        self.assertEqual(
+            self.get_key('/en/sample/list/?q=foo&page=2'),
+            self.get_key('/en/sample/list/?page=2&q=foo')
+        )
+        self.assertNotEqual(
+            self.get_key('/en/sample/list/?q=foo&page=2'),
+            self.get_key('/en/sample/list/?q=foo&page=3')
+        )
+
+    @patch('apps.questionnaire.cache.get_index_generation')
+    def test_key_contains_generations(self, mock_generation):
+        mock_generation.return_value = 1
+        key = self.get_key('/en/sample/list/')
+        self.assertTrue(
+            key.startswith('questionnaire_list_list_sample_sample_2015_0_'))
+        self.assertTrue(key.endswith('_1_bar'))
+        mock_generation.return_value = 2
+        self.assertNotEqual(self.get_key('/en/sample/list/'), key)
@@ -0,0 +1,47 @@
+from unittest.mock import patch
+
+from apps.configuration.editions.base import Operation
+from apps.qcat.tests import TestCase
+from apps.questionnaire.management.commands.migrate_questionnaire_editions \
+    import get_changed_questiongroups, migrate_data
+
+
+def remove_qg_1(**data):
+    data.pop('qg_1', None)
+    return data
+
+
+class MigrateQuestionnaireEditionsTest(TestCase):
+
+    def setUp(self):
+        self.operations = [
+            Operation(transform_configuration=None, release_note=''),
+            Operation(
+                transform_configuration=None, release_note='',
+                transform_questionnaire=remove_qg_1),
+        ]
+
+    def test_migrate_data(self):
+        data = {'qg_1': [{'key_1': 'foo'}], 'qg_2': []}
+        editions = {1: [('sample: Edition 2018', self.operations)]}
+        with patch.dict(
+                'apps.questionnaire.management.commands.'
+                'migrate_questionnaire_editions._editions', editions):
+            questionnaire_id, new_data, timings = migrate_data((5, 1, data))
+        self.assertEqual(questionnaire_id, 5)
+        self.assertEqual(new_data, {'qg_2': []})
+        # The original data is not modified.
+        self.assertIn('qg_1', data)
+        self.assertEqual(list(timings), ['sample: Edition 2018: remove_qg_1'])
+
+    def test_migrate_data_latest_edition(self):
+        data = {'qg_1': []}
+        self.assertEqual(migrate_data((5, 2, data)), (5, data, {}))
+
+    def test_get_changed_questiongroups(self):
+        changes = get_changed_questiongroups(
+            {'qg_1': [], 'qg_2': [{'a': 1}], 'qg_3': []},
+            {'qg_2': [{'a': 2}], 'qg_3': [], 'qg_4': []}
+        )
+        self.assertEqual(changes, {
+            'added': {'qg_4'}, 'removed': {'qg_1'}, 'changed': {'qg_2'}})
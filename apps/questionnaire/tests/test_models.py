@@ -20,7 +20,9 @@ from apps.configuration.utils import create_new_code
 from apps.qcat.tests import TestCase
 from apps.questionnaire.errors import QuestionnaireLockedException
 from apps.questionnaire.models import Questionnaire, QuestionnaireLink, File, Lock, \
-    QuestionnaireTranslation
+    QuestionnaireMembership, QuestionnaireTranslation
+from apps.questionnaire.receivers import allow_updates_on_published_items
+from apps.questionnaire.utils import query_questionnaires
 
 from ..conf import settings
 
@@ -581,6 +583,40 @@ class QuestionnaireModelTest(TestCase):
         user_2 = create_new_user(id=2, email='foo@bar.com')
         self.assertFalse(questionnaire.can_edit(user_2))
 
+    def test_save_locked_questionnaire_raises_exception(self):
+        questionnaire = get_valid_questionnaire()
+        questionnaire.lock_questionnaire(questionnaire.code, self.user)
+        questionnaire.data = {'foo': 'bar'}
+        with self.assertNumQueries(2):
+            with self.assertRaises(QuestionnaireLockedException) as e:
+                questionnaire.save()
+        self.assertEqual(e.exception.user, self.user)
+
+    def test_save_published_questionnaire_raises_exception(self):
+        questionnaire = get_valid_questionnaire()
+        Questionnaire.objects.filter(id=questionnaire.id).update(
+            status=settings.QUESTIONNAIRE_PUBLIC)
+        with self.assertRaises(ValidationError):
+            questionnaire.save()
+        with allow_updates_on_published_items():
+            questionnaire.save()
+
+    def test_allowed_update_checks_locks(self):
+        questionnaire = get_valid_questionnaire()
+        Questionnaire.objects.filter(id=questionnaire.id).update(
+            status=settings.QUESTIONNAIRE_PUBLIC)
+        questionnaire.lock_questionnaire(questionnaire.code, self.user)
+        with allow_updates_on_published_items():
+            with self.assertRaises(QuestionnaireLockedException):
+                questionnaire.save()
+
+    def test_reap_locks(self):
+        questionnaire = get_valid_questionnaire()
+        questionnaire.lock_questionnaire(questionnaire.code, self.user)
+        questionnaire.unlock_questionnaire()
+        self.assertEqual(Lock.reap(force=True), 1)
+        self.assertFalse(Lock.objects.exists())
+
     def test_update_geometry_updates_geometry(self):
         questionnaire = get_valid_questionnaire()
         questionnaire.data = {'qg_39': [{'key_56': json.dumps({
@@ -946,3 +982,51 @@ class FileModelTest(TestCase):
         self.assertEqual(ret['size'], file.size)
         self.assertEqual(ret['uid'], str(file.uuid))
         self.assertIn('url', ret)
+
+
+class ManyQuestionnairesBenchmarkTest(TestCase):
+    """
+    Benchmark for a user with 500 questionnaires (e.g. an active compiler).
+    The number of queries for the metadata of the listed questionnaires must
+    not grow with the number of questionnaires.
+    """
+
+    def setUp(self):
+        self.user = mommy.make(_model=User)
+        questionnaire = mommy.make(
+            _model=Questionnaire, status=settings.QUESTIONNAIRE_DRAFT)
+        questionnaires = Questionnaire.objects.bulk_create(mommy.prepare(
+            _model=Questionnaire,
+            configuration=questionnaire.configuration,
+            status=settings.QUESTIONNAIRE_DRAFT,
+            _quantity=500
+        ))
+        QuestionnaireMembership.objects.bulk_create([
+            QuestionnaireMembership(
+                questionnaire=questionnaire, user=self.user,
+                role=settings.QUESTIONNAIRE_COMPILER
+            ) for questionnaire in questionnaires
+        ])
+        QuestionnaireTranslation.objects.bulk_create([
+            QuestionnaireTranslation(
+                questionnaire=questionnaire, language='en',
+                original_language=True
+            ) for questionnaire in questionnaires
+        ])
+
+    def test_metadata_in_constant_queries(self):
+        # As in the list of questionnaires of a user (QuestionnaireListMixin).
+        queryset = query_questionnaires(
+            request=Mock(user=self.user), configuration_code='wocat',
+            only_current=False, limit=None, user=self.user
+        ).filter(
+            status=settings.QUESTIONNAIRE_DRAFT
+        ).with_list_metadata()
+        # Questionnaires, memberships, users, translations and flags.
+        with self.assertNumQueries(5):
+            metadata = [
+                questionnaire.get_metadata() for questionnaire in queryset
+            ]
+        self.assertEqual(len(metadata), 500)
+        self.assertEqual(metadata[0]['compilers'][0]['id'], self.user.id)
+        self.assertEqual(metadata[0]['original_locale'], 'en')
@@ -7,18 +7,21 @@ from collections import namedtuple
 from apps.configuration.cache import get_configuration
 from django.conf import settings
 from django.contrib.auth.models import Group
+from django.db import connection
 from django.http import QueryDict
 from django.test.client import RequestFactory
-from django.test.utils import override_settings
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.utils.translation import ugettext_lazy as _
 from model_mommy import mommy
 
 from apps.accounts.models import User
 from apps.accounts.tests.test_models import create_new_user
 from apps.configuration.configuration import QuestionnaireConfiguration
+from apps.notifications.models import InboxLog
 from apps.qcat.tests import TestCase
 from apps.questionnaire.errors import QuestionnaireLockedException
-from apps.questionnaire.models import Questionnaire, Flag, Lock
+from apps.questionnaire.models import Questionnaire, Flag, Lock, \
+    QuestionnaireMembership
 from apps.questionnaire.serializers import QuestionnaireSerializer
 from apps.questionnaire.utils import (
     clean_questionnaire_data,
@@ -30,6 +33,7 @@ from apps.questionnaire.utils import (
     get_link_data,
     get_link_display,
     get_list_values,
+    handle_bulk_review_actions,
     handle_review_actions,
     is_valid_questionnaire_format,
     query_questionnaire,
@@ -1837,3 +1841,161 @@ class CompareQuestionnaireDataTest(TestCase):
         self.data_2['qg_2'][0]['key_4'].append('asdf')
         diff = compare_questionnaire_data(self.data_2, self.data_1)
         self.assertEqual(diff, ['qg_2'])
+
+
+class HandleBulkReviewActionsTest(TestCase):
+
+    def setUp(self):
+        self.user = create_new_user()
+        self.questionnaires = [
+            mommy.make(Questionnaire, code=f'bulk_{i}', status=1)
+            for i in range(3)
+        ]
+        self.set_permissions('submit_questionnaire')
+
+    def set_permissions(self, *permissions):
+        RolesPermissions = namedtuple(
+            'RolesPermissions', ['roles', 'permissions'])
+        for questionnaire in self.questionnaires:
+            questionnaire.get_roles_permissions = lambda user: \
+                RolesPermissions(roles=[], permissions=list(permissions))
+
+    def set_status(self, status):
+        for questionnaire in self.questionnaires:
+            questionnaire.status = status
+        Questionnaire.objects.filter(
+            id__in=[q.id for q in self.questionnaires]
+        ).update(status=status)
+
+    def test_invalid_action(self):
+        with self.assertRaises(ValueError):
+            handle_bulk_review_actions(self.user, self.questionnaires, 'foo')
+
+    @patch('apps.questionnaire.utils.change_status_bulk.send')
+    def test_submit_updates_status(self, mock_change_status):
+        result = handle_bulk_review_actions(
+            self.user, self.questionnaires, 'submit')
+        self.assertEqual(
+            result['success'], [q.id for q in self.questionnaires])
+        self.assertEqual(
+            Questionnaire.objects.filter(
+                code__startswith='bulk_', status=2).count(),
+            3
+        )
+        # Only one signal for all questionnaires.
+        mock_change_status.assert_called_once()
+        self.assertEqual(
+            len(mock_change_status.call_args[1]['changes']), 3)
+
+    @patch('apps.questionnaire.utils.change_status_bulk.send')
+    def test_submit_constant_number_of_queries(self, mock_change_status):
+        with CaptureQueriesContext(connection) as one:
+            handle_bulk_review_actions(
+                self.user, self.questionnaires[:1], 'submit')
+        with CaptureQueriesContext(connection) as two:
+            handle_bulk_review_actions(
+                self.user, self.questionnaires[1:], 'submit')
+        self.assertEqual(len(one), len(two))
+
+    @patch('apps.questionnaire.utils.change_status_bulk.send')
+    def test_wrong_status_is_skipped(self, mock_change_status):
+        self.questionnaires[0].status = 3
+        result = handle_bulk_review_actions(
+            self.user, self.questionnaires, 'submit')
+        self.assertEqual(
+            result['success'], [q.id for q in self.questionnaires[1:]])
+        self.assertIn(self.questionnaires[0].id, result['errors'])
+
+    @patch('apps.questionnaire.utils.change_status_bulk.send')
+    def test_locked_is_skipped(self, mock_change_status):
+        other_user = create_new_user(id=2, email='bar@foo.com')
+        Lock.objects.create(
+            questionnaire_code=self.questionnaires[0].code, user=other_user)
+        result = handle_bulk_review_actions(
+            self.user, self.questionnaires, 'submit')
+        self.assertIn(self.questionnaires[0].id, result['errors'])
+        self.assertEqual(
+            Questionnaire.objects.get(id=self.questionnaires[0].id).status, 1)
+
+    @patch('apps.questionnaire.utils.put_questionnaire_data')
+    @patch('apps.questionnaire.utils.delete_questionnaires_from_es')
+    @patch('apps.questionnaire.utils.change_status_bulk.send')
+    def test_publish(self, mock_change_status, mock_delete, mock_put):
+        self.set_status(settings.QUESTIONNAIRE_REVIEWED)
+        self.set_permissions('publish_questionnaire')
+        previous = mommy.make(
+            Questionnaire, code='bulk_0', status=settings.QUESTIONNAIRE_PUBLIC)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            result = handle_bulk_review_actions(
+                self.user, self.questionnaires, 'publish')
+        self.assertEqual(len(result['success']), 3)
+        self.assertEqual(len(callbacks), 1)
+        mock_delete.assert_called_once_with([previous])
+        mock_put.assert_called_once_with(self.questionnaires)
+        previous.refresh_from_db()
+        self.assertEqual(previous.status, settings.QUESTIONNAIRE_INACTIVE)
+        self.assertEqual(
+            Questionnaire.objects.filter(
+                code__startswith='bulk_',
+                status=settings.QUESTIONNAIRE_PUBLIC
+            ).count(),
+            3
+        )
+
+    @patch('apps.questionnaire.utils.invalidate_details')
+    @patch('apps.questionnaire.utils.remote_user_client')
+    @patch('apps.questionnaire.utils.change_member_bulk.send')
+    def test_assign_users(
+            self, mock_change_member, mock_client, mock_invalidate):
+        self.set_permissions('assign_questionnaire')
+        assigned = create_new_user(id=2, email='bar@foo.com')
+        mock_client.get_user_information.return_value = {'uid': assigned.id}
+        with patch.object(InboxLog.objects, 'sync') as mock_sync:
+            result = handle_bulk_review_actions(
+                self.user, self.questionnaires, 'assign',
+                user_ids=[assigned.id])
+        self.assertEqual(len(result['success']), 3)
+        self.assertEqual(result['user_errors'], {})
+        self.assertEqual(
+            QuestionnaireMembership.objects.filter(
+                user=assigned, role=settings.QUESTIONNAIRE_EDITOR).count(),
+            3
+        )
+        mock_invalidate.assert_called_once_with(
+            *[q.code for q in self.questionnaires])
+        self.assertEqual(mock_sync.call_count, 3)
+        mock_sync.assert_any_call(
+            questionnaire_id=self.questionnaires[0].id, user_ids=[assigned.id])
+        changes = mock_change_member.call_args[1]['changes']
+        self.assertEqual(
+            {change['action'] for change in changes},
+            {settings.NOTIFICATIONS_ADD_MEMBER}
+        )
+
+    @patch('apps.questionnaire.utils.remote_user_client')
+    @patch('apps.questionnaire.utils.change_member_bulk.send')
+    def test_assign_removes_users(self, mock_change_member, mock_client):
+        self.set_permissions('assign_questionnaire')
+        removed = create_new_user(id=2, email='bar@foo.com')
+        for questionnaire in self.questionnaires:
+            questionnaire.add_user(removed, settings.QUESTIONNAIRE_EDITOR)
+        result = handle_bulk_review_actions(
+            self.user, self.questionnaires, 'assign', user_ids=[])
+        self.assertEqual(len(result['success']), 3)
+        self.assertFalse(
+            QuestionnaireMembership.objects.filter(user=removed).exists())
+        changes = mock_change_member.call_args[1]['changes']
+        self.assertEqual(
+            [change['action'] for change in changes],
+            [settings.NOTIFICATIONS_REMOVE_MEMBER] * 3
+        )
+
+    @patch('apps.questionnaire.utils.remote_user_client')
+    @patch('apps.questionnaire.utils.change_member_bulk.send')
+    def test_assign_unknown_user(self, mock_change_member, mock_client):
+        self.set_permissions('assign_questionnaire')
+        mock_client.get_user_information.return_value = None
+        result = handle_bulk_review_actions(
+            self.user, self.questionnaires, 'assign', user_ids=[99])
+        self.assertEqual(list(result['user_errors']), [99])
+
@@ -2,6 +2,7 @@ from unittest.mock import patch, Mock
 
 from apps.qcat.tests import TestCase
 from apps.questionnaire.view_utils import (
+    ESPageWindow,
     ESPagination,
     get_limit_parameter,
     get_page_parameter,
@@ -44,6 +45,22 @@ class ESPaginationTest(TestCase):
         self.assertEqual(p[1:3], ['foo', 'bar', 'faz', 'taz'])
 
 
+class ESPageWindowTest(TestCase):
+
+    def test_len_returns_total(self):
+        self.assertEqual(len(ESPageWindow(['foo'], 20, 100)), 100)
+
+    def test_hits_at_offset(self):
+        window = ESPageWindow(['foo', 'bar'], 20, 100)
+        self.assertEqual(window[19:23], [{}, 'foo', 'bar', {}])
+
+    def test_paginator_returns_hits_of_page(self):
+        paginated, paginator = get_paginator(
+            ESPageWindow(['foo', 'bar'], 2, 5), 2, 2)
+        self.assertEqual(list(paginated), ['foo', 'bar'])
+        self.assertEqual(paginator.count, 5)
+
+
 class GetPaginatorTest(TestCase):
 
     @patch('apps.questionnaire.view_utils.Paginator')
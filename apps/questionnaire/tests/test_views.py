@@ -6,6 +6,7 @@ from django.urls import reverse
 from django.http import Http404
 from django.test.client import RequestFactory
 from unittest.mock import patch, Mock, MagicMock
+from model_mommy import mommy
 
 from apps.accounts.tests.test_models import create_new_user
 from apps.configuration.configuration import (
@@ -15,6 +16,8 @@ from apps.qcat.tests import TestCase
 from apps.questionnaire.models import File, Questionnaire
 from apps.questionnaire.views import (
     generic_file_upload,
+    QuestionnaireBulkReviewView,
+    get_list_validators,
     QuestionnaireEditView,
     QuestionnaireStepView,
     QuestionnaireView, QuestionnaireLinkSearchView)
@@ -243,6 +246,20 @@ class QuestionnaireViewTest(TestCase):
             response.context_data['review_config'], {}
         )
 
+    @patch('apps.questionnaire.views.get_permission_class')
+    @patch.object(QuestionnaireView, 'get_rendered_details')
+    def test_cached_details_without_csrf_token(
+            self, mock_get_rendered_details, mock_get_permission_class):
+        mock_get_permission_class.return_value = 'anonymous'
+        mock_get_rendered_details.return_value = {
+            'images': [], 'sections': [], 'has_content': True}
+        response = self.view.get(self.request)
+        kwargs = mock_get_rendered_details.call_args[1]
+        self.assertIsNone(kwargs['csrf_token'])
+        self.assertNotIn('csrf_token_value', kwargs['review_config'])
+        self.assertIn(
+            'csrf_token_value', response.context_data['review_config'])
+
     @patch.object(QuestionnaireView, 'get_review_config')
     def test_authenticated_review_panel(self, mock_get_review_config):
         self.view.get(self.request)
@@ -421,3 +438,56 @@ class QuestionnaireStepViewTest(TestCase):
         original_locale, show_translation = self.view.get_locale_info()
         self.assertIsNotNone(original_locale)
         self.assertFalse(show_translation)
+
+
+class GetListValidatorsTest(TestCase):
+
+    def test_etag_changes_with_filters_generation(self):
+        request = RequestFactory().get('/en/wocat/list/')
+        with patch('apps.questionnaire.views.get_index_generation',
+                   return_value=1), \
+                patch('apps.questionnaire.views.get_filters_generation',
+                      side_effect=['a', 'b']):
+            first = get_list_validators(request)
+            second = get_list_validators(request)
+        self.assertNotEqual(first['etag'], second['etag'])
+        self.assertNotIn('last_modified', first)
+
+
+class QuestionnaireBulkReviewViewTest(TestCase):
+
+    def setUp(self):
+        self.user = create_new_user()
+        self.questionnaire = mommy.make(Questionnaire, code='bulk_0', status=1)
+        self.url = reverse('bulk_review')
+
+    def post(self, **data):
+        request = RequestFactory().post(self.url, data=data)
+        request.user = self.user
+        return QuestionnaireBulkReviewView.as_view()(request)
+
+    @patch('apps.questionnaire.views.handle_bulk_review_actions')
+    def test_errors_by_id(self, mock_handle):
+        mock_handle.return_value = {
+            'success': [self.questionnaire.id], 'errors': {},
+            'user_errors': {}
+        }
+        response = self.post(**{
+            'action': 'submit',
+            'questionnaire-id': [self.questionnaire.id, 99999],
+        })
+        content = json.loads(response.content)
+        self.assertFalse(content['success'])
+        self.assertEqual(content['updated'], [self.questionnaire.id])
+        self.assertEqual(list(content['errors']), ['99999'])
+        self.assertEqual(
+            mock_handle.call_args[1]['questionnaires'], [self.questionnaire])
+
+    def test_invalid_action(self):
+        response = self.post(**{
+            'action': 'foo', 'questionnaire-id': [self.questionnaire.id]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_id(self):
+        response = self.post(**{'action': 'submit', 'questionnaire-id': 'a'})
+        self.assertEqual(response.status_code, 400)
@@ -14,6 +14,9 @@ urlpatterns = [
     url(r'^edit/(?P<identifier>[^/]+)/lock/$',
         views.QuestionnaireLockView.as_view(),
         name='lock_questionnaire'),
+    url(r'^review/bulk/$',
+        views.QuestionnaireBulkReviewView.as_view(),
+        name='bulk_review'),
     url(r'^geo/',
         views.get_places,
         name='slm_places'),
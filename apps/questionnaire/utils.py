@@ -1,13 +1,15 @@
 import ast
+import contextlib
 import json
 import logging
+from collections import defaultdict
 from uuid import UUID
 
 from django.apps import apps
 from django.contrib import messages
-from django.db import IntegrityError
-from django.db.models import Q
-from django.db.models.signals import pre_save
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Prefetch, Q, Subquery, \
+    prefetch_related_objects
 from django.template.loader import render_to_string
 from django.shortcuts import redirect
 from django.utils.functional import Promise
@@ -21,17 +23,21 @@ from apps.configuration.configuration import QuestionnaireQuestion, \
     QuestionnaireConfiguration
 from apps.configuration.utils import get_configuration_query_filter, \
     get_choices_from_model, get_choices_from_questiongroups
+from apps.notifications.models import InboxLog
 from apps.qcat.errors import QuestionnaireFormatError
 from apps.questionnaire.errors import QuestionnaireLockedException
-from apps.questionnaire.receivers import prevent_updates_on_published_items
+from apps.questionnaire.receivers import allow_updates_on_published_items
 from apps.questionnaire.serializers import QuestionnaireSerializer
 from apps.search.index import (
     put_questionnaire_data,
     delete_questionnaires_from_es,
 )
+from .cache import invalidate_details
 from .conf import settings
-from .models import Questionnaire, Flag, Lock
-from .signals import change_status, change_member, delete_questionnaire
+from .models import Questionnaire, Flag, Lock, QuestionnaireLink, \
+    QuestionnaireMembership
+from .signals import change_status, change_member, delete_questionnaire, \
+    change_member_bulk, change_status_bulk
 
 logger = logging.getLogger(__name__)
 
@@ -2163,30 +2169,28 @@ def handle_review_actions(request, questionnaire_object, configuration_code):
             )
             return
 
-        if questionnaire_object.status == settings.QUESTIONNAIRE_PUBLIC:
-            pre_save.disconnect(
-                prevent_updates_on_published_items, sender=Questionnaire)
+        is_public = questionnaire_object.status == settings.QUESTIONNAIRE_PUBLIC
         questionnaire_object.is_deleted = True
 
-        try:
-            questionnaire_object.save()
-        except QuestionnaireLockedException as e:
-            # If the same user also has a lock, then release this lock.
-            if e.user == request.user:
-                Lock.objects.filter(
-                    user=request.user,
-                    questionnaire_code=questionnaire_object.code
-                ).update(
-                    is_finished=True
-                )
+        with allow_updates_on_published_items() if is_public \
+                else contextlib.nullcontext():
+            try:
                 questionnaire_object.save()
-            else:
-                return
+            except QuestionnaireLockedException as e:
+                # If the same user also has a lock, then release this lock.
+                if e.user == request.user:
+                    Lock.objects.filter(
+                        user=request.user,
+                        questionnaire_code=questionnaire_object.code
+                    ).update(
+                        is_finished=True
+                    )
+                    questionnaire_object.save()
+                else:
+                    return
 
-        if questionnaire_object.status == settings.QUESTIONNAIRE_PUBLIC:
+        if is_public:
             delete_questionnaires_from_es([questionnaire_object])
-            pre_save.connect(
-                prevent_updates_on_published_items, sender=Questionnaire)
         messages.success(request, _('The questionnaire was succesfully removed'))
         delete_questionnaire.send(
             sender=settings.NOTIFICATIONS_DELETE,
@@ -2201,6 +2205,362 @@ def handle_review_actions(request, questionnaire_object, configuration_code):
         if other_questionnaire is None:
             return redirect('accounts:account_questionnaires')
 
+# Bulk review actions: allowed previous status, required permission (per
+# previous status) and the new status.
+BULK_STATUS_ACTIONS = {
+    'submit': {
+        settings.QUESTIONNAIRE_DRAFT: 'submit_questionnaire',
+    },
+    'review': {
+        settings.QUESTIONNAIRE_SUBMITTED: 'review_questionnaire',
+    },
+    'publish': {
+        settings.QUESTIONNAIRE_REVIEWED: 'publish_questionnaire',
+    },
+    'reject': {
+        settings.QUESTIONNAIRE_SUBMITTED: 'review_questionnaire',
+        settings.QUESTIONNAIRE_REVIEWED: 'publish_questionnaire',
+    },
+}
+BULK_NEW_STATUS = {
+    'submit': settings.QUESTIONNAIRE_SUBMITTED,
+    'review': settings.QUESTIONNAIRE_REVIEWED,
+    'publish': settings.QUESTIONNAIRE_PUBLIC,
+    'reject': settings.QUESTIONNAIRE_DRAFT,
+}
+# Role of the user executing the action, which is added to the questionnaire.
+BULK_ACTION_ROLES = {
+    ('review', settings.QUESTIONNAIRE_SUBMITTED):
+        settings.QUESTIONNAIRE_REVIEWER,
+    ('reject', settings.QUESTIONNAIRE_SUBMITTED):
+        settings.QUESTIONNAIRE_REVIEWER,
+    ('reject', settings.QUESTIONNAIRE_REVIEWED):
+        settings.QUESTIONNAIRE_PUBLISHER,
+}
+# Role of assigned users, depending on the status of the questionnaire.
+BULK_ASSIGN_ROLES = {
+    settings.QUESTIONNAIRE_DRAFT: settings.QUESTIONNAIRE_EDITOR,
+    settings.QUESTIONNAIRE_SUBMITTED: settings.QUESTIONNAIRE_REVIEWER,
+    settings.QUESTIONNAIRE_REVIEWED: settings.QUESTIONNAIRE_PUBLISHER,
+}
+
+
+def handle_bulk_review_actions(user, questionnaires, action, message='',
+                               user_ids=None):
+    """
+    Apply a review action to many questionnaires at once. This is the bulk
+    variant of ``handle_review_actions`` for the actions submit, review,
+    publish, reject and assign.
+
+    All changes are made in one transaction, with a number of queries which
+    does not depend on the number of questionnaires: the memberships, the
+    status and the locks of all questionnaires are queried at once, the
+    questionnaires and memberships are updated in bulk and the notification
+    logs are created in bulk (signals ``change_status_bulk``,
+    ``change_member_bulk``). The index is updated with one batch after the
+    transaction is committed. Questionnaires which do not have the correct
+    status, which are locked or where the user is missing the permission are
+    skipped and reported as error.
+
+    Args:
+        ``user`` (accounts.models.User): The user executing the action.
+
+        ``questionnaires`` (list): The questionnaires to update.
+
+        ``action`` (str): The review action.
+
+    Kwargs:
+        ``message`` (str): The message of the status change.
+
+        ``user_ids`` (list): The IDs of the users to assign (action
+        'assign' only).
+
+    Returns:
+        ``dict``. The IDs of the updated questionnaires (``success``), the
+        error messages by questionnaire ID (``errors``) and the error
+        messages by ID of the users which could not be assigned
+        (``user_errors``).
+    """
+    if action not in BULK_NEW_STATUS and action != 'assign':
+        raise ValueError('Invalid bulk review action: {}'.format(action))
+
+    result = {'success': [], 'errors': {}, 'user_errors': {}}
+
+    with transaction.atomic():
+        prefetch_related_objects(questionnaires, Prefetch(
+            'questionnairemembership_set',
+            queryset=QuestionnaireMembership.objects.select_related('user')
+        ))
+        if action == 'assign':
+            _bulk_assign_users(user, questionnaires, user_ids or [], result)
+        else:
+            published = _bulk_change_status(
+                user, questionnaires, action, message, result
+            )
+            if published:
+                _bulk_publish(user, published)
+
+    # The prefetched memberships are outdated now.
+    for questionnaire in questionnaires:
+        questionnaire._prefetched_objects_cache.pop(
+            'questionnairemembership_set', None)
+
+    return result
+
+
+def _get_status_and_locks(questionnaires) -> dict:
+    """
+    The status (in the database) and the user of the active lock of all
+    questionnaires, by ID. This is the bulk variant of the pre_save receiver
+    ``check_status_and_locks``.
+    """
+    active_locks = Lock.with_status.is_blocked(code=OuterRef('code'))
+    return {
+        questionnaire_id: (status, locked_by)
+        for questionnaire_id, status, locked_by in
+        Questionnaire.objects.filter(
+            id__in=[q.id for q in questionnaires]
+        ).annotate(
+            locked_by=Subquery(active_locks.values('user_id')[:1])
+        ).values_list('id', 'status', 'locked_by')
+    }
+
+
+def _bulk_update_status(questionnaires):
+    """
+    Store the status of the questionnaires with one query. bulk_update sends
+    no signals, so the cached details are invalidated here (see receiver
+    ``invalidate_cached_details``).
+    """
+    Questionnaire.objects.bulk_update(questionnaires, ['status'])
+    codes = [q.code for q in questionnaires]
+    linked_codes = QuestionnaireLink.objects.filter(
+        Q(from_questionnaire__code__in=codes) |
+        Q(to_questionnaire__code__in=codes)
+    ).values_list('from_questionnaire__code', 'to_questionnaire__code')
+    invalidate_details(*codes, *[
+        code for link_codes in linked_codes for code in link_codes
+    ])
+
+
+def _bulk_create_memberships(memberships):
+    """
+    Create the memberships with one query. bulk_create sends no signals, so
+    the cached details are invalidated and the inboxes of the new members are
+    synchronized here (see the receivers of QuestionnaireMembership).
+    """
+    if not memberships:
+        return
+    QuestionnaireMembership.objects.bulk_create(memberships)
+    invalidate_details(*[m.questionnaire.code for m in memberships])
+    user_ids = defaultdict(set)
+    for membership in memberships:
+        user_ids[membership.questionnaire_id].add(membership.user_id)
+    for questionnaire_id, questionnaire_user_ids in user_ids.items():
+        InboxLog.objects.sync(
+            questionnaire_id=questionnaire_id,
+            user_ids=list(questionnaire_user_ids)
+        )
+
+
+def _bulk_change_status(user, questionnaires, action, message, result):
+    """
+    Update the status of all valid questionnaires; returns the published ones.
+    """
+    # Locks of the current user are released, same as with single actions.
+    Lock.objects.filter(
+        user=user,
+        questionnaire_code__in=[q.code for q in questionnaires]
+    ).update(is_finished=True)
+
+    permitted = []
+    for questionnaire in questionnaires:
+        permission = BULK_STATUS_ACTIONS[action].get(questionnaire.status)
+        if permission is None:
+            result['errors'][questionnaire.id] = _(
+                'The questionnaire does not have the correct status.')
+            continue
+
+        __, permissions = questionnaire.get_roles_permissions(user)
+        if permission not in permissions:
+            result['errors'][questionnaire.id] = _(
+                'You do not have permission to do so.')
+            continue
+        permitted.append(questionnaire)
+
+    status_and_locks = _get_status_and_locks(permitted)
+    updated = []
+    new_memberships = []
+    changes = []
+    for questionnaire in permitted:
+        status, locked_by = status_and_locks.get(questionnaire.id, (None, None))
+        if status == settings.QUESTIONNAIRE_PUBLIC:
+            result['errors'][questionnaire.id] = _(
+                'Published questionnaires must not be updated.')
+            continue
+        if locked_by:
+            result['errors'][questionnaire.id] = _(
+                'The questionnaire is locked by another user.')
+            continue
+
+        previous_status = questionnaire.status
+        role = BULK_ACTION_ROLES.get((action, previous_status))
+        if role and user not in questionnaire.get_users_by_role(role):
+            new_memberships.append(QuestionnaireMembership(
+                questionnaire=questionnaire, user=user, role=role
+            ))
+
+        questionnaire.status = BULK_NEW_STATUS[action]
+        updated.append(questionnaire)
+        changes.append({
+            'questionnaire': questionnaire,
+            'message': message,
+            'previous_status': previous_status,
+            'is_rejected': action == 'reject',
+        })
+        result['success'].append(questionnaire.id)
+
+    _bulk_create_memberships(new_memberships)
+    if updated:
+        _bulk_update_status(updated)
+
+    change_status_bulk.send(
+        sender=settings.NOTIFICATIONS_CHANGE_STATUS,
+        changes=changes,
+        user=user
+    )
+    if action == 'publish':
+        return updated
+    return []
+
+
+def _bulk_publish(user, published):
+    """
+    Set all previously public versions to inactive and update the index (in
+    one batch, once the transaction is committed).
+    """
+    previously_public = list(Questionnaire.objects.filter(
+        code__in=[q.code for q in published],
+        status=settings.QUESTIONNAIRE_PUBLIC
+    ).exclude(
+        id__in=[q.id for q in published]
+    ))
+    changes = []
+    for previous_object in previously_public:
+        previous_object.status = settings.QUESTIONNAIRE_INACTIVE
+        changes.append({
+            'questionnaire': previous_object,
+            'message': _('New version was published'),
+            'previous_status': settings.QUESTIONNAIRE_PUBLIC,
+        })
+    if previously_public:
+        _bulk_update_status(previously_public)
+    change_status_bulk.send(
+        sender=settings.NOTIFICATIONS_CHANGE_STATUS,
+        changes=changes,
+        user=user
+    )
+
+    # Linked public questionnaires are indexed again, so changes (eg. name
+    # change) appear in their links.
+    linked = Questionnaire.objects.filter(
+        status=settings.QUESTIONNAIRE_PUBLIC,
+        id__in=QuestionnaireLink.objects.filter(
+            from_questionnaire__in=published
+        ).values('to_questionnaire')
+    ).exclude(
+        id__in=[q.id for q in published]
+    )
+
+    def update_index():
+        if previously_public:
+            delete_questionnaires_from_es(previously_public)
+        put_questionnaire_data([*published, *linked])
+
+    transaction.on_commit(update_index)
+
+
+def _bulk_assign_users(user, questionnaires, user_ids, result):
+    """
+    Set the assigned users (role depending on the status) of all
+    questionnaires.
+    """
+    # Get or create the users only once, not once per questionnaire.
+    assigned_users = []
+    for user_id in user_ids:
+        user_info = remote_user_client.get_user_information(user_id)
+        if not user_info:
+            result['user_errors'][user_id] = _('The user does not exist.')
+            continue
+        try:
+            assigned_user = User.objects.get(pk=user_id)
+        except User.DoesNotExist:
+            try:
+                assigned_user = User.create_new(
+                    id=user_id, email=user_info['email'])
+            except IntegrityError:
+                result['user_errors'][user_id] = _(
+                    'The user could not be updated.')
+                continue
+        remote_user_client.update_user(assigned_user, user_info)
+        assigned_users.append(assigned_user)
+
+    new_memberships = []
+    changes = []
+    removed_memberships = Q(pk__in=[])
+    for questionnaire in questionnaires:
+        role = BULK_ASSIGN_ROLES.get(questionnaire.status)
+        if role is None:
+            result['errors'][questionnaire.id] = _(
+                'No users can be assigned to this questionnaire because of '
+                'its status.')
+            continue
+
+        __, permissions = questionnaire.get_roles_permissions(user)
+        if 'assign_questionnaire' not in permissions:
+            result['errors'][questionnaire.id] = _(
+                'You do not have permissions to assign a user to this '
+                'questionnaire.')
+            continue
+
+        previous_users = questionnaire.get_users_by_role(role)
+        for assigned_user in assigned_users:
+            if assigned_user not in previous_users:
+                new_memberships.append(QuestionnaireMembership(
+                    questionnaire=questionnaire, user=assigned_user, role=role
+                ))
+                changes.append({
+                    'action': settings.NOTIFICATIONS_ADD_MEMBER,
+                    'questionnaire': questionnaire,
+                    'affected': assigned_user,
+                    'role': role,
+                })
+        removed_users = [u for u in previous_users if u not in assigned_users]
+        for removed_user in removed_users:
+            changes.append({
+                'action': settings.NOTIFICATIONS_REMOVE_MEMBER,
+                'questionnaire': questionnaire,
+                'affected': removed_user,
+                'role': role,
+            })
+        if removed_users:
+            removed_memberships |= Q(
+                questionnaire=questionnaire, role=role, user__in=removed_users
+            )
+        result['success'].append(questionnaire.id)
+
+    _bulk_create_memberships(new_memberships)
+    # Send the signal while removed users are still members, so they are
+    # notified.
+    change_member_bulk.send(
+        sender=settings.NOTIFICATIONS_ADD_MEMBER,
+        changes=changes,
+        user=user
+    )
+    # The receivers of post_delete invalidate the details and synchronize the
+    # inboxes of the removed members.
+    QuestionnaireMembership.objects.filter(removed_memberships).delete()
+
 
 def compare_questionnaire_data(data_1, data_2):
     """
@@ -25,6 +25,33 @@ class ESPagination(Sequence):
         return self.data
 
 
+class ESPageWindow(Sequence):
+    """
+    The hits of a single page of Elasticsearch results, placed at their
+    position (the offset) within all results. All other positions are empty
+    dicts. This allows the Django Paginator to count and slice all results
+    without building a list of ``total`` items.
+    """
+    def __init__(self, hits, offset, total):
+        self.hits = hits
+        self.offset = offset
+        self.total = max(total, offset + len(hits))
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.total))]
+        if index < 0:
+            index += self.total
+        if not 0 <= index < self.total:
+            raise IndexError(index)
+        if self.offset <= index < self.offset + len(self.hits):
+            return self.hits[index - self.offset]
+        return {}
+
+
 def get_paginator(objects, page, limit, offset=None, total=None):
     """
     Create and return a Paginator filled with the objects and paginated
@@ -1,5 +1,6 @@
 import collections
 import contextlib
+import functools
 import json
 import logging
 import sys
@@ -32,9 +33,13 @@ from django.views.decorators.http import require_POST
 from django.views.generic import View
 from django.views.generic.base import TemplateResponseMixin, TemplateView
 from braces.views import LoginRequiredMixin
-from elasticsearch import TransportError
+from elasticsearch import ConnectionError as ESConnectionError, \
+    TransportError
 
 from apps.accounts.views import QuestionnaireSearchView
+from apps.qcat.decorators import conditional_public_page
+from apps.qcat.utils import get_etag, get_not_modified_response, \
+    is_public_request, patch_validators
 from apps.configuration.cache import get_configuration
 from apps.configuration.utils import get_configuration_index_filter
 from apps.questionnaire.signals import change_questionnaire_data
@@ -42,8 +47,14 @@ from apps.questionnaire.upload import (
     retrieve_file,
     UPLOAD_THUMBNAIL_CONTENT_TYPE,
 )
-from apps.search.search import advanced_search, get_aggregated_values
-
+from apps.search.search import advanced_search, get_aggregated_values, \
+    LIST_SOURCE
+from apps.search.utils import get_index_generation
+
+from .cache import get_cached_details, get_cached_filters, \
+    get_cached_list, get_details_generation, get_filters_generation, \
+    get_permission_class, get_prefetched_list_page, set_cached_list, \
+    set_prefetched_list_page
 from .errors import QuestionnaireLockedException
 from .models import Questionnaire, File, QUESTIONNAIRE_ROLES, Lock, Flag
 
@@ -56,9 +67,11 @@ from .utils import (
     get_questiongroup_data_from_translation_form,
     get_questionnaire_data_in_single_language,
     get_questionnaire_data_for_translation_form,
+    handle_bulk_review_actions,
     handle_review_actions,
     query_questionnaire)
 from .view_utils import (
+    ESPageWindow,
     ESPagination,
     get_pagination_parameters,
     get_paginator,
@@ -669,15 +682,13 @@ class QuestionnaireView(QuestionnaireRetrieveMixin, StepsMixin, InheritedDataMix
                 and self.object.status == settings.QUESTIONNAIRE_PUBLIC:
             return HttpResponseRedirect(self.object.get_absolute_url())
 
-        questionnaire_data = self.questionnaire_data
-        if self.has_object:
-            inherited_data = self.get_inherited_data()
-            questionnaire_data.update(inherited_data)
-
-        data = get_questionnaire_data_in_single_language(
-            questionnaire_data=questionnaire_data, locale=get_language(),
-            original_locale=self.object.original_locale if self.object else None
-        )
+        # Answer conditional requests of anonymous users before rendering.
+        validators = None
+        if self.has_object and is_public_request(request):
+            validators = self.get_validators()
+            response = get_not_modified_response(request, **validators)
+            if response is not None:
+                return patch_validators(response, **validators)
 
         other_version_status = None
         if self.has_object:
@@ -713,33 +724,33 @@ class QuestionnaireView(QuestionnaireRetrieveMixin, StepsMixin, InheritedDataMix
         csrf_token = get_token(
             self.request) if 'edit_questionnaire' in permissions else None
 
-        images = self.questionnaire_configuration.get_image_data(data).get(
-            'content', [])
-
         # TODO: Highlight changes disabled.
         # For the time being, the function to show changes has been
         # disabled. Delete the following line to reenable it.
         edited_questiongroups = []
 
-        complete, total = self.questionnaire_configuration.get_completeness(
-            data)
-        try:
-            completeness_percentage = int(round(complete / total * 100))
-        except ZeroDivisionError:
-            completeness_percentage = 0
-
-        sections = self.questionnaire_configuration.get_details(
-            data, permissions=permissions,
-            edit_step_route='{}:questionnaire_new_step'.format(
-                self.url_namespace.replace('apps.', '')),
-            questionnaire_object=self.object or None,
-            csrf_token=csrf_token,
-            edited_questiongroups=edited_questiongroups,
-            view_mode=self.view_mode,
-            links=self.get_links(),
-            review_config=review_config,
-            user=request.user if request.user.is_authenticated else None,
-            completeness_percentage=completeness_percentage
+        # Rendering the sections is expensive; for requests without user
+        # specific content the rendered details are served from the cache.
+        # The CSRF token is specific to the request and must not be part of
+        # the cached details; the page renders it outside of the details.
+        if get_permission_class(request.user) is not None:
+            details_csrf_token = None
+            details_review_config = {
+                key: value for key, value in review_config.items()
+                if key != 'csrf_token_value'
+            }
+        else:
+            details_csrf_token = csrf_token
+            details_review_config = review_config
+        details = get_cached_details(
+            questionnaire=self.object, view_mode=self.view_mode,
+            user=request.user,
+            render_details=functools.partial(
+                self.get_rendered_details, permissions=permissions,
+                csrf_token=details_csrf_token,
+                edited_questiongroups=edited_questiongroups,
+                review_config=details_review_config
+            )
         )
 
         modules = {}
@@ -762,8 +773,8 @@ class QuestionnaireView(QuestionnaireRetrieveMixin, StepsMixin, InheritedDataMix
                 }
 
         context = {
-            'images': images,
-            'sections': sections,
+            'images': details['images'],
+            'sections': details['sections'],
             'links': links,
             'modules': modules,
             'module_form_config': module_form_config,
@@ -774,7 +785,7 @@ class QuestionnaireView(QuestionnaireRetrieveMixin, StepsMixin, InheritedDataMix
             'view_mode': 'edit',
             'is_blocked': not can_edit,
             'toc_content': self.questionnaire_configuration.get_toc_data(),
-            'has_content': bool(data),
+            'has_content': details['has_content'],
             'review_config': review_config,
             'questionnaires_in_progress': self.questionnaires_in_progress(),
             'base_template': '{}/base.html'.format(self.url_namespace.replace('apps.', '')),
@@ -784,7 +795,72 @@ class QuestionnaireView(QuestionnaireRetrieveMixin, StepsMixin, InheritedDataMix
         if hasattr(self, 'get_context_data'):
             context = self.get_context_data(**context)
 
-        return self.render_to_response(context=context)
+        response = self.render_to_response(context=context)
+        if validators:
+            patch_validators(response, **validators)
+        return response
+
+    def get_validators(self) -> dict:
+        """
+        Validators for the details page of the current object. Changes to
+        linked questionnaires, members and flags reset the generation of the
+        cached details, but not the updated timestamp of the questionnaire;
+        therefore there is no Last-Modified validator, only an ETag.
+        """
+        return {
+            'etag': get_etag(
+                self.object.id, self.object.version,
+                self.object.updated.timestamp(), self.view_mode,
+                self.url_namespace, get_details_generation(self.object.code)
+            ),
+        }
+
+    def get_rendered_details(self, permissions, csrf_token,
+                             edited_questiongroups, review_config) -> dict:
+        """
+        Render the sections of the questionnaire and collect the images.
+
+        Returns: dict
+        """
+        questionnaire_data = self.questionnaire_data
+        if self.has_object:
+            inherited_data = self.get_inherited_data()
+            questionnaire_data.update(inherited_data)
+
+        data = get_questionnaire_data_in_single_language(
+            questionnaire_data=questionnaire_data, locale=get_language(),
+            original_locale=self.object.original_locale if self.object else None
+        )
+
+        images = self.questionnaire_configuration.get_image_data(data).get(
+            'content', [])
+
+        complete, total = self.questionnaire_configuration.get_completeness(
+            data)
+        try:
+            completeness_percentage = int(round(complete / total * 100))
+        except ZeroDivisionError:
+            completeness_percentage = 0
+
+        user = self.request.user
+        sections = self.questionnaire_configuration.get_details(
+            data, permissions=permissions,
+            edit_step_route='{}:questionnaire_new_step'.format(
+                self.url_namespace.replace('apps.', '')),
+            questionnaire_object=self.object or None,
+            csrf_token=csrf_token,
+            edited_questiongroups=edited_questiongroups,
+            view_mode=self.view_mode,
+            links=self.get_links(),
+            review_config=review_config,
+            user=user if user.is_authenticated else None,
+            completeness_percentage=completeness_percentage
+        )
+        return {
+            'images': images,
+            'sections': sections,
+            'has_content': bool(data),
+        }
 
     def post(self, request, *args, **kwargs):
         """
@@ -1184,6 +1260,11 @@ class ESQuestionnaireQueryMixin:
     """
     Mixin to query paginated Questionnaires from elasticsearch.
     """
+    # Source filter of the hits, only the fields required for lists are
+    # fetched by default.
+    es_source = LIST_SOURCE
+    # Set if elasticsearch is not available, the list is empty then.
+    es_unavailable = False
 
     def set_attributes(self):
         """
@@ -1208,10 +1289,14 @@ class ESQuestionnaireQueryMixin:
             self.configuration_code = 'wocat'
 
         # Use a specific edition if specified or use the latest by default.
-        edition = settings.FILTER_EDITIONS.get(
-            self.configuration_code,
-            Configuration.latest_by_code(self.configuration_code).edition
-        )
+        edition = settings.FILTER_EDITIONS.get(self.configuration_code)
+        if edition is None:
+            edition = get_cached_filters(
+                'latest_edition',
+                lambda: Configuration.latest_by_code(
+                    self.configuration_code).edition,
+                code=self.configuration_code
+            )
         self.configuration = get_configuration(self.configuration_code, edition)
 
         self.search_configuration_codes = get_configuration_index_filter(
@@ -1220,20 +1305,38 @@ class ESQuestionnaireQueryMixin:
 
     def get_es_results(self, call_from=None):
         """
-        Query and return elasticsearch results.
+        Query and return elasticsearch results. Only the hits of the current
+        page are fetched, ES counts the total of all hits anyway. If
+        QUESTIONNAIRE_LIST_PREFETCH_NEXT_PAGE is set, the hits of the next page
+        are fetched as well and cached for a short time.
 
         Returns:
             dict. Elasticsearch query result.
         """
+        search_params = dict(
+            limit=self.page_size, offset=self.offset, source=self.es_source,
+            **self.get_filter_params()
+        )
+        prefetch = settings.QUESTIONNAIRE_LIST_PREFETCH_NEXT_PAGE
+        if prefetch:
+            es_search_results = get_prefetched_list_page(search_params)
+            if es_search_results is not None:
+                return es_search_results
+
         try:
             # Blank search returns all items within all indexes.
-            es_search_results = advanced_search(
-                limit=10 * self.page_size, offset=self.offset,
-                **self.get_filter_params()
-            )
+            if prefetch:
+                es_search_results = self.search_and_prefetch(search_params)
+            else:
+                es_search_results = advanced_search(**search_params)
+        except ESConnectionError as error:
+            return self.get_es_unavailable_results(error, call_from)
         except TransportError:
             # See https://redmine.cde.unibe.ch/issues/1093
-            es_search_results = advanced_search(limit=0)
+            try:
+                es_search_results = advanced_search(limit=0, source=False)
+            except ESConnectionError as error:
+                return self.get_es_unavailable_results(error, call_from)
             total = es_search_results.get('hits', {}).get('total', 0)
             # If the page is not within the valid total return an empty response
             if total < self.offset:
@@ -1248,6 +1351,44 @@ class ESQuestionnaireQueryMixin:
 
         return es_search_results
 
+    def get_es_unavailable_results(self, error, call_from=None):
+        """
+        Handle the given ESConnectionError: the API re-raises it, all other
+        views are rendered without results.
+        """
+        if call_from == 'api':
+            raise error
+        logger.error('Elasticsearch is not available.', exc_info=error)
+        self.es_unavailable = True
+        return {}
+
+    def search_and_prefetch(self, search_params):
+        """
+        Fetch the current and the next page in one query, cache the next page
+        and return the current page. Near the end of the ES pagination window,
+        only the current page is fetched.
+        """
+        try:
+            es_search_results = advanced_search(**dict(
+                search_params, limit=2 * self.page_size))
+        except ESConnectionError:
+            # Elasticsearch is not available, do not try again.
+            raise
+        except TransportError:
+            return advanced_search(**search_params)
+        es_hits = es_search_results.get('hits', {})
+        hits = es_hits.get('hits', [])
+
+        next_params = dict(search_params, offset=self.offset + self.page_size)
+        set_prefetched_list_page(next_params, dict(
+            es_search_results,
+            hits=dict(es_hits, hits=hits[self.page_size:])
+        ))
+        return dict(
+            es_search_results,
+            hits=dict(es_hits, hits=hits[:self.page_size])
+        )
+
     def get_es_paginated_results(self, es_search_results):
         """
         Returns:
@@ -1259,7 +1400,8 @@ class ESQuestionnaireQueryMixin:
 
     def get_es_pagination(self, es_pagination):
         return get_paginator(
-            es_pagination.data, self.current_page, self.page_size, offset=self.offset, total=es_pagination.total
+            ESPageWindow(es_pagination.data, self.offset, es_pagination.total),
+            self.current_page, self.page_size
         )
 
     def get_filter_params(self):
@@ -1305,6 +1447,21 @@ class ESQuestionnaireQueryMixin:
         return query_string, filter_params
 
 
+def get_list_validators(request, *args, **kwargs) -> dict:
+    """
+    The list pages only change with the contents of the index, the filters
+    (e.g. new projects) or the query. No Last-Modified: the filters
+    generation is not a timestamp.
+    """
+    return {
+        'etag': get_etag(
+            request.get_full_path(), request.is_ajax(),
+            get_index_generation(), get_filters_generation()
+        ),
+    }
+
+
+@method_decorator(conditional_public_page(get_list_validators), name='get')
 class QuestionnaireListView(TemplateView, ESQuestionnaireQueryMixin):
     configuration_code = None
     configuration = None
@@ -1314,12 +1471,37 @@ class QuestionnaireListView(TemplateView, ESQuestionnaireQueryMixin):
     def get(self, request, *args, **kwargs):
         self.set_attributes()
         if self.request.is_ajax():
-            return JsonResponse(self.get_context_data(**kwargs))
+            response = JsonResponse(self.get_context_data(**kwargs))
         else:
-            return super().get(request, *args, **kwargs)
+            response = super().get(request, *args, **kwargs)
+        if self.es_unavailable:
+            # The degraded (empty) list must not be cached.
+            response.status_code = 503
+        return response
 
     def get_context_data(self, **kwargs):
+        """
+        The rendered parts of the list are the same for all anonymous users
+        with the same query, they are cached until the index changes.
+        """
+        if not is_public_request(self.request):
+            return self.get_list_context_data()
+
+        view_name = f'{self.call_from}_{self.template_configuration_code}'
+        context = get_cached_list(view_name, self.configuration, self.request)
+        if context is None:
+            context = self.get_list_context_data()
+            if not self.es_unavailable:
+                set_cached_list(
+                    view_name, self.configuration, self.request, context)
+        return context
+
+    def get_list_context_data(self):
         es_results = self.get_es_results(call_from=self.call_from)
+        if self.es_unavailable and not self.request.is_ajax():
+            messages.error(self.request, _(
+                'The search is temporarily not available. Please try again '
+                'later.'))
         es_pagination = self.get_es_paginated_results(es_results)
         questionnaires, self.pagination = self.get_es_pagination(es_pagination)
 
@@ -1342,6 +1524,13 @@ class QuestionnaireListView(TemplateView, ESQuestionnaireQueryMixin):
         Get the configuration for the global filter which is available for all
         types of questionnaires.
         """
+        return get_cached_filters(
+            'global', self.build_global_filter_configuration,
+            code=self.configuration.keyword,
+            edition=self.configuration.edition
+        )
+
+    def build_global_filter_configuration(self):
         filter_configuration = {
             'projects': [(p.id, str(p)) for p in Project.objects.all()],
             'institutions': Institution.as_select(),
@@ -1428,6 +1617,13 @@ class QuestionnaireFilterView(QuestionnaireListView):
         Returns:
             A nested list with choices (FilterKeys) grouped by section label.
         """
+        return get_cached_filters(
+            'advanced', self.build_advanced_filter_select,
+            code=self.configuration.keyword,
+            edition=self.configuration.edition
+        )
+
+    def build_advanced_filter_select(self):
         filter_keys = self.configuration.get_filter_keys()
         grouped = []
         it = groupby(filter_keys, operator.attrgetter('section_label'))
@@ -1456,9 +1652,12 @@ class QuestionnaireFilterView(QuestionnaireListView):
             if key_path not in advanced_filter_paths:
                 continue
 
-            aggregated_values = get_aggregated_values(
-                questiongroup, key, active_filter['type'],
-                **self.get_filter_params())
+            if self.es_unavailable:
+                aggregated_values = {}
+            else:
+                aggregated_values = get_aggregated_values(
+                    questiongroup, key, active_filter['type'],
+                    **self.get_filter_params())
 
             values_counted = []
             for c in active_filter.get('choices', []):
@@ -1717,9 +1916,60 @@ class QuestionnaireLockView(LoginRequiredMixin, View):
             questionnaire_code=self.kwargs['identifier'],
             user=self.request.user
         )
+        Lock.reap()
         return HttpResponse(status=200)
 
 
+class QuestionnaireBulkReviewView(LoginRequiredMixin, View):
+    """
+    Apply a review action (submit, review, publish, reject, assign) to many
+    questionnaires at once. Expects the POST values ``action``,
+    ``questionnaire-id`` (list of IDs), optionally ``message`` and
+    ``user-id`` (comma separated, for 'assign'). The IDs of the updated
+    questionnaires and the errors by questionnaire ID (and by user ID) are
+    returned.
+    """
+
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        try:
+            questionnaire_ids = [
+                int(i) for i in request.POST.getlist('questionnaire-id')
+            ]
+            user_ids = [
+                int(i) for i in request.POST.get('user-id', '').split(',') if i
+            ]
+        except ValueError:
+            return JsonResponse({'success': False}, status=400)
+
+        questionnaires = list(Questionnaire.with_status.not_deleted().filter(
+            id__in=questionnaire_ids
+        ).select_related('configuration'))
+
+        try:
+            result = handle_bulk_review_actions(
+                user=request.user,
+                questionnaires=questionnaires,
+                action=request.POST.get('action', ''),
+                message=request.POST.get('message', ''),
+                user_ids=user_ids,
+            )
+        except ValueError:
+            return JsonResponse({'success': False}, status=400)
+
+        missing = set(questionnaire_ids) - {q.id for q in questionnaires}
+        for questionnaire_id in missing:
+            result['errors'][questionnaire_id] = _('Questionnaire not found.')
+
+        return JsonResponse({
+            'success': not result['errors'] and not result['user_errors'],
+            'updated': result['success'],
+            'errors': result['errors'],
+            'user_errors': result['user_errors'],
+        })
+
+
 def get_places(request):
     place = Questionnaire.objects.filter(geom__isvalid=True).filter(is_deleted=False).filter(status=6)
     response_records = []
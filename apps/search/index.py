@@ -1,26 +1,58 @@
+import functools
+import os
+
 import elasticsearch
 from django.conf import settings
 from elasticsearch.helpers import reindex, bulk
 
 from apps.configuration.configuration import QuestionnaireConfiguration
-from apps.questionnaire.models import Questionnaire
+from apps.questionnaire.models import Questionnaire, prefetch_metadata
 from apps.questionnaire.serializers import QuestionnaireSerializer
-from .utils import get_analyzer, get_alias, force_strings, ElasticsearchAlias
+from .utils import get_analyzer, get_alias, force_strings, ElasticsearchAlias, \
+    bump_index_generation, InstrumentedTransport
 
 
 def get_elasticsearch():
     """
-    Return an instance of the elastic search with the connection as
-    specified in the settings (``ES_HOST`` and ``ES_PORT``).
+    Return the instance of the elastic search with the connection as
+    specified in the settings (``ES_HOST`` and ``ES_PORT``). The instance
+    (and its pool of connections) is created on first use and shared within
+    the process. Forked processes create their own instance.
 
     Returns:
         ``elasticsearch.Elasticsearch``.
     """
+    return _get_elasticsearch(os.getpid())
+
+
+@functools.lru_cache(maxsize=None)
+def _get_elasticsearch(pid):
     return elasticsearch.Elasticsearch(
-        [{'host': settings.ES_HOST, 'port': settings.ES_PORT}])
+        [{'host': settings.ES_HOST, 'port': settings.ES_PORT}],
+        transport_class=InstrumentedTransport,
+        maxsize=settings.ES_MAXSIZE,
+        timeout=settings.ES_TIMEOUT,
+        max_retries=settings.ES_MAX_RETRIES,
+        retry_on_timeout=True,
+        sniff_on_start=False,
+        sniff_on_connection_fail=False,
+    )
 
 
-es = get_elasticsearch()
+class ElasticsearchProxy:
+    """
+    Delegates to the instance of the current process (see get_elasticsearch)
+    on every access. Unlike a lazy object, it never keeps the instance (and
+    the connections) of the process in which it was first used, so forked
+    processes do not share the connections of their parent.
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_elasticsearch(), name)
+
+
+# No connection is opened before the first request to elasticsearch.
+es = ElasticsearchProxy()
 
 
 def get_mappings():
@@ -292,15 +324,24 @@ def put_questionnaire_data(questionnaire_objects, **kwargs):
 
         ``list``. A list of errors occurred.
     """
+    # Serializing reads the metadata and links of each questionnaire; fetch
+    # them for all questionnaires at once.
+    questionnaire_objects = list(questionnaire_objects)
+    prefetch_metadata(questionnaire_objects)
+
     refresh_aliases = set()
+    # The indexing plans only depend on the configuration.
+    plans = {}
 
     actions = []
     for obj in questionnaire_objects:
 
-        alias = get_alias(
-            ElasticsearchAlias.from_configuration(configuration=obj.configuration_object)
-        )
-        refresh_aliases.add(alias)
+        configuration = obj.configuration_object
+        plan_key = (configuration.keyword, configuration.edition)
+        if plan_key not in plans:
+            plans[plan_key] = IndexingPlan(configuration)
+        plan = plans[plan_key]
+        refresh_aliases.add(plan.alias)
 
         serialized = QuestionnaireSerializer(instance=obj).data
 
@@ -315,17 +356,8 @@ def put_questionnaire_data(questionnaire_objects, **kwargs):
             serialized['list_data']['country'] = None
 
         # Collect the filter values as specified in the configuration
-        # Global filter keys first
-        filter_paths = [
-            (f'{qg}__{key}', key, qg)
-            for qg, key in settings.QUESTIONNAIRE_GLOBAL_FILTER_PATHS]
-        # Extend with specific filter keys for this configuration.
-        filter_paths.extend([
-            (filter_key.path, filter_key.key, filter_key.questiongroup)
-            for filter_key in obj.configuration_object.get_filter_keys()])
-
         filter_data = {}
-        for path, key, questiongroup in filter_paths:
+        for path, key, questiongroup in plan.filter_paths:
             q_data = [
                 qg_data.get(key) for qg_data in obj.data.get(questiongroup, [])]
             # Remove None values and add only if not empty.
@@ -335,7 +367,7 @@ def put_questionnaire_data(questionnaire_objects, **kwargs):
         serialized['filter_data'] = filter_data
 
         # Add ordered values to document data
-        for ordered_filter in get_ordered_filter_values(obj.configuration_object):
+        for ordered_filter in plan.ordered_filter_values:
             ordered_qg_data = serialized.get(
                 'data', {}).get(ordered_filter[0], [])
 
@@ -346,7 +378,7 @@ def put_questionnaire_data(questionnaire_objects, **kwargs):
                 ordered_data[f'{ordered_filter[1]}_order'] = values_order
 
         action = {
-            '_index': alias,
+            '_index': plan.alias,
             '_type': 'questionnaire',
             '_id': obj.id,
             '_source': serialized,
@@ -356,9 +388,30 @@ def put_questionnaire_data(questionnaire_objects, **kwargs):
     actions_executed, errors = bulk(es, actions, **kwargs)
 
     es.indices.refresh(index=','.join(refresh_aliases))
+    bump_index_generation()
     return actions_executed, errors
 
 
+class IndexingPlan:
+    """
+    The values of a configuration (code and edition) which are required to
+    build the documents of its questionnaires: the alias of the index, the
+    filter paths (global filter keys first) and the ordered filter values.
+    """
+
+    def __init__(self, configuration: QuestionnaireConfiguration):
+        self.alias = get_alias(
+            ElasticsearchAlias.from_configuration(configuration=configuration)
+        )
+        self.filter_paths = [
+            (f'{qg}__{key}', key, qg)
+            for qg, key in settings.QUESTIONNAIRE_GLOBAL_FILTER_PATHS]
+        self.filter_paths.extend([
+            (filter_key.path, filter_key.key, filter_key.questiongroup)
+            for filter_key in configuration.get_filter_keys()])
+        self.ordered_filter_values = get_ordered_filter_values(configuration)
+
+
 def get_ordered_filter_values(configuration: QuestionnaireConfiguration) -> list:
     """
     Get a list of all (checkbox) values which are ordered. This (may) be used for filters (?).
@@ -388,8 +441,9 @@ def put_all_data():
     """
     Put data from all configurations to the es index.
     """
+    questionnaires = Questionnaire.with_status.public().with_metadata()
     put_questionnaire_data(
-        questionnaire_objects=Questionnaire.with_status.public(),
+        questionnaire_objects=questionnaires,
         request_timeout=60
     )
 
@@ -414,6 +468,8 @@ def delete_questionnaires_from_es(questionnaire_objects):
         except:
             pass
 
+    bump_index_generation()
+
 
 def delete_all_indices(prefix=settings.ES_INDEX_PREFIX):
     """
@@ -428,6 +484,7 @@ def delete_all_indices(prefix=settings.ES_INDEX_PREFIX):
         successful.
     """
     deleted = es.indices.delete(index=f'{prefix}*')
+    bump_index_generation()
     if deleted.get('acknowledged') is not True:
         return False, 'Indices could not be deleted'
 
@@ -449,6 +506,7 @@ def delete_single_index(index):
         successful.
     """
     deleted = es.indices.delete(index=index, ignore=[404])
+    bump_index_generation()
     if deleted.get('acknowledged') is not True:
         return False, 'Index could not be deleted'
 
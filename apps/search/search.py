@@ -4,10 +4,14 @@ from django.conf import settings
 from elasticsearch import TransportError
 
 from apps.questionnaire.models import Questionnaire
-from .index import get_elasticsearch
+from .index import es
 from .utils import get_alias, ElasticsearchAlias
 
-es = get_elasticsearch()
+# Source filter for documents which are displayed in lists (see
+# get_list_values). The filter values (and the data of older documents) are
+# only used for querying and must not be transferred.
+LIST_SOURCE_EXCLUDES = ['data', 'filter_data']
+LIST_SOURCE = {'excludes': LIST_SOURCE_EXCLUDES}
 
 
 def get_es_query(
@@ -148,7 +152,7 @@ def get_es_query(
 def advanced_search(
         filter_params: list=None, query_string: str='',
         configuration_codes: list=None, limit: int=10,
-        offset: int=0, match_all: bool=True) -> dict:
+        offset: int=0, match_all: bool=True, source=None) -> dict:
     """
     Kwargs:
         ``filter_params`` (list): A list of filter parameters. Each
@@ -177,6 +181,10 @@ def advanced_search(
         If not all filters must be matched, the results are ordered by relevance
         to show hits matching more filters at the top. Defaults to False.
 
+        ``source`` (dict or bool): Source filter of the hits (``_source``,
+        e.g. ``LIST_SOURCE``, or False if no hits are needed). By default, the
+        full documents are returned.
+
     Returns:
         ``dict``. The search results as returned by
         ``elasticsearch.Elasticsearch.search``.
@@ -184,6 +192,8 @@ def advanced_search(
     query = get_es_query(
         filter_params=filter_params, query_string=query_string,
         match_all=match_all)
+    if source is not None:
+        query['_source'] = source
 
     if configuration_codes is None:
         configuration_codes = []
@@ -242,13 +252,16 @@ def get_aggregated_values(
 
 def get_element(questionnaire: Questionnaire) -> dict:
     """
-    Get a single element from elasticsearch.
+    Get a single element from elasticsearch, with the same fields as the
+    elements of lists.
     """
     alias = get_alias(
         ElasticsearchAlias.from_configuration(configuration=questionnaire.configuration_object)
     )
     try:
-        return es.get_source(index=alias, id=questionnaire.pk, doc_type='questionnaire')
+        return es.get_source(
+            index=alias, id=questionnaire.pk, doc_type='questionnaire',
+            _source_exclude=LIST_SOURCE_EXCLUDES)
     except TransportError:
         return {}
 
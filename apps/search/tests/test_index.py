@@ -3,7 +3,8 @@ import logging
 
 import pytest
 from django.conf import settings
-from django.test.utils import override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 from elasticsearch import RequestError
 from unittest.mock import patch, Mock
 from elasticmock import elasticmock
@@ -11,7 +12,7 @@ from elasticmock import elasticmock
 from apps.configuration.cache import get_configuration
 from apps.configuration.configuration import QuestionnaireConfiguration
 from apps.qcat.tests import TestCase
-from apps.questionnaire.models import Questionnaire
+from apps.questionnaire.models import Questionnaire, QuestionnaireLink
 from apps.questionnaire.serializers import QuestionnaireSerializer
 from apps.questionnaire.tests.test_models import get_valid_questionnaire
 from apps.search.index import (
@@ -19,6 +20,7 @@ from apps.search.index import (
     delete_all_indices,
     delete_questionnaires_from_es,
     delete_single_index,
+    ElasticsearchProxy,
     get_elasticsearch,
     get_mappings,
     put_questionnaire_data,
@@ -74,6 +76,15 @@ class ESIndexMixin:
             }, 'mappings': {}}
 
 
+class ElasticsearchProxyTest(TestCase):
+
+    def test_instance_per_pid(self):
+        proxy = ElasticsearchProxy()
+        self.assertIs(proxy.transport, get_elasticsearch().transport)
+        with patch('apps.search.index.os.getpid', return_value=-1):
+            self.assertIsNot(proxy.transport, es.transport)
+
+
 class GetMappingsTest(TestCase):
     def test_returns_dictionary(self):
         mappings = get_mappings()
@@ -346,6 +357,46 @@ class PutQuestionnaireDataTest(TestCase):
         }]
         mock_bulk.assert_called_once_with(mock_es, data)
 
+    @patch('apps.search.index.get_ordered_filter_values')
+    @patch('apps.search.index.es')
+    @patch('apps.search.index.bulk')
+    def test_builds_plan_once_per_configuration(
+            self, mock_bulk, mock_es, mock_get_ordered_filter_values):
+        mock_bulk.return_value = 0, []
+        mock_get_ordered_filter_values.return_value = []
+        put_questionnaire_data([
+            get_valid_questionnaire(), get_valid_questionnaire()])
+        mock_get_ordered_filter_values.assert_called_once()
+        self.assertEqual(len(mock_bulk.call_args[0][1]), 2)
+
+    @patch('apps.search.index.es')
+    @patch('apps.search.index.bulk')
+    def test_queries_do_not_grow_with_questionnaires(self, mock_bulk, mock_es):
+        mock_bulk.return_value = 0, []
+        link = get_valid_questionnaire()
+        link.status = settings.QUESTIONNAIRE_PUBLIC
+        link.save()
+        ids = []
+        for _ in range(6):
+            questionnaire = get_valid_questionnaire()
+            QuestionnaireLink.objects.create(
+                from_questionnaire=questionnaire,
+                from_status=settings.QUESTIONNAIRE_DRAFT,
+                to_questionnaire=link, to_status=settings.QUESTIONNAIRE_PUBLIC)
+            ids.append(questionnaire.id)
+
+        def count_queries(questionnaire_ids):
+            with CaptureQueriesContext(connection) as context:
+                put_questionnaire_data(Questionnaire.objects.filter(
+                    id__in=questionnaire_ids).select_related('configuration'))
+            return len(context)
+
+        # Warm up the configuration cache.
+        count_queries(ids[:1])
+        self.assertEqual(count_queries(ids[:2]), count_queries(ids))
+        source = mock_bulk.call_args[0][1][0]['_source']
+        self.assertEqual(source['links'][0]['code'], link.code)
+
     @patch('apps.search.index.es')
     def test_calls_indices_refresh(self, mock_es):
         put_questionnaire_data([])
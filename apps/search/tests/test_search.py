@@ -1,7 +1,7 @@
 from unittest.mock import patch
 
 from apps.qcat.tests import TestCase
-from apps.search.search import advanced_search
+from apps.search.search import advanced_search, LIST_SOURCE
 
 
 TEST_INDEX_PREFIX = 'qcat_test_prefix_'
@@ -47,3 +47,10 @@ class AdvancedSearchTest(TestCase):
     def test_returns_search(self, mock_es):
         ret = advanced_search(filter_params=[])
         self.assertEqual(ret, mock_es.search())
+
+    @patch('apps.search.search.get_alias')
+    @patch('apps.search.search.es')
+    def test_calls_search_with_source(self, mock_es, mock_get_alias):
+        advanced_search(filter_params=[], source=LIST_SOURCE)
+        body = mock_es.search.call_args[1]['body']
+        self.assertEqual(body['_source'], {'excludes': ['data', 'filter_data']})
@@ -2,10 +2,11 @@
 from django.utils.translation import ugettext_lazy as _
 from django.test.utils import override_settings
 from elasticsearch import TransportError
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 from apps.qcat.tests import TestCase
 from apps.search.utils import (
+    CircuitBreaker,
     get_alias,
     get_analyzer,
     check_connection,
@@ -115,3 +116,29 @@ class ForceStringsTest(TestCase):
     def test_multi_level(self):
         multi_level = force_strings(self.multi_level)
         self.assertIsInstance(multi_level['a']['b']['c'], str)
+
+
+class CircuitBreakerTest(TestCase):
+
+    def setUp(self):
+        self.circuit_breaker = CircuitBreaker(threshold=2, reset_timeout=30)
+
+    def test_opens_after_threshold(self):
+        self.circuit_breaker.record_failure()
+        self.assertFalse(self.circuit_breaker.is_open)
+        self.circuit_breaker.record_failure()
+        self.assertTrue(self.circuit_breaker.is_open)
+
+    def test_success_resets_failures(self):
+        self.circuit_breaker.record_failure()
+        self.circuit_breaker.record_success()
+        self.circuit_breaker.record_failure()
+        self.assertFalse(self.circuit_breaker.is_open)
+
+    @patch('apps.search.utils.time.monotonic')
+    def test_closes_after_reset_timeout(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        self.circuit_breaker.record_failure()
+        self.circuit_breaker.record_failure()
+        mock_monotonic.return_value = 131
+        self.assertFalse(self.circuit_breaker.is_open)
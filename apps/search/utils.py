@@ -1,5 +1,14 @@
+import time
+
 from django.conf import settings
-from elasticsearch import TransportError
+from django.core.cache import cache
+from elasticsearch import ConnectionError as ESConnectionError, Transport, \
+    TransportError
+
+from apps.qcat.instrumentation import timed
+
+# Cache key of the timestamp of the last change to any of the indices.
+INDEX_GENERATION_CACHE_KEY = 'es_index_generation'
 
 
 def get_analyzer(language_code):
@@ -20,6 +29,92 @@ def get_analyzer(language_code):
         return None
 
 
+def get_index_generation() -> float:
+    """
+    Return the 'generation' of the elasticsearch indices: the timestamp of the
+    last change to any of the indices. Everything that is derived from search
+    results (e.g. validators of the list pages) can use this to detect
+    changes.
+
+    Returns:
+        ``float``. The timestamp of the last change.
+    """
+    generation = cache.get(INDEX_GENERATION_CACHE_KEY)
+    if generation is None:
+        generation = bump_index_generation()
+    return generation
+
+
+def bump_index_generation() -> float:
+    """
+    Mark the indices as changed. Call this whenever documents are added to or
+    removed from the indices.
+
+    Returns:
+        ``float``. The new generation.
+    """
+    generation = time.time()
+    cache.set(INDEX_GENERATION_CACHE_KEY, generation, timeout=None)
+    return generation
+
+
+class CircuitBreaker:
+    """
+    Fail fast if elasticsearch is not reachable: after ``threshold``
+    consecutive connection errors, the circuit is opened and no requests are
+    sent for ``reset_timeout`` seconds. The next request after this timeout
+    is sent again; if it fails, the circuit is opened again.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: int):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None and \
+            time.monotonic() - self.opened_at < self.reset_timeout
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class InstrumentedTransport(Transport):
+    """
+    Count and time all requests to elasticsearch for the instrumentation of
+    requests. Requests fail immediately with a ``ConnectionError`` while the
+    circuit breaker is open.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.circuit_breaker = CircuitBreaker(
+            threshold=settings.ES_CIRCUIT_BREAKER_THRESHOLD,
+            reset_timeout=settings.ES_CIRCUIT_BREAKER_RESET_TIMEOUT,
+        )
+
+    def perform_request(self, *args, **kwargs):
+        if self.circuit_breaker.is_open:
+            raise ESConnectionError(
+                'N/A', 'Circuit breaker is open', None)
+        with timed('es_requests', 'es_seconds'):
+            try:
+                response = super().perform_request(*args, **kwargs)
+            except ESConnectionError:
+                self.circuit_breaker.record_failure()
+                raise
+        self.circuit_breaker.record_success()
+        return response
+
+
 class ElasticsearchAlias:
     """
     Wrapper for consistent access to a unique string identifying a configuration edition.
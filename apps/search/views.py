@@ -16,7 +16,7 @@ from .index import (
     create_or_update_index,
     delete_all_indices,
     delete_single_index,
-    get_elasticsearch,
+    es,
     get_mappings,
     put_questionnaire_data,
 )
@@ -26,8 +26,6 @@ from apps.configuration.cache import get_configuration
 from apps.configuration.models import Configuration
 from apps.questionnaire.models import Questionnaire
 
-es = get_elasticsearch()
-
 
 @login_required
 def admin(request):
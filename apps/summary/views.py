@@ -19,6 +19,9 @@ from apps.summary.renderers.technologies_2018 import \
 
 from wkhtmltopdf.views import PDFTemplateView, PDFTemplateResponse
 
+from apps.qcat.utils import get_etag, get_not_modified_response, \
+    is_public_request, patch_validators
+from apps.questionnaire.cache import get_details_generation
 from apps.questionnaire.models import Questionnaire
 from apps.questionnaire.utils import get_query_status_filter, \
     get_questionnaire_data_in_single_language
@@ -247,7 +250,32 @@ class SummaryPDFCreateView(PDFTemplateView):
         if self.is_doc_file:
             self.response_class = self.doc_response_class
         self.track_request()
-        return super().get(request, *args, **kwargs)
+
+        if not is_public_request(request):
+            return super().get(request, *args, **kwargs)
+
+        # Creating the summary is expensive, answer conditional requests of
+        # anonymous users right away.
+        validators = self.get_validators()
+        response = get_not_modified_response(request, **validators)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return patch_validators(response, **validators)
+
+    def get_validators(self) -> dict:
+        """
+        As for the details page, members and linked questionnaires do not
+        touch the updated timestamp, so only an ETag including the generation
+        of the cached details is emitted.
+        """
+        return {
+            'etag': get_etag(
+                self.filename, self.request.GET.get('as', ''),
+                self.request.GET.get('template', 'base'),
+                apps.get_app_config('summary').css_file_hash,
+                get_details_generation(self.questionnaire.code)
+            ),
+        }
 
     def get_template_names(self):
         template = self.request.GET.get('template', 'base')
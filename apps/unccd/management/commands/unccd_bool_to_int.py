@@ -1,9 +1,8 @@
 from django.core.management.base import BaseCommand
-from django.db.models.signals import pre_save
 
 from apps.configuration.cache import get_configuration
 from apps.questionnaire.models import Questionnaire
-from apps.questionnaire.receivers import prevent_updates_on_published_items
+from apps.questionnaire.receivers import allow_updates_on_published_items
 
 
 class Command(BaseCommand):
@@ -19,20 +18,13 @@ class Command(BaseCommand):
     This is not efficient or nice, but needs to be run just once.
     """
     def handle(self, **options):
-        pre_save.disconnect(
-            prevent_updates_on_published_items, sender=Questionnaire
-        )
-
         configuration_code = 'unccd'
 
         config = get_configuration(configuration_code, edition='2015')
         questionnaires = Questionnaire.objects.filter(
             code__startswith=configuration_code)
-        self.find_int_values(questionnaires, config)
-
-        pre_save.connect(
-            prevent_updates_on_published_items, sender=Questionnaire
-        )
+        with allow_updates_on_published_items():
+            self.find_int_values(questionnaires, config)
 
     def find_int_values(self, questionnaires, config):
         for questionnaire in questionnaires:
@@ -2,10 +2,9 @@ import csv
 
 import os
 from django.core.management.base import BaseCommand
-from django.db.models.signals import pre_save
 
 from apps.questionnaire.models import Questionnaire
-from apps.questionnaire.receivers import prevent_updates_on_published_items
+from apps.questionnaire.receivers import allow_updates_on_published_items
 from apps.questionnaire.conf import settings
 
 
@@ -22,10 +21,6 @@ class Command(BaseCommand):
     """
     def handle(self, **options):
 
-        # Temporarily disconnect the signal preventing updates on published
-        # Questionnaires.
-        pre_save.disconnect(prevent_updates_on_published_items, sender=Questionnaire)
-
         filename = 'qcat_prais_data_language_mapping.csv'
         with open(os.path.join(os.path.dirname(__file__), filename)) as file:
             reader = csv.reader(file)
@@ -33,11 +28,10 @@ class Command(BaseCommand):
             # Skip the header
             next(reader)
 
-            for row in reader:
-                map_language(row[0], row[3], row[4])
-
-        # Reconnect the signal.
-        pre_save.connect(prevent_updates_on_published_items, sender=Questionnaire)
+            # Published questionnaires are updated as well.
+            with allow_updates_on_published_items():
+                for row in reader:
+                    map_language(row[0], row[3], row[4])
 
 
 def map_language(questionnaire_id, language, delete):
@@ -1,14 +1,12 @@
 from datetime import datetime
 
-import petl
 import psycopg2
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
 from apps.wocat.management.commands.import_wocat_data import ImportObject, \
-    WOCATImport, WOCAT_DATE_FORMAT, QCAT_DATE_FORMAT
-from apps.wocat.management.commands.qa_mapping import qa_mapping, custom_mapping_messages
+    WOCATImport, WOCAT_DATE_FORMAT, QCAT_DATE_FORMAT, add_performance_arguments
 
 
 # Characters used when merging multiple text entries into single (comments)
@@ -46,6 +44,7 @@ class Command(BaseCommand):
             help='Write a file which contains all mapping messages occuring '
                  'during the import.',
         )
+        add_performance_arguments(parser)
 
     def handle(self, *args, **options):
         options['dry-run'] = options.get('do-import') is not True
@@ -100,8 +99,8 @@ class QAImport(WOCATImport):
 
     default_compiler_id = 3726
 
-    mapping = qa_mapping
-    custom_mapping_messages = custom_mapping_messages
+    mapping_module = 'qa_mapping'
+    mapping_name = 'qa_mapping'
 
     def __init__(self, command_options):
 
@@ -121,36 +120,10 @@ class QAImport(WOCATImport):
         Query and put together all QA objects which will be imported.
         """
 
-        def get_tables(mappings):
-            """
-            Recursively collect all WOCAT tables of the mappings.
-
-            Args:
-                mappings: list.
-
-            Returns:
-                list. A list of tables.
-            """
-            tables = []
-            for mapping in mappings:
-                table = mapping.get('wocat_table')
-                if table:
-                    tables.append(table)
-                tables.extend(get_tables(mapping.get('mapping', [])))
-                tables.extend(get_tables(mapping.get('conditions', [])))
-            return tables
-
         self.output('Fetching data from WOCAT QA database.', v=1)
 
         # Extend the default tables by adding the ones from the mapping.
-        tables = self.default_tables
-        for qg_properties in self.mapping.values():
-            questions = qg_properties.get('questions', {})
-            for q_properties in questions.values():
-                tables.extend(get_tables(q_properties.get('mapping', [])))
-
-        # Remove duplicates
-        tables = list(set(tables))
+        tables = sorted(set(self.default_tables) | self.mapping_tables)
 
         # Try to query the lookup table and collect its values.
         try:
@@ -160,7 +133,7 @@ class QAImport(WOCATImport):
                 """.format(schema=self.schema,
                            table_name=self.lookup_table_name)
             lookup_table = {}
-            for row in petl.dicts(petl.fromdb(self.connection, lookup_query)):
+            for row in self.fetch_rows(lookup_query):
                 lookup_table[row.get('id')] = row
         except AttributeError:
             lookup_table = {}
@@ -176,8 +149,7 @@ class QAImport(WOCATImport):
                 """.format(schema=self.schema,
                            table_name=self.file_info_table)
             file_infos = {}
-            for row in petl.dicts(
-                    petl.fromdb(self.connection, lookup_query_files)):
+            for row in self.fetch_rows(lookup_query_files):
                 file_infos[row.get('blob_id')] = row
         except AttributeError:
             file_infos = {}
@@ -186,9 +158,8 @@ class QAImport(WOCATImport):
             query = 'SELECT {columns} FROM {schema}.{table_name};'.format(
                 columns='*', schema=self.schema, table_name=table_name)
 
-            queried_table = petl.fromdb(self.connection, query)
             row_errors = False
-            for row in petl.dicts(queried_table):
+            for row in self.fetch_rows(query):
 
                 if row_errors is True:
                     continue
@@ -214,12 +185,13 @@ class QAImport(WOCATImport):
                 if import_object is None:
                     import_object = QAImportObject(
                         identifier, self.command_options, lookup_table,
-                        lookup_table_text, file_infos, self.image_url)
+                        lookup_table_text, file_infos, self.image_url,
+                        owners=self.owners)
 
                     import_object.add_custom_mapping_messages(
                         self.custom_mapping_messages)
 
-                    self.import_objects.append(import_object)
+                    self.add_import_object(import_object)
 
                 # Set the code if it is available in the current table
                 code = row.get(self.questionnaire_code)
@@ -280,7 +252,7 @@ class QAImport(WOCATImport):
             import_objects = []
             for filter_identifier in self.import_objects_filter:
                 import_object = self.get_import_object(filter_identifier)
-                if import_object:
+                if import_object and import_object.code != '':
                     import_objects.append(import_object)
             self.import_objects = import_objects
 
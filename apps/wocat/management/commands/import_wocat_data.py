@@ -2,18 +2,23 @@ from itertools import zip_longest
 
 from collections import OrderedDict
 
+import functools
+import importlib
+import multiprocessing
+import os
 import re
 from datetime import datetime
+from uuid import uuid4
 import json
 import pprint
 import psycopg2
-import petl as etl
 import requests
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import UploadedFile
 from django.core.management import color_style
 from django.core.management.base import BaseCommand
+from django.db import connections, transaction
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import activate
@@ -25,8 +30,6 @@ from apps.notifications.receivers import create_questionnaire
 from apps.questionnaire import signals
 from apps.questionnaire.models import Questionnaire, File
 from apps.questionnaire.utils import clean_questionnaire_data
-from apps.wocat.management.commands.qt_mapping import qt_mapping, \
-    custom_mapping_messages
 
 pp = pprint.PrettyPrinter(indent=2)
 
@@ -66,6 +69,13 @@ FILE_CONTENT_MAPPING = {
 
 MAPPING_MESSAGES_FILENAME = 'wocat_import_mapping_messages.txt'
 
+# Codes of the inserted questionnaires, used to resume an interrupted import.
+CHECKPOINT_FILENAME = 'wocat_import_checkpoint_{schema}.json'
+
+# Number of rows fetched at once from the WOCAT database, and number of
+# questionnaires inserted per transaction.
+DEFAULT_CHUNK_SIZE = 100
+
 
 def sort_by_key(entry, key, none_value=0):
     """
@@ -130,6 +140,7 @@ class Command(BaseCommand):
             help='Write a file which contains all mapping messages occuring '
                  'during the import.',
         )
+        add_performance_arguments(parser)
 
     def handle(self, *args, **options):
         start_time = datetime.now()
@@ -143,6 +154,140 @@ class Command(BaseCommand):
         print("End of import. Duration: {}.".format(end_time - start_time))
 
 
+def add_performance_arguments(parser):
+    parser.add_argument(
+        '--processes',
+        type=int,
+        dest='processes',
+        default=1,
+        help='Number of processes used for the mapping of the data.',
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        dest='chunk-size',
+        default=DEFAULT_CHUNK_SIZE,
+        help='Number of rows fetched at once, and of questionnaires inserted '
+             'per transaction.',
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        dest='resume',
+        default=False,
+        help='Skip the questionnaires inserted by a previous (interrupted) '
+             'import.',
+    )
+
+
+def get_mapping_tables(mappings) -> set:
+    """
+    Recursively collect all WOCAT tables of the mappings.
+    """
+    tables = set()
+    for mapping in mappings:
+        table = mapping.get('wocat_table')
+        if table:
+            tables.add(table)
+        tables |= get_mapping_tables(mapping.get('mapping', []))
+        tables |= get_mapping_tables(mapping.get('conditions', []))
+    return tables
+
+
+def check_condition_operators(mapping):
+    """
+    Recursively check that all operators of the conditions in the mapping are
+    valid (see CONDITION_OPERATORS). Raises NotImplementedError otherwise.
+    """
+    if isinstance(mapping, list):
+        for sub_mapping in mapping:
+            check_condition_operators(sub_mapping)
+        return
+    if not isinstance(mapping, dict):
+        return
+    for condition in mapping.get('conditions') or []:
+        if condition.get('operator') == 'custom':
+            operators = [
+                custom.get('operator')
+                for custom in condition.get('custom', [])
+            ]
+        else:
+            operators = [condition.get('operator')]
+        for operator in operators:
+            if operator not in CONDITION_OPERATORS:
+                raise NotImplementedError(
+                    'Condition operator "{}" not specified or not '
+                    'valid'.format(operator))
+    for value in mapping.values():
+        check_condition_operators(value)
+
+
+@functools.lru_cache()
+def load_mapping(module_name: str, mapping_name: str) -> tuple:
+    """
+    The mappings are huge literals (qt_mapping has more than 20k lines). They
+    are only imported when an import is run, not when this module is
+    imported, and prepared once: (mapping, custom mapping messages, all
+    tables used by the mapping). The operators of all conditions are checked
+    here, before any object is mapped.
+
+    The mapping itself is not compiled, it is still walked for each object
+    (see ImportObject.map_data).
+    """
+    module = importlib.import_module(
+        'apps.wocat.management.commands.{}'.format(module_name))
+    mapping = getattr(module, mapping_name)
+    check_condition_operators(mapping)
+    tables = set()
+    for qg_properties in mapping.values():
+        for q_properties in qg_properties.get('questions', {}).values():
+            tables |= get_mapping_tables(q_properties.get('mapping', []))
+    return mapping, module.custom_mapping_messages, frozenset(tables)
+
+
+def _contains_one_of(cond_value, ref_value, negate=False):
+    if isinstance(ref_value, list):
+        if len(ref_value) == 0:
+            return False
+        elif len(ref_value) > 1:
+            raise Exception(
+                'List for one_of ({}) should contain exactly 1 '
+                'element.'.format(ref_value))
+        ref_value = ref_value[0]
+    if negate:
+        return ref_value not in cond_value
+    return ref_value in cond_value
+
+
+# Predicates of the condition operators, called with the value of the
+# condition and the reference value (usually a list).
+CONDITION_OPERATORS = {
+    'contains': lambda cond_value, ref_value: cond_value in ref_value,
+    'contains_not': lambda cond_value, ref_value: cond_value not in ref_value,
+    'len_lte': lambda cond_value, ref_value: len(ref_value) <= int(cond_value),
+    'len_gte': lambda cond_value, ref_value: len(ref_value) >= int(cond_value),
+    'is_empty': lambda cond_value, ref_value: len(ref_value) == 0,
+    'not_empty': lambda cond_value, ref_value: len(ref_value) != 0,
+    'one_of': _contains_one_of,
+    'not_one_of': functools.partial(_contains_one_of, negate=True),
+}
+
+
+# The import of which the objects are mapped in the worker processes.
+_mapping_import = None
+
+
+def _map_import_object(index):
+    """
+    Map a single import object in a worker process. The import (including the
+    lookup tables) is inherited from the parent process when forking, only
+    the results of the mapping are sent back.
+    """
+    import_object = _mapping_import.import_objects[index]
+    import_object.map_data(_mapping_import.mapping)
+    return index, import_object.get_mapping_results()
+
+
 class Logger:
     """
     A mixin used to log output.
@@ -181,16 +326,17 @@ class ImportObject(Logger):
     """
     Represents an object of the WOCAT database to be imported.
     """
-
     def __init__(
             self, identifier, command_options, lookup_table, lookup_table_text,
-            file_infos, image_url):
+            file_infos, image_url, owners=None):
         self.identifier = identifier
         self.command_options = command_options
         self.lookup_table = lookup_table
         self.lookup_table_text = lookup_table_text
         self.file_infos = file_infos
         self.image_url = image_url
+        # Users by ID, shared by all objects of an import.
+        self.owners = owners if owners is not None else {}
 
         # Data will be stored as
         # {
@@ -282,21 +428,25 @@ class ImportObject(Logger):
         if user_id == 165:
             user_id = 551
 
-        try:
-            # Check if user already exists in the DB
-            user = User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            # If User does not exist, create and update it.
-            user_info = remote_user_client.get_user_information(user_id)
-
-            if not user_info:
-                self.add_error(
-                    'validation', 'User with ID {} does not exist.'.format(
-                        user_id))
-                return
-
-            user, created = User.objects.get_or_create(pk=user_info['uid'])
-            remote_user_client.update_user(user, user_info)
+        # The owner is set for each row of each table, query each user once.
+        user = self.owners.get(user_id)
+        if user is None:
+            try:
+                # Check if user already exists in the DB
+                user = User.objects.get(pk=user_id)
+            except User.DoesNotExist:
+                # If User does not exist, create and update it.
+                user_info = remote_user_client.get_user_information(user_id)
+
+                if not user_info:
+                    self.add_error(
+                        'validation', 'User with ID {} does not exist.'.format(
+                            user_id))
+                    return
+
+                user, created = User.objects.get_or_create(pk=user_info['uid'])
+                remote_user_client.update_user(user, user_info)
+            self.owners[user_id] = user
 
         self.questionnaire_owner = user
 
@@ -352,6 +502,9 @@ class ImportObject(Logger):
         table_data.append(new_table_data)
         self.wocat_data[table_name] = table_data
 
+    def release_wocat_data(self):
+        self.wocat_data = {}
+
     def get_wocat_table_data(self, table_name):
         return self.wocat_data.get(table_name)
 
@@ -401,13 +554,10 @@ class ImportObject(Logger):
         if errors:
             return
 
-        # Since max_length is ignored, add at least a mapping message that the
-        # text was too long
-        __, errors_text_limit = clean_questionnaire_data(
-            self.data_json, configuration, no_limit_check=False)
-        for error in errors_text_limit:
-            self.add_mapping_message(
-                'Ignoring max_length error: {}'.format(error))
+        # The data used to be cleaned a second time with identical arguments,
+        # to collect max_length errors as mapping messages. As the first
+        # cleaning already returns on errors, this never found anything and
+        # was removed.
 
         self.data_json_cleaned = cleaned_data
 
@@ -509,6 +659,22 @@ class ImportObject(Logger):
             self.add_error('mapping', 'Unsupported content type: {}'.format(
                 mapped_content_type))
 
+    def map_data(self, mapping):
+        for qg_name, qg_properties in mapping.items():
+            self.questiongroup_mapping(qg_name, qg_properties)
+
+    def get_mapping_results(self) -> dict:
+        return {
+            'data_json': self.data_json,
+            'mapping_errors': self.mapping_errors,
+            'validation_errors': self.validation_errors,
+            'mapping_messages': self.mapping_messages,
+        }
+
+    def set_mapping_results(self, results: dict):
+        for attribute, value in results.items():
+            setattr(self, attribute, value)
+
     def add_custom_mapping_messages(self, custom_messages):
         for custom_mapping_message in custom_messages:
             if self.identifier in custom_mapping_message.get('ids', []):
@@ -560,7 +726,7 @@ class ImportObject(Logger):
 
         def evaluate_condition(operator, cond_value, ref_value):
             """
-            Evaluate a condition.
+            Evaluate a condition (see CONDITION_OPERATORS).
 
             Args:
                 operator: The operator of the evaluation, eg. "contains".
@@ -571,35 +737,12 @@ class ImportObject(Logger):
             Returns:
                 bool.
             """
-            if operator == 'contains':
-                return cond_value in ref_value
-            elif operator == 'contains_not':
-                return cond_value not in ref_value
-            elif operator == 'len_lte':
-                return len(ref_value) <= int(cond_value)
-            elif operator == 'len_gte':
-                return len(ref_value) >= int(cond_value)
-            elif operator == 'is_empty':
-                return len(ref_value) == 0
-            elif operator == 'not_empty':
-                return len(ref_value) != 0
-            elif operator in ['one_of', 'not_one_of']:
-                if isinstance(ref_value, list):
-                    if len(ref_value) == 0:
-                        return False
-                    elif len(ref_value) > 1:
-                        raise Exception(
-                            'List for one_of ({}) should contain exactly 1 '
-                            'element.'.format(ref_value))
-                    ref_value = ref_value[0]
-                if operator == 'one_of':
-                    return ref_value in cond_value
-                elif operator == 'not_one_of':
-                    return ref_value not in cond_value
-            else:
+            predicate = CONDITION_OPERATORS.get(operator)
+            if predicate is None:
                 raise NotImplementedError(
                     'Condition operator "{}" not specified or not valid'.format(
                         operator))
+            return predicate(cond_value, ref_value)
 
         evaluated = []
 
@@ -1567,15 +1710,24 @@ class WOCATImport(Logger):
     questionnaire_code = ''
     questionnaire_owner = ''
     tables = []
-    mapping = {}
+    # Module and name of the mapping, see load_mapping.
+    mapping_module = ''
+    mapping_name = ''
 
     def __init__(self, command_options):
         self.command_options = command_options
+        self.mapping, self.custom_mapping_messages, self.mapping_tables = \
+            load_mapping(self.mapping_module, self.mapping_name)
         self.connection = psycopg2.connect(settings.WOCAT_IMPORT_DATABASE_URL)
         self.query_limit = 'NULL'
 
         # A collection of all objects to be imported.
         self.import_objects = []
+        # All collected objects by identifier.
+        self.import_objects_index = {}
+        # Users by ID, passed to all import objects, see
+        # ImportObject.set_owner.
+        self.owners = {}
 
         self.configuration = get_configuration(
             code=self.configuration_code, edition='2015'
@@ -1589,25 +1741,6 @@ class WOCATImport(Logger):
         Returns:
 
         """
-        def get_tables(mappings):
-            """
-            Recursively collect all WOCAT tables of the mappings.
-
-            Args:
-                mappings: list.
-
-            Returns:
-                list. A list of tables.
-            """
-            tables = []
-            for mapping in mappings:
-                table = mapping.get('wocat_table')
-                if table:
-                    tables.append(table)
-                tables.extend(get_tables(mapping.get('mapping', [])))
-                tables.extend(get_tables(mapping.get('conditions', [])))
-            return tables
-
         self.output('Fetching data from WOCAT database.', v=1)
 
         # Try to query the lookup table and collect its values.
@@ -1617,7 +1750,7 @@ class WOCATImport(Logger):
                 FROM {schema}.{table_name};
             """.format(schema=self.schema, table_name=self.lookup_table_name)
             lookup_table = {}
-            for row in etl.dicts(etl.fromdb(self.connection, lookup_query)):
+            for row in self.fetch_rows(lookup_query):
                 lookup_table[row.get('id')] = row
         except AttributeError:
             lookup_table = {}
@@ -1630,8 +1763,7 @@ class WOCATImport(Logger):
             """.format(schema=self.schema,
                        table_name=self.lookup_table_name_text)
             lookup_table_text = {}
-            for row in etl.dicts(
-                    etl.fromdb(self.connection, lookup_query_text)):
+            for row in self.fetch_rows(lookup_query_text):
                 lookup_table_text[row.get('id')] = row
         except AttributeError:
             lookup_table_text = {}
@@ -1644,21 +1776,13 @@ class WOCATImport(Logger):
             """.format(schema=self.schema,
                        table_name=self.file_info_table)
             file_infos = {}
-            for row in etl.dicts(
-                    etl.fromdb(self.connection, lookup_query_files)):
+            for row in self.fetch_rows(lookup_query_files):
                 file_infos[row.get('blob_id')] = row
         except AttributeError:
             file_infos = {}
 
         # Determine all tables which need to be queried.
-        all_tables = self.tables
-        for qg_properties in self.mapping.values():
-            questions = qg_properties.get('questions', {})
-            for q_properties in questions.values():
-                all_tables.extend(get_tables(q_properties.get('mapping', [])))
-
-        # Remove duplicates
-        all_tables = list(set(all_tables))
+        all_tables = sorted(set(self.tables) | self.mapping_tables)
 
         # Query each table and collect the values.
         for table_name in all_tables:
@@ -1671,8 +1795,7 @@ class WOCATImport(Logger):
                 limit=self.query_limit
             )
 
-            queried_table = etl.fromdb(self.connection, query)
-            for row in etl.dicts(queried_table):
+            for row in self.fetch_rows(query):
                 identifier = row.get(self.questionnaire_identifier)
 
                 import_object = self.get_import_object(identifier)
@@ -1680,12 +1803,13 @@ class WOCATImport(Logger):
                 if import_object is None:
                     import_object = ImportObject(
                         identifier, self.command_options, lookup_table,
-                        lookup_table_text, file_infos, self.image_url)
+                        lookup_table_text, file_infos, self.image_url,
+                        owners=self.owners)
 
                     import_object.add_custom_mapping_messages(
                         self.custom_mapping_messages)
 
-                    self.import_objects.append(import_object)
+                    self.add_import_object(import_object)
 
                 # If the code is available in the current table data, set it.
                 code = row.get(self.questionnaire_code)
@@ -1708,6 +1832,29 @@ class WOCATImport(Logger):
         self.output('{} objects found.'.format(
             len(self.import_objects)), v=1)
 
+    def fetch_rows(self, query):
+        """
+        Stream the rows of a query as dicts. A server side cursor is used, so
+        only one chunk of rows is held in memory at once.
+        """
+        cursor_name = 'wocat_import_{}'.format(uuid4().hex)
+        with self.connection.cursor(name=cursor_name) as cursor:
+            cursor.itersize = self.chunk_size
+            cursor.execute(query)
+            columns = None
+            for row in cursor:
+                if columns is None:
+                    columns = [column.name for column in cursor.description]
+                yield dict(zip(columns, row))
+
+    @property
+    def chunk_size(self) -> int:
+        return self.command_options.get('chunk-size') or DEFAULT_CHUNK_SIZE
+
+    def add_import_object(self, import_object):
+        self.import_objects.append(import_object)
+        self.import_objects_index[import_object.identifier] = import_object
+
     def filter_import_objects(self):
         """
         Filter the import objects based on status and custom filters.
@@ -1737,7 +1884,7 @@ class WOCATImport(Logger):
             import_objects = []
             for filter_identifier in self.import_objects_filter:
                 import_object = self.get_import_object(filter_identifier)
-                if import_object:
+                if import_object and import_object.code != '':
                     import_objects.append(import_object)
             self.import_objects = import_objects
 
@@ -1752,20 +1899,17 @@ class WOCATImport(Logger):
         Returns:
             -
         """
-        processed_codes = []
-        original_import_objects = []
-
+        # Group the objects by code (in order of appearance).
+        objects_by_code = OrderedDict()
         for import_object in self.import_objects:
+            objects_by_code.setdefault(import_object.code, []).append(
+                import_object)
 
-            code = import_object.code
+        original_import_objects = []
 
-            # Process each code only once
-            if code in processed_codes:
-                continue
-            processed_codes.append(code)
+        for same_code_objects in objects_by_code.values():
 
-            same_code_objects = [
-                io for io in self.import_objects if io.code == code]
+            import_object = same_code_objects[0]
 
             if len(same_code_objects) == 1:
                 # Only one translation available -> it is already the original
@@ -1798,20 +1942,47 @@ class WOCATImport(Logger):
         Returns:
             ImportObject.
         """
-        return next((item for item in self.import_objects if
-                     item.identifier == identifier), None)
+        return self.import_objects_index.get(identifier)
 
     def do_mapping(self):
         """
-        Do the mapping of each ImportObject.
+        Do the mapping of each ImportObject. With the option "processes", the
+        objects are mapped in parallel by forked worker processes.
 
         Returns:
             -
         """
         self.output('Starting mapping of data ...', v=1)
+        processes = self.command_options.get('processes') or 1
+        if processes > 1 and len(self.import_objects) > 1:
+            self.do_parallel_mapping(processes)
+        else:
+            for import_object in self.import_objects:
+                import_object.map_data(self.mapping)
+
+        # The raw WOCAT data is not needed anymore after the mapping.
         for import_object in self.import_objects:
-            for qg_name, qg_properties in self.mapping.items():
-                import_object.questiongroup_mapping(qg_name, qg_properties)
+            for translation in [import_object, *import_object.translations]:
+                translation.release_wocat_data()
+
+    def do_parallel_mapping(self, processes):
+        global _mapping_import
+        _mapping_import = self
+        # Database connections must not be shared with the forked processes;
+        # each worker opens its own connection if required (files).
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        try:
+            with context.Pool(processes=processes) as pool:
+                results = pool.imap_unordered(
+                    _map_import_object, range(len(self.import_objects)),
+                    chunksize=max(1, self.chunk_size // processes)
+                )
+                for index, mapping_results in results:
+                    self.import_objects[index].set_mapping_results(
+                        mapping_results)
+        finally:
+            _mapping_import = None
 
     def print_errors(self):
         """
@@ -1888,13 +2059,11 @@ class WOCATImport(Logger):
 
             inserted = []
             self.output('Starting insert of objects ...', v=1)
-            for import_object in self.import_objects:
-                inserted_object = import_object.save(self.configuration)
-                import_object.questionnaire_object = inserted_object
-                inserted.append(inserted_object)
-
-            # Reactivate notification signal
-            signals.create_questionnaire.connect(create_questionnaire)
+            try:
+                inserted = self.insert_objects()
+            finally:
+                # Reactivate notification signal
+                signals.create_questionnaire.connect(create_questionnaire)
 
             self.output('{} objects inserted.'.format(len(inserted)), v=0, l='success')
         else:
@@ -1905,6 +2074,57 @@ class WOCATImport(Logger):
         if write_mapping_messages:
             self.write_mapping_messages()
 
+    @property
+    def checkpoint_filename(self) -> str:
+        return CHECKPOINT_FILENAME.format(schema=self.schema)
+
+    def read_checkpoint(self) -> set:
+        if not os.path.exists(self.checkpoint_filename):
+            return set()
+        with open(self.checkpoint_filename) as file:
+            return set(json.load(file))
+
+    def write_checkpoint(self, codes: set):
+        # Write a temporary file first, the checkpoint must never be partial.
+        tmp_filename = '{}.tmp'.format(self.checkpoint_filename)
+        with open(tmp_filename, 'w') as file:
+            json.dump(sorted(codes), file)
+        os.replace(tmp_filename, self.checkpoint_filename)
+
+    def insert_objects(self) -> list:
+        """
+        Insert the objects in chunks, each chunk in a transaction. After each
+        chunk, the codes of the inserted objects are written to the checkpoint
+        file. With the option "resume", objects of the checkpoint are
+        skipped.
+
+        Returns:
+            list. The inserted questionnaires.
+        """
+        inserted_codes = set()
+        if self.command_options.get('resume'):
+            inserted_codes = self.read_checkpoint()
+            self.output('Skipping {} objects inserted previously.'.format(
+                len(inserted_codes)), v=1)
+
+        import_objects = [
+            import_object for import_object in self.import_objects
+            if import_object.code not in inserted_codes
+        ]
+        inserted = []
+        for start in range(0, len(import_objects), self.chunk_size):
+            chunk = import_objects[start:start + self.chunk_size]
+            with transaction.atomic():
+                for import_object in chunk:
+                    inserted_object = import_object.save(self.configuration)
+                    import_object.questionnaire_object = inserted_object
+                    inserted.append(inserted_object)
+            inserted_codes.update(import_object.code for import_object in chunk)
+            self.write_checkpoint(inserted_codes)
+            self.output('{} of {} objects inserted.'.format(
+                start + len(chunk), len(import_objects)), v=2)
+        return inserted
+
     def write_mapping_messages(self):
 
         file = open(MAPPING_MESSAGES_FILENAME, 'w')
@@ -1976,8 +2196,8 @@ class QTImport(WOCATImport):
     configuration_code = 'technologies'
     questionnaire_owner = 'owner_id'
 
-    mapping = qt_mapping
-    custom_mapping_messages = custom_mapping_messages
+    mapping_module = 'qt_mapping'
+    mapping_name = 'qt_mapping'
 
     # Optionally specify a list of IDs (qt_id) to filter the QT Questionnaires.
     import_objects_filter = []
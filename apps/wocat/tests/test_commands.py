@@ -1,10 +1,17 @@
 import json
+import os
 import unittest
+from collections import namedtuple
 from datetime import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from model_mommy import mommy
 
 from apps.qcat.tests import TestCase
 from apps.wocat.management.commands.import_wocat_data import QTImport, WOCATImport, \
-    ImportObject, is_empty_questiongroup
+    ImportObject, is_empty_questiongroup, load_mapping, CONDITION_OPERATORS, \
+    check_condition_operators
 
 
 # class TestImport(WOCATImport):
@@ -2430,3 +2437,125 @@ class TestIsEmptyQuestiongroup(TestCase):
         qg = {'question_1': '', 'question_2': {'en': ''},
               'question_3': {'en': '', 'fr': ''}}
         self.assertTrue(is_empty_questiongroup(qg))
+
+
+class TestWOCATImportObjects(TestCase):
+
+    def setUp(self):
+        # Do not connect to the WOCAT database.
+        path = 'apps.wocat.management.commands.import_wocat_data'
+        with mock.patch(f'{path}.psycopg2'), \
+                mock.patch(f'{path}.get_configuration'):
+            self.imprt = QTImport({'verbosity': 0, 'chunk-size': 2})
+        for identifier, code, year in [
+                (1, 'T_MOR010en', 2010), (2, 'T_CHN001en', 2011),
+                (3, 'T_MOR010fr', 2012)]:
+            import_object = ImportObject(identifier, {}, {}, {}, {}, '')
+            import_object.set_code(code)
+            import_object.created = datetime(year, 1, 1)
+            self.imprt.add_import_object(import_object)
+
+    def test_get_import_object(self):
+        self.assertEqual(self.imprt.get_import_object(2).code, 'T_CHN001')
+        self.assertIsNone(self.imprt.get_import_object(4))
+
+    def test_check_translations(self):
+        self.imprt.check_translations()
+        self.assertEqual(
+            [io.identifier for io in self.imprt.import_objects], [1, 2]
+        )
+        self.assertEqual(
+            [io.identifier for io in self.imprt.import_objects[0].translations],
+            [3]
+        )
+
+    @mock.patch.object(ImportObject, 'save')
+    def test_insert_objects_checkpoint(self, mock_save):
+        self.imprt.check_translations()
+        with mock.patch.object(QTImport, 'write_checkpoint') as write:
+            self.imprt.insert_objects()
+        write.assert_called_once_with({'T_MOR010', 'T_CHN001'})
+
+    @mock.patch.object(ImportObject, 'save')
+    def test_insert_objects_resume(self, mock_save):
+        self.imprt.command_options['resume'] = True
+        self.imprt.check_translations()
+        with mock.patch.object(
+                QTImport, 'read_checkpoint', return_value={'T_MOR010'}), \
+                mock.patch.object(QTImport, 'write_checkpoint'):
+            inserted = self.imprt.insert_objects()
+        self.assertEqual(len(inserted), 1)
+
+    def test_owners_per_import(self):
+        user = mommy.make(get_user_model())
+        import_object = ImportObject(
+            4, {}, {}, {}, {}, '', owners=self.imprt.owners)
+        import_object.set_owner(user.id)
+        self.assertEqual(self.imprt.owners, {user.id: user})
+        other = ImportObject(5, {}, {}, {}, {}, '')
+        self.assertEqual(other.owners, {})
+
+    def test_parallel_mapping(self):
+        def map_data(import_object, mapping):
+            import_object.data_json = {'pid': os.getpid()}
+            import_object.add_mapping_message(import_object.code)
+
+        self.imprt.command_options['processes'] = 2
+        self.imprt.check_translations()
+        path = 'apps.wocat.management.commands.import_wocat_data'
+        # Keep the connection of the test transaction open.
+        with mock.patch(f'{path}.connections'), \
+                mock.patch.object(ImportObject, 'map_data', map_data):
+            self.imprt.do_mapping()
+        # The objects are mapped in the workers, the results are copied back.
+        for import_object in self.imprt.import_objects:
+            self.assertNotEqual(import_object.data_json['pid'], os.getpid())
+            self.assertEqual(
+                import_object.mapping_messages, [import_object.code])
+            self.assertEqual(import_object.wocat_data, {})
+
+    def test_fetch_rows(self):
+        Column = namedtuple('Column', ['name'])
+        connection = self.imprt.connection
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.__iter__.return_value = iter([(1, 'foo'), (2, 'bar')])
+        cursor.description = [Column('id'), Column('name')]
+        rows = list(self.imprt.fetch_rows('SELECT * FROM qt_quest;'))
+        self.assertEqual(
+            rows, [{'id': 1, 'name': 'foo'}, {'id': 2, 'name': 'bar'}])
+        cursor.execute.assert_called_once_with('SELECT * FROM qt_quest;')
+        self.assertEqual(cursor.itersize, 2)
+        # A named (server side) cursor is used.
+        cursor_name = connection.cursor.call_args[1]['name']
+        self.assertTrue(cursor_name.startswith('wocat_import_'))
+
+    def test_mapping_tables(self):
+        self.assertIn('qt_questionnaire_info', self.imprt.mapping_tables)
+        self.assertIs(
+            self.imprt.mapping, load_mapping('qt_mapping', 'qt_mapping')[0])
+
+    def test_get_wocat_attribute_data(self):
+        import_object = ImportObject(4, {}, {}, {}, {}, '')
+        import_object.add_wocat_data('qt_quest', {'name': 'foo'})
+        import_object.add_wocat_data('qt_quest', {'name': None})
+        self.assertEqual(
+            import_object.get_wocat_attribute_data('qt_quest', 'name'), ['foo'])
+        self.assertEqual(
+            import_object.get_wocat_attribute_data(
+                'qt_quest', 'name', keep_null_values=True), ['foo', None])
+        import_object.add_wocat_data('qt_quest', {'name': 'bar'})
+        self.assertEqual(
+            import_object.get_wocat_attribute_data('qt_quest', 'name'),
+            ['foo', 'bar'])
+
+    def test_check_condition_operators(self):
+        mapping = {'qg': {'questions': {'q': {'mapping': [{
+            'conditions': [{'operator': 'custom', 'custom': [
+                {'operator': 'equals'}]}]}]}}}}
+        with self.assertRaises(NotImplementedError):
+            check_condition_operators(mapping)
+
+    def test_condition_operators(self):
+        self.assertTrue(CONDITION_OPERATORS['one_of'](['a', 'b'], ['a']))
+        self.assertTrue(CONDITION_OPERATORS['not_one_of'](['a', 'b'], ['c']))
+        self.assertFalse(CONDITION_OPERATORS['one_of'](['a'], []))